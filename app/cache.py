@@ -0,0 +1,215 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, g, request
+
+from app.tenancy import current_owner
+
+LIST_VERSION_KEY = "todos:version"
+CACHED_HEADERS = ("ETag", "Last-Modified")
+
+
+class MemoryCache:
+    """In-process LRU cache with per-entry TTL and a total size limit
+
+    Entries are evicted least-recently-used first once ``max_bytes`` is
+    exceeded. Counters live outside the LRU so they are never evicted.
+    The cache is per process: with several gunicorn workers, use the Redis
+    backend if writes must be visible to every worker immediately.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, default_ttl=60):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.size = 0
+        self.hits = self.misses = self.evictions = 0
+        self._entries = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                if entry is not None:
+                    self._discard(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, ttl=None):
+        cost = len(key) + len(value)
+        if cost > self.max_bytes:
+            return
+        expires_at = time.monotonic() + (ttl or self.default_ttl)
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (value, expires_at)
+            self.size += cost
+            while self.size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+                self.evictions += 1
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._discard(key)
+
+    def get_counter(self, key):
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def stats(self):
+        return {
+            "backend": "memory",
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self.size,
+        }
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(key) + len(entry[0])
+
+
+class RedisCache:
+    """Cache backed by a Redis-compatible client (``get/set/delete/incr``)
+
+    Hit and miss counters are kept per process; evictions are Redis's own
+    business and are read from ``INFO`` when the client supports it.
+    """
+
+    def __init__(self, client, prefix="todo-api:", default_ttl=60):
+        self.client = client
+        self.prefix = prefix
+        self.default_ttl = default_ttl
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, value, ex=ttl or self.default_ttl)
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*(self.prefix + key for key in keys))
+
+    def get_counter(self, key):
+        return int(self.client.get(self.prefix + key) or 0)
+
+    def incr(self, key):
+        return self.client.incr(self.prefix + key)
+
+    def stats(self):
+        evictions = None
+        if hasattr(self.client, "info"):
+            evictions = self.client.info("stats").get("evicted_keys")
+        return {"backend": "redis", "hits": self.hits, "misses": self.misses, "evictions": evictions}
+
+
+def init_cache(app):
+    """Create the response cache configured by CACHE_BACKEND"""
+    backend = app.config["CACHE_BACKEND"]
+    ttl = app.config["CACHE_TTL"]
+    if backend == "memory":
+        cache = MemoryCache(max_bytes=app.config["CACHE_MAX_BYTES"], default_ttl=ttl)
+    elif backend == "redis":
+        import redis
+
+        cache = RedisCache(redis.Redis.from_url(app.config["CACHE_REDIS_URL"]), default_ttl=ttl)
+    elif backend in (None, "", "none"):
+        cache = None
+    else:
+        raise ValueError(f"Unknown CACHE_BACKEND: {backend}")
+    app.extensions["todo_cache"] = cache
+    return cache
+
+
+def get_cache():
+    return current_app.extensions.get("todo_cache")
+
+
+def todo_key(todo_id):
+    return f"todo:{todo_id}"
+
+
+def list_key(cache):
+    version = cache.get_counter(LIST_VERSION_KEY)
+    return f"todos:{current_owner()}:v{version}:{request.query_string.decode()}"
+
+
+def _pack(response):
+    headers = {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers}
+    head = {"owner": current_owner(), "headers": headers}
+    return json.dumps(head).encode() + b"\n" + response.get_data()
+
+
+def _unpack(value):
+    """(owner, response) for a cached entry"""
+    head, _, body = value.partition(b"\n")
+    head = json.loads(head)
+    response = current_app.response_class(body, mimetype="application/json")
+    response.headers.update(head["headers"])
+    return head["owner"], response
+
+
+def cached_response(key_func):
+    """Serve a view's 200 JSON response from the cache, filling it on a miss
+
+    The body is stored together with its validators (ETag, Last-Modified)
+    so cached hits still answer conditional requests with 304. Clients that
+    just wrote (``g.read_your_writes``, see app/replicas.py) skip the lookup
+    and refill the entry from the primary. Entries remember their owner; a
+    hit for another owner is treated as a miss (per-todo keys carry only
+    the id, so writes outside a request can still invalidate them).
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = get_cache()
+            if cache is None:
+                return view(*args, **kwargs)
+            key = key_func(cache, **kwargs)
+            value = None if g.get("read_your_writes") else cache.get(key)
+            if value is not None:
+                owner, response = _unpack(value)
+                if owner == current_owner():
+                    return response.make_conditional(request)
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                cache.set(key, _pack(response))
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def invalidate_todos(*todo_ids):
+    """Drop cached entries for ``todo_ids`` and every cached list page"""
+    cache = get_cache()
+    if cache is None:
+        return
+    cache.delete(*(todo_key(todo_id) for todo_id in todo_ids))
+    cache.incr(LIST_VERSION_KEY)
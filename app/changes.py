@@ -0,0 +1,183 @@
+from datetime import datetime, timedelta
+
+import click
+from sqlalchemy import delete, event, func, select, text, tuple_
+from sqlalchemy.orm import aliased
+
+from app.models import Todo, TodoTombstone, db
+from app.serializers import TODO_FIELDS, serialize_rows, todo_columns
+
+# Every insert/update of a todo takes the next value of one monotonic
+# counter into todos.change_seq, and every delete leaves a tombstone with
+# its own counter value, so "what changed since N" is an index range scan.
+#
+# On Postgres the counter is drawn when a row is written, not when its
+# transaction commits: T1 can take 10 and T2 11, and T2 commit first. A
+# feed ordered by change_seq alone would then hand out a position past 10
+# and skip it for good. Each change therefore also records the writing
+# transaction (change_xid) and the feed is ordered by (change_xid,
+# change_seq), reading only changes of transactions older than the
+# snapshot's xmin: every transaction that is still running, or not yet
+# started, sorts after everything already handed out. SQLite commits one
+# writer at a time, so change_xid stays 0 there.
+
+POSTGRES_DDL = (
+    "CREATE SEQUENCE IF NOT EXISTS todos_change_seq",
+    "ALTER SEQUENCE todos_change_seq OWNED BY todos.change_seq",
+    "CREATE OR REPLACE FUNCTION todos_bump_change_seq() RETURNS trigger LANGUAGE plpgsql AS $$ "
+    "BEGIN NEW.change_xid := pg_current_xact_id()::text::bigint; "
+    "NEW.change_seq := nextval('todos_change_seq'); RETURN NEW; END $$",
+    "CREATE TRIGGER todos_change_seq BEFORE INSERT OR UPDATE ON todos "
+    "FOR EACH ROW EXECUTE FUNCTION todos_bump_change_seq()",
+    "CREATE OR REPLACE FUNCTION todos_record_tombstone() RETURNS trigger LANGUAGE plpgsql AS $$ "
+    "BEGIN INSERT INTO todo_tombstones (id, owner_id, change_xid, change_seq, deleted_at) "
+    "VALUES (OLD.id, OLD.owner_id, pg_current_xact_id()::text::bigint, nextval('todos_change_seq'), "
+    "now() AT TIME ZONE 'utc') "
+    "ON CONFLICT (id) DO UPDATE SET owner_id = EXCLUDED.owner_id, change_xid = EXCLUDED.change_xid, "
+    "change_seq = EXCLUDED.change_seq, deleted_at = EXCLUDED.deleted_at; "
+    "RETURN OLD; END $$",
+    "CREATE TRIGGER todos_tombstone AFTER DELETE ON todos "
+    "FOR EACH ROW EXECUTE FUNCTION todos_record_tombstone()",
+)
+
+# SQLite (tests): no sequences, so a one-row counter table stands in
+SQLITE_DDL = (
+    "CREATE TABLE IF NOT EXISTS todo_change_counter (value INTEGER NOT NULL)",
+    "INSERT INTO todo_change_counter (value) SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM todo_change_counter)",
+    "CREATE TRIGGER IF NOT EXISTS todos_change_seq_ai AFTER INSERT ON todos BEGIN "
+    "UPDATE todo_change_counter SET value = value + 1; "
+    "UPDATE todos SET change_seq = (SELECT value FROM todo_change_counter) WHERE id = new.id; END",
+    "CREATE TRIGGER IF NOT EXISTS todos_change_seq_au AFTER UPDATE ON todos "
+    "WHEN new.change_seq IS old.change_seq BEGIN "
+    "UPDATE todo_change_counter SET value = value + 1; "
+    "UPDATE todos SET change_seq = (SELECT value FROM todo_change_counter) WHERE id = new.id; END",
+    "CREATE TRIGGER IF NOT EXISTS todos_tombstone AFTER DELETE ON todos BEGIN "
+    "UPDATE todo_change_counter SET value = value + 1; "
+    "INSERT OR REPLACE INTO todo_tombstones (id, owner_id, change_seq, deleted_at) "
+    "VALUES (old.id, old.owner_id, (SELECT value FROM todo_change_counter), "
+    "strftime('%Y-%m-%d %H:%M:%f', 'now')); END",
+)
+SQLITE_DROP = ("DROP TABLE IF EXISTS todo_change_counter",)
+
+
+@event.listens_for(Todo.__table__, "after_create")
+def create_change_tracking(target, connection, **kw):
+    """Install the change_seq/tombstone triggers whenever todos is created via create_all"""
+    statements = {"postgresql": POSTGRES_DDL, "sqlite": SQLITE_DDL}.get(connection.dialect.name, ())
+    for statement in statements:
+        connection.exec_driver_sql(statement)
+
+
+@event.listens_for(Todo.__table__, "after_drop")
+def drop_change_tracking(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        for statement in SQLITE_DROP:
+            connection.exec_driver_sql(statement)
+
+
+def current_change_seq():
+    """Highest change_seq over todos and tombstones (two index lookups)"""
+    todos, tombstones = db.session.execute(
+        select(
+            select(func.max(Todo.change_seq)).scalar_subquery(),
+            select(func.max(TodoTombstone.change_seq)).scalar_subquery(),
+        )
+    ).one()
+    return max(todos or 0, tombstones or 0)
+
+
+def change_horizon():
+    """xmin of the current snapshot on Postgres, None elsewhere
+
+    Every transaction with a lower id has finished; changes written by
+    the horizon transaction or later are not read yet.
+    """
+    if db.session.get_bind().dialect.name != "postgresql":
+        return None
+    return db.session.execute(text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint")).scalar()
+
+
+def current_position():
+    """Feed position of "now": every later change sorts after it"""
+    horizon = change_horizon()
+    if horizon is None:
+        return (0, current_change_seq())
+    # อาจส่งซ้ำบาง change ที่ commit หลัง horizon ไปแล้ว แต่ไม่ข้ามของที่ยัง commit ไม่เสร็จ
+    return (horizon, 0)
+
+
+def change_events(position, limit):
+    """Up to ``limit`` changes after ``position`` as ``((change_xid, change_seq), id, row)``, oldest first
+
+    ``row`` is the todo's current columns, or None for a delete. Returns
+    ``(events, has_more, held_back)``; ``held_back`` is true when changes
+    of still-running transactions wait behind the horizon, so the caller
+    should read again later. A todo that changed several times has one
+    event per change, each with its current state.
+    """
+    horizon = change_horizon()
+    after = tuple_(*position)
+    rows = db.session.execute(
+        select(*todo_columns(TODO_FIELDS), Todo.change_xid, Todo.change_seq)
+        .where(tuple_(Todo.change_xid, Todo.change_seq) > after)
+        .order_by(Todo.change_xid, Todo.change_seq)
+        .limit(limit + 1)
+    ).all()
+    tombstones = db.session.execute(
+        select(TodoTombstone.id, TodoTombstone.change_xid, TodoTombstone.change_seq)
+        .where(tuple_(TodoTombstone.change_xid, TodoTombstone.change_seq) > after)
+        .order_by(TodoTombstone.change_xid, TodoTombstone.change_seq)
+        .limit(limit + 1)
+    ).all()
+
+    events = sorted(
+        [((row.change_xid, row.change_seq), row.id, row) for row in rows]
+        + [((tombstone.change_xid, tombstone.change_seq), tombstone.id, None) for tombstone in tombstones],
+        key=lambda item: item[0],
+    )
+    # เรียงตาม change_xid ก่อน: change ที่ยังอยู่หลัง horizon อยู่ท้ายรายการเสมอ
+    safe = events if horizon is None else [event for event in events if event[0][0] < horizon]
+    return safe[:limit], len(safe) > limit, len(safe) < len(events)
+
+
+def changes_since(position, limit):
+    """Up to ``limit`` changes after ``position``, oldest first
+
+    Returns ``(updated_rows, deleted_ids, last_position, has_more)``. A todo
+    that changed several times appears once, in its current state; an id
+    that was deleted and then reused (SQLite) keeps only its latest change.
+    """
+    events, has_more, _ = change_events(position, limit)
+    latest = {todo_id: row for _, todo_id, row in events}
+    updated = [row for row in latest.values() if row is not None]
+    deleted = [todo_id for todo_id, row in latest.items() if row is None]
+    last_position = events[-1][0] if events else position
+    return serialize_rows(updated, TODO_FIELDS), deleted, last_position, has_more
+
+
+def compact_tombstones(retention_days):
+    """Delete tombstones older than ``retention_days``; returns how many went
+
+    Each owner's newest tombstone is always kept so that owner's
+    current_change_seq() never moves backwards.
+    """
+    newer = aliased(TodoTombstone)
+    newest = select(func.max(newer.change_seq)).where(newer.owner_id == TodoTombstone.owner_id).scalar_subquery()
+    result = db.session.execute(
+        delete(TodoTombstone).where(
+            TodoTombstone.deleted_at < datetime.utcnow() - timedelta(days=retention_days),
+            TodoTombstone.change_seq < newest,
+        )
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def init_changes(app):
+    """Register ``flask compact-tombstones`` (run it from cron)"""
+
+    @app.cli.command("compact-tombstones")
+    @click.option("--days", type=int, default=None, help="Retention, defaults to TODOS_TOMBSTONE_TTL_DAYS")
+    def compact_tombstones_command(days):
+        removed = compact_tombstones(days if days is not None else app.config["TODOS_TOMBSTONE_TTL_DAYS"])
+        click.echo(f"Removed {removed} tombstones")
@@ -0,0 +1,31 @@
+import click
+from flask import current_app
+
+from app.models import db
+
+
+class LazyMigrateGroup(click.Group):
+    """``flask db`` that imports Flask-Migrate (and Alembic) on first use
+
+    Alembic adds ~170 ms to every import of the app, which every gunicorn
+    worker and cold start would otherwise pay for a command only run at
+    deploy time.
+    """
+
+    def _commands(self):
+        from flask_migrate import Migrate
+        from flask_migrate.cli import db as db_group
+
+        if "migrate" not in current_app.extensions:
+            Migrate(current_app, db)
+        return db_group
+
+    def list_commands(self, ctx):
+        return self._commands().list_commands(ctx)
+
+    def get_command(self, ctx, name):
+        return self._commands().get_command(ctx, name)
+
+
+def init_migrate_commands(app):
+    app.cli.add_command(LazyMigrateGroup("db", help="Perform database migrations."))
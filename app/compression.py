@@ -0,0 +1,244 @@
+import gzip
+import mimetypes
+import os
+import re
+import zlib
+
+import click
+from flask import current_app, request, send_file, send_from_directory
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+COMPRESSIBLE_MIMETYPES = frozenset((
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "image/svg+xml",
+    "text/css",
+    "text/html",
+    "text/plain",
+))
+# ไฟล์ static ที่ถูกบีบอัดล่วงหน้าโดย `flask compress-static`
+STATIC_EXTENSIONS = (".json", ".js", ".css", ".html", ".svg", ".txt", ".map")
+SUFFIXES = {"zstd": ".zst", "br": ".br", "gzip": ".gz"}
+# ระดับสูงสุด: บีบครั้งเดียวตอน build ไม่ใช่ทุก request
+BUILD_LEVELS = {"gzip": 9, "br": 11, "zstd": 19}
+# "<etag>-<encoding>" ใน If-Match/If-None-Match
+CODED_ETAG = re.compile(r'-(' + "|".join(SUFFIXES) + r')"')
+ETAG_ENCODING_KEY = "app.etag_encoding"
+
+
+class GzipCodec:
+    def __init__(self, level):
+        self.level = level
+
+    def compress(self, data):
+        return gzip.compress(data, self.level, mtime=0)
+
+    def stream(self, chunks):
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+        for chunk in chunks:
+            # sync flush: client ได้ข้อมูลทุก chunk ไม่ต้องรอจบ stream
+            yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+
+
+class BrotliCodec:
+    def __init__(self, quality):
+        self.quality = quality
+
+    def compress(self, data):
+        return brotli.compress(data, quality=self.quality)
+
+    def stream(self, chunks):
+        compressor = brotli.Compressor(quality=self.quality)
+        for chunk in chunks:
+            yield compressor.process(chunk) + compressor.flush()
+        yield compressor.finish()
+
+
+class ZstdCodec:
+    def __init__(self, level):
+        self.level = level
+
+    def compress(self, data):
+        return zstandard.ZstdCompressor(level=self.level).compress(data)
+
+    def stream(self, chunks):
+        compressor = zstandard.ZstdCompressor(level=self.level).compressobj()
+        for chunk in chunks:
+            yield compressor.compress(chunk) + compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        yield compressor.flush()
+
+
+def available_codecs(config):
+    """Codecs for the COMPRESS_ALGORITHMS that are installed, in preference order"""
+    factories = {"gzip": lambda: GzipCodec(config["COMPRESS_GZIP_LEVEL"])}
+    if brotli is not None:
+        factories["br"] = lambda: BrotliCodec(config["COMPRESS_BR_QUALITY"])
+    if zstandard is not None:
+        factories["zstd"] = lambda: ZstdCodec(config["COMPRESS_ZSTD_LEVEL"])
+    names = [name.strip() for name in config["COMPRESS_ALGORITHMS"].split(",") if name.strip()]
+    unknown = [name for name in names if name not in SUFFIXES]
+    if unknown:
+        raise ValueError(f"COMPRESS_ALGORITHMS must be a subset of: {', '.join(SUFFIXES)}")
+    return {name: factories[name]() for name in names if name in factories}
+
+
+def negotiate(encodings):
+    """Best of ``encodings`` (server preference breaks ties) for this request's Accept-Encoding"""
+    if not encodings:
+        return None
+    return request.accept_encodings.best_match(encodings)
+
+
+def _compressible(response, min_size):
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return False
+    if response.direct_passthrough or "Content-Encoding" in response.headers:
+        return False
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES or "no-transform" in response.cache_control:
+        return False
+    return response.is_streamed or (response.content_length or 0) >= min_size
+
+
+def coded_etag(etag, encoding):
+    """Strong ETag of ``etag``'s representation compressed with ``encoding``"""
+    return f"{etag}-{encoding}"
+
+
+def uncode_validators():
+    """Strip the encoding from ETags in If-Match/If-None-Match
+
+    Views compare against the ETag of the uncompressed representation.
+    The encoding of a matched If-None-Match tag is kept for the 304.
+    """
+    environ = request.environ
+    for key in ("HTTP_IF_MATCH", "HTTP_IF_NONE_MATCH"):
+        value = environ.get(key)
+        match = CODED_ETAG.search(value) if value else None
+        if match is None:
+            continue
+        if key == "HTTP_IF_NONE_MATCH":
+            environ[ETAG_ENCODING_KEY] = match.group(1)
+        environ[key] = CODED_ETAG.sub('"', value)
+
+
+def _stream(body, chunks, codec):
+    try:
+        yield from codec.stream(chunks)
+    finally:
+        if hasattr(body, "close"):
+            body.close()
+
+
+def send_static(filename):
+    """Flask's static view, serving a precompressed variant when one fits
+
+    Only these responses get the long STATIC_MAX_AGE; other send_file
+    responses keep Flask's default (no max-age).
+    """
+    static_folder = current_app.static_folder
+    max_age = current_app.config["STATIC_MAX_AGE"]
+    variants = {}
+    for encoding, suffix in SUFFIXES.items():
+        path = safe_join(static_folder, filename + suffix)
+        if path is not None and os.path.isfile(path):
+            variants[encoding] = path
+    encoding = negotiate(list(variants))
+    if encoding is None:
+        response = send_from_directory(static_folder, filename, max_age=max_age)
+    else:
+        response = send_file(
+            variants[encoding],
+            mimetype=mimetypes.guess_type(filename)[0] or "application/octet-stream",
+            max_age=max_age,
+            conditional=True,
+        )
+        response.headers["Content-Encoding"] = encoding
+    if variants:
+        response.vary.add("Accept-Encoding")
+    return response
+
+
+def compress_static(static_folder, codecs):
+    """Write .gz/.br/.zst next to every compressible static file; returns the paths written"""
+    written = []
+    for root, _, files in os.walk(static_folder):
+        for name in files:
+            if not name.endswith(STATIC_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                data = f.read()
+            for encoding, codec in codecs.items():
+                compressed = codec.compress(data)
+                if len(compressed) < len(data):
+                    with open(path + SUFFIXES[encoding], "wb") as f:
+                        f.write(compressed)
+                    written.append(path + SUFFIXES[encoding])
+    return written
+
+
+def init_compression(app):
+    """Compress API responses per Accept-Encoding; serve precompressed static files
+
+    Bodies of at least COMPRESS_MIN_SIZE bytes are compressed in one go;
+    streamed bodies (export) are compressed chunk by chunk and flushed
+    after every chunk. A compressed body gets its own strong ETag,
+    ``"<etag>-<encoding>"``; conditional requests may send either form.
+    """
+    codecs = available_codecs(app.config)
+
+    @app.cli.command("compress-static")
+    def compress_static_command():
+        """Precompress static files at maximum levels (run at build time)"""
+        build = {name: type(codec)(BUILD_LEVELS[name]) for name, codec in codecs.items()}
+        for path in compress_static(app.static_folder, build):
+            click.echo(path)
+
+    if app.has_static_folder:
+        app.view_functions["static"] = send_static
+
+    if not app.config["COMPRESS_ENABLED"] or not codecs:
+        return
+
+    min_size = app.config["COMPRESS_MIN_SIZE"]
+    encodings = list(codecs)
+    # ก่อน hook อื่นที่อาจอ่าน request.if_match (cached property)
+    app.before_request_funcs.setdefault(None, []).insert(0, uncode_validators)
+
+    @app.after_request
+    def compress_response(response):
+        if response.status_code == 304:
+            # 304 ส่ง ETag เดียวกับที่ client ได้มาพร้อม body ที่บีบอัด
+            encoding = request.environ.get(ETAG_ENCODING_KEY)
+            etag, weak = response.get_etag()
+            if encoding is not None and etag and not weak:
+                response.set_etag(coded_etag(etag, encoding))
+            return response
+        if not _compressible(response, min_size):
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = negotiate(encodings)
+        if encoding is None:
+            return response
+        codec = codecs[encoding]
+        if response.is_streamed:
+            response.response = _stream(response.response, response.iter_encoded(), codec)
+            response.headers.pop("Content-Length", None)
+        else:
+            response.set_data(codec.compress(response.get_data()))
+        response.headers["Content-Encoding"] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(coded_etag(etag, encoding))
+        return response
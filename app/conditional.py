@@ -0,0 +1,50 @@
+import hashlib
+
+from flask import current_app, request
+
+from app.tenancy import current_owner
+
+
+def todo_etag(todo_id, updated_at):
+    """Strong ETag for a single todo, derived from its id and updated_at"""
+    return hashlib.sha1(f"{todo_id}:{updated_at.isoformat()}".encode()).hexdigest()
+
+
+def list_etag(change_seq):
+    """Strong ETag for a list page
+
+    Built from the owner's highest change_seq (bumped by every insert,
+    update and delete) plus the query string, since cursor/limit/fields
+    change the body for the same table state.
+    """
+    query = request.query_string.decode()
+    return hashlib.sha1(f"{current_owner()}:{change_seq}:{query}".encode()).hexdigest()
+
+
+def not_modified(etag, last_modified=None):
+    """Return a 304 response if the conditional GET headers match, else None"""
+    if request.if_none_match:
+        matched = request.if_none_match.contains_weak(etag)
+    elif request.if_modified_since and last_modified is not None:
+        matched = last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)
+    else:
+        matched = False
+    if not matched:
+        return None
+    response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    return response
+
+
+def precondition_failed(etag):
+    """True when an If-Match header is present and does not match ``etag``"""
+    return bool(request.if_match) and not request.if_match.contains(etag)
+
+
+def tag_response(response, etag, last_modified=None):
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    return response
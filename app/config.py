@@ -10,6 +10,144 @@ class Config:
 
     SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-key-change-in-production")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    RATELIMIT_ENABLED = os.getenv("RATELIMIT_ENABLED", "true").lower() == "true"
+
+    # Startup: create_all at boot and /docs are for development; production
+    # manages the schema with `flask db upgrade` only
+    AUTO_CREATE_TABLES = os.getenv("AUTO_CREATE_TABLES", "true").lower() == "true"
+    SWAGGER_ENABLED = os.getenv("SWAGGER_ENABLED", "true").lower() == "true"
+
+    # Rate limiter storage shared by all gunicorn workers, e.g. redis://redis:6379/1
+    # (memcached:// needs RATELIMIT_STRATEGY=sliding-window-counter)
+    RATELIMIT_STORAGE_URI = os.getenv("RATELIMIT_STORAGE_URI", "memory://")
+    RATELIMIT_STRATEGY = os.getenv("RATELIMIT_STRATEGY", "moving-window")
+    RATELIMIT_IN_MEMORY_FALLBACK_ENABLED = os.getenv("RATELIMIT_IN_MEMORY_FALLBACK_ENABLED", "true").lower() == "true"
+    # Per-endpoint limits for /api routes
+    RATELIMIT_READ = os.getenv("RATELIMIT_READ", "1000 per hour")
+    RATELIMIT_WRITE = os.getenv("RATELIMIT_WRITE", "200 per hour")
+    # Local token-bucket pre-check in front of a shared storage: fraction of each
+    # limit a worker may admit between round trips (0 = off). A window can admit
+    # up to workers x share x limit extra hits.
+    RATELIMIT_LOCAL_SHARE = float(os.getenv("RATELIMIT_LOCAL_SHARE", "0.01"))
+    RATELIMIT_LOCAL_SYNC_SECONDS = float(os.getenv("RATELIMIT_LOCAL_SYNC_SECONDS", "1"))
+
+    # Logging: "text" or "json" lines, written by a background thread per process
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+    LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))  # records beyond this are dropped
+    # One access log line per request; errors and slow requests are always logged,
+    # successful ones above LOG_ACCESS_BURST per second per worker are sampled
+    LOG_ACCESS_ENABLED = os.getenv("LOG_ACCESS_ENABLED", "true").lower() == "true"
+    LOG_ACCESS_BURST = int(os.getenv("LOG_ACCESS_BURST", "50"))
+    LOG_ACCESS_SAMPLE_RATE = float(os.getenv("LOG_ACCESS_SAMPLE_RATE", "1.0"))
+    LOG_SLOW_REQUEST_MS = int(os.getenv("LOG_SLOW_REQUEST_MS", "500"))
+
+    # Profiling, all off by default (nothing is hooked in while off).
+    # Server-Timing response header with db/serialize/total milliseconds
+    SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "false").lower() == "true"
+    # cProfile PROFILE_SAMPLE_RATE of requests plus those sending PROFILE_HEADER: <PROFILE_TOKEN>
+    # (no token = header ignored); .prof files go to PROFILE_DIR, newest PROFILE_MAX_FILES kept
+    PROFILE_ENABLED = os.getenv("PROFILE_ENABLED", "false").lower() == "true"
+    PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0.01"))
+    PROFILE_HEADER = os.getenv("PROFILE_HEADER", "X-Profile")
+    PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+    PROFILE_DIR = os.getenv("PROFILE_DIR", "/tmp/todo-profiles")
+    PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "1000"))
+    # Log statements slower than this (0 = off) with their parameter types and EXPLAIN plan
+    SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0"))
+    SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "true").lower() == "true"
+
+    # JSON encoder for responses: "auto" (orjson when installed), "orjson" or "stdlib"
+    JSON_ENCODER = os.getenv("JSON_ENCODER", "auto")
+
+    # Response compression (Accept-Encoding); br/zstd need the brotli/zstandard packages
+    COMPRESS_ENABLED = os.getenv("COMPRESS_ENABLED", "true").lower() == "true"
+    COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))  # bytes; streams always compress
+    COMPRESS_ALGORITHMS = os.getenv("COMPRESS_ALGORITHMS", "zstd,br,gzip")  # preferred first
+    COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+    COMPRESS_BR_QUALITY = int(os.getenv("COMPRESS_BR_QUALITY", "4"))
+    COMPRESS_ZSTD_LEVEL = int(os.getenv("COMPRESS_ZSTD_LEVEL", "3"))
+    # /static only (app/compression.py): precompressed by `flask compress-static`, URLs carry ?v=<hash>
+    STATIC_MAX_AGE = int(os.getenv("STATIC_MAX_AGE", str(365 * 24 * 3600)))
+
+    # Todos belong to the owner named by this request header, set by the authenticating
+    # proxy in front of the API; without it requests act as owner "default" unless required
+    OWNER_HEADER = os.getenv("OWNER_HEADER", "X-Owner-ID")
+    OWNER_REQUIRED = os.getenv("OWNER_REQUIRED", "false").lower() == "true"
+
+    # /api/internal/* (cache, write-behind, stream, rate limit and pool counters): off in
+    # production unless enabled; with INTERNAL_TOKEN set they also need X-Internal-Token
+    INTERNAL_ENDPOINTS_ENABLED = os.getenv("INTERNAL_ENDPOINTS_ENABLED", "true").lower() == "true"
+    INTERNAL_TOKEN = os.getenv("INTERNAL_TOKEN", "")
+
+    # Pagination for GET /api/todos
+    TODOS_PAGE_SIZE = int(os.getenv("TODOS_PAGE_SIZE", "50"))
+    TODOS_MAX_PAGE_SIZE = int(os.getenv("TODOS_MAX_PAGE_SIZE", "200"))
+
+    # POST /api/todos/batch
+    BATCH_MAX_OPERATIONS = int(os.getenv("BATCH_MAX_OPERATIONS", "500"))
+
+    # GET /api/todos/changes: tombstones older than this are compacted and
+    # sync tokens older than this get 410 (client must do a full resync)
+    TODOS_TOMBSTONE_TTL_DAYS = int(os.getenv("TODOS_TOMBSTONE_TTL_DAYS", "30"))
+
+    # PATCH /api/todos/<id>: acknowledge with 202 and write in batches (per worker).
+    # Updates acknowledged since the last flush are lost if the worker crashes.
+    WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "false").lower() == "true"
+    WRITE_BEHIND_FLUSH_MS = int(os.getenv("WRITE_BEHIND_FLUSH_MS", "200"))
+    WRITE_BEHIND_FLUSH_SIZE = int(os.getenv("WRITE_BEHIND_FLUSH_SIZE", "100"))
+    WRITE_BEHIND_MAX_PENDING = int(os.getenv("WRITE_BEHIND_MAX_PENDING", "1000"))  # then PATCH writes directly
+
+    # GET /api/todos/export
+    EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+
+    # GET /api/todos/stream (server-sent events). Each open stream holds a gthread thread,
+    # so keep SSE_MAX_CONNECTIONS (per process) well below GUNICORN_THREADS, or serve the
+    # stream from gevent workers and raise it to thousands.
+    SSE_MAX_CONNECTIONS = int(os.getenv("SSE_MAX_CONNECTIONS", "4"))
+    SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+    SSE_RETRY_MS = int(os.getenv("SSE_RETRY_MS", "3000"))  # EventSource reconnect delay
+    SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "1000"))  # events buffered per stream, then it is closed
+
+    # Background jobs (POST /api/jobs), run by `python worker.py` in JOBS_CONCURRENCY processes.
+    # A running job renews its lease after every chunk; one whose worker stops renewing it
+    # for JOBS_LEASE_SECONDS is requeued. Failed attempts wait the backoff, doubled each time.
+    JOBS_CONCURRENCY = int(os.getenv("JOBS_CONCURRENCY", "2"))
+    JOBS_POLL_INTERVAL = float(os.getenv("JOBS_POLL_INTERVAL", "1"))
+    JOBS_LEASE_SECONDS = int(os.getenv("JOBS_LEASE_SECONDS", "300"))
+    JOBS_MAX_ATTEMPTS = int(os.getenv("JOBS_MAX_ATTEMPTS", "3"))
+    JOBS_RETRY_BACKOFF_SECONDS = int(os.getenv("JOBS_RETRY_BACKOFF_SECONDS", "10"))
+    JOBS_CHUNK_SIZE = int(os.getenv("JOBS_CHUNK_SIZE", "500"))  # rows per transaction and progress report
+    JOBS_IMPORT_MAX_TODOS = int(os.getenv("JOBS_IMPORT_MAX_TODOS", "100000"))
+    JOBS_RESULT_DIR = os.getenv("JOBS_RESULT_DIR", "/tmp/todo-jobs")  # export files; shared by app and worker
+
+    # Read-through cache for GET /api/todos and /api/todos/<id>
+    # "none" | "memory" (per worker process) | "redis" (shared by all workers)
+    CACHE_BACKEND = os.getenv("CACHE_BACKEND", "none")
+    CACHE_TTL = int(os.getenv("CACHE_TTL", "30"))
+    CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+    CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+    # GET /api/health/ready: DB checked in the background every interval; a result
+    # older than max age (check stuck) reports not ready
+    HEALTH_CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", "5"))
+    HEALTH_CHECK_MAX_AGE = float(os.getenv("HEALTH_CHECK_MAX_AGE", "15"))
+
+    # Read replicas: comma-separated URLs; GET requests go to them round-robin.
+    # After a write, that client reads from the primary for DB_REPLICA_STICKY_SECONDS
+    # (keep it above the replication lag).
+    DATABASE_REPLICA_URLS = os.getenv("DATABASE_REPLICA_URLS", "")
+    DB_REPLICA_STICKY_SECONDS = int(os.getenv("DB_REPLICA_STICKY_SECONDS", "5"))
+
+    # Postgres connection pool (per gunicorn worker)
+    # "queue" = pooled connections, "null" = one connection per checkout (PgBouncer)
+    DB_POOL_MODE = os.getenv("DB_POOL_MODE", "queue")
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))  # size + overflow >= GUNICORN_THREADS
+    DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "10"))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
 
     @staticmethod
     def init_app(app):
@@ -29,6 +167,10 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
     WTF_CSRF_ENABLED = False
+    # tests สร้างตารางเองใน conftest
+    AUTO_CREATE_TABLES = False
+    # รัน CRUD tests ทั้งหมดผ่าน cache เพื่อตรวจการ invalidate
+    CACHE_BACKEND = "memory"
 
 
 class ProductionConfig(Config):
@@ -36,6 +178,11 @@ class ProductionConfig(Config):
 
     DEBUG = False
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
+    AUTO_CREATE_TABLES = os.getenv("AUTO_CREATE_TABLES", "false").lower() == "true"
+    SWAGGER_ENABLED = os.getenv("SWAGGER_ENABLED", "false").lower() == "true"
+    INTERNAL_ENDPOINTS_ENABLED = os.getenv("INTERNAL_ENDPOINTS_ENABLED", "false").lower() == "true"
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+    LOG_ACCESS_SAMPLE_RATE = float(os.getenv("LOG_ACCESS_SAMPLE_RATE", "0.1"))
 
     @classmethod
     def init_app(cls, app):
@@ -0,0 +1,118 @@
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import NullPool, QueuePool
+
+POOL_MODES = ("queue", "null")
+
+
+class PoolStats:
+    """Checkout counters for one connection pool"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, wait, timed_out=False):
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += timed_out
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+    def to_dict(self):
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_ms_total": round(self.wait_total * 1000, 3),
+            "wait_ms_max": round(self.wait_max * 1000, 3),
+            "wait_ms_avg": round(self.wait_total * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+        }
+
+
+class TimedPoolMixin:
+    """Record how long each checkout waited for a connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - start)
+        return connection
+
+
+class InstrumentedQueuePool(TimedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedNullPool(TimedPoolMixin, NullPool):
+    pass
+
+
+def database_url(url):
+    """Normalize postgres:// and postgresql:// URLs (Railway, Heroku) to the psycopg 3 driver"""
+    if url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql+psycopg://", 1)
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+psycopg://", 1)
+    return url
+
+
+def engine_options(config):
+    """Build SQLALCHEMY_ENGINE_OPTIONS for a Postgres URI from the DB_POOL_* settings
+
+    ``queue`` keeps a bounded pool per worker process; ``null`` opens a
+    connection per checkout and disables server-side prepared statements,
+    which is what PgBouncer in transaction pooling mode needs.
+    """
+    mode = config["DB_POOL_MODE"]
+    if mode not in POOL_MODES:
+        raise ValueError(f"DB_POOL_MODE must be one of: {', '.join(POOL_MODES)}")
+
+    connect_args = {}
+    if config["DB_STATEMENT_TIMEOUT_MS"]:
+        connect_args["options"] = f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT_MS']}"
+
+    options = {"pool_pre_ping": config["DB_POOL_PRE_PING"]}
+    if mode == "queue":
+        options.update(
+            poolclass=InstrumentedQueuePool,
+            pool_size=config["DB_POOL_SIZE"],
+            max_overflow=config["DB_MAX_OVERFLOW"],
+            pool_timeout=config["DB_POOL_TIMEOUT"],
+            pool_recycle=config["DB_POOL_RECYCLE"],
+        )
+    else:
+        options["poolclass"] = InstrumentedNullPool
+        connect_args["prepare_threshold"] = None
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+
+def pool_status(engine):
+    """Snapshot of an engine's pool: sizes in use plus checkout wait stats"""
+    pool = engine.pool
+    status = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+        )
+    stats = getattr(pool, "stats", None)
+    if stats is not None:
+        status.update(stats.to_dict())
+    return status
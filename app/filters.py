@@ -0,0 +1,83 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import false, select, true, tuple_
+
+from app.models import Todo
+
+# sort value -> (column name, descending)
+SORTS = {
+    "-created_at": ("created_at", True),
+    "created_at": ("created_at", False),
+    "-updated_at": ("updated_at", True),
+    "updated_at": ("updated_at", False),
+}
+DEFAULT_SORT = "-created_at"
+
+
+def _parse_bool(name, value):
+    lowered = value.lower()
+    if lowered in ("true", "1"):
+        return True
+    if lowered in ("false", "0"):
+        return False
+    raise ValueError(f"{name} must be true or false")
+
+
+def _parse_datetime(name, value):
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO 8601 datetime")
+    if parsed.tzinfo is not None:
+        # คอลัมน์เก็บเวลา UTC แบบ naive
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def parse_list_filters(args):
+    """Validate the list filter/sort query parameters against the allow-list"""
+    sort = args.get("sort", DEFAULT_SORT)
+    if sort not in SORTS:
+        raise ValueError("sort must be one of: " + ", ".join(SORTS))
+    filters = {"sort": sort}
+    if "completed" in args:
+        filters["completed"] = _parse_bool("completed", args["completed"])
+    for name in ("created_after", "created_before", "updated_since"):
+        if name in args:
+            filters[name] = _parse_datetime(name, args[name])
+    return filters
+
+
+def sort_field(filters):
+    return SORTS[filters["sort"]][0]
+
+
+def apply_filters(stmt, filters):
+    """Add the WHERE clauses for ``filters`` to ``stmt``"""
+    if "completed" in filters:
+        # ใช้ literal (ไม่ใช่ bind param) เพื่อให้ planner จับคู่ partial index ได้
+        stmt = stmt.where(Todo.completed == (true() if filters["completed"] else false()))
+    if "created_after" in filters:
+        stmt = stmt.where(Todo.created_at > filters["created_after"])
+    if "created_before" in filters:
+        stmt = stmt.where(Todo.created_at < filters["created_before"])
+    if "updated_since" in filters:
+        stmt = stmt.where(Todo.updated_at >= filters["updated_since"])
+    return stmt
+
+
+def list_statement(columns, filters, position=None):
+    """Filtered, sorted, keyset-paginated select for GET /api/todos
+
+    Every supported shape is served by one of the (created_at, id) /
+    (updated_at, id) indexes, including the partial indexes for open and
+    completed todos, so pages are index range scans in sort order.
+    """
+    field, descending = SORTS[filters["sort"]]
+    key = tuple_(getattr(Todo, field), Todo.id)
+    stmt = apply_filters(select(*columns), filters)
+    if position is not None:
+        stmt = stmt.where(key < position if descending else key > position)
+    if descending:
+        return stmt.order_by(getattr(Todo, field).desc(), Todo.id.desc())
+    return stmt.order_by(getattr(Todo, field), Todo.id)
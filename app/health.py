@@ -0,0 +1,104 @@
+import logging
+import os
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import text
+
+from app.db_pool import pool_status
+from app.models import db
+
+logger = logging.getLogger("app.health")
+
+
+class HealthMonitor:
+    """Database and pool status for the readiness probe, refreshed in the background
+
+    A thread runs ``SELECT 1`` on every engine (primary and replicas)
+    every ``interval`` seconds, so a probe only reads the last result and
+    costs no DB round trip. The thread starts on the first probe (not in
+    create_app, which must not open connections before gunicorn forks);
+    that first probe checks inline. A result older than ``max_age`` (the
+    thread is stuck on a hanging connection) counts as not ready.
+    """
+
+    def __init__(self, app, interval=5.0, max_age=15.0):
+        self.app = app
+        self.interval = interval
+        self.max_age = max_age
+        self.checks = 0
+        self._result = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def refresh(self):
+        """Check every engine now and keep the result"""
+        with self._refresh_lock, self.app.app_context():
+            databases = {}
+            for key, engine in db.engines.items():
+                start = time.perf_counter()
+                try:
+                    with engine.connect() as connection:
+                        connection.execute(text("SELECT 1"))
+                    databases[key or "default"] = {"ok": True}
+                except Exception as e:
+                    databases[key or "default"] = {"ok": False, "error": str(e)}
+                    logger.warning(f"⚠️ Health check failed for {key or 'default'}: {e}")
+                databases[key or "default"]["latency_ms"] = round((time.perf_counter() - start) * 1000, 3)
+            result = (time.monotonic(), databases)
+            with self._lock:
+                self._result = result
+                self.checks += 1
+            return result
+
+    def status(self):
+        """(ready, body) from the cached result plus the current pool counters"""
+        with self._lock:
+            result = self._result
+            self._ensure_thread()
+        if result is None:
+            result = self.refresh()
+        checked_at, databases = result
+        age = time.monotonic() - checked_at
+        ready = databases["default"]["ok"] and age <= self.max_age
+        engines = {key or "default": engine for key, engine in db.engines.items()}
+        return ready, {
+            "status": "ready" if ready else "not_ready",
+            "checked_ms_ago": round(age * 1000),
+            "databases": {
+                name: {**check, "pool": pool_status(engines[name])} for name, check in databases.items()
+            },
+        }
+
+    def _ensure_thread(self):
+        # thread ไม่ตามมาหลัง fork (gunicorn --preload) จึงเช็ค pid ด้วย
+        if not self._stop.is_set() and (self._thread is None or self._pid != os.getpid()):
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="health-monitor", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.refresh()
+
+    def close(self):
+        self._stop.set()
+
+
+def init_health(app):
+    """Create the readiness monitor behind GET /api/health/ready"""
+    monitor = HealthMonitor(
+        app,
+        interval=app.config["HEALTH_CHECK_INTERVAL"],
+        max_age=app.config["HEALTH_CHECK_MAX_AGE"],
+    )
+    app.extensions["health"] = monitor
+    return monitor
+
+
+def get_health_monitor():
+    return current_app.extensions["health"]
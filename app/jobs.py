@@ -0,0 +1,412 @@
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+
+from flask import current_app, g
+from sqlalchemy import case, delete, func, insert, select, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.cache import invalidate_todos
+from app.models import Job, Todo, db
+from app.serializers import TODO_FIELDS, serialize_rows, todo_columns
+
+logger = logging.getLogger("app.jobs")
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+# kind -> (handler, params validator)
+JOB_HANDLERS = {}
+
+
+class JobCancelled(Exception):
+    """Raised from JobContext.progress once a cancel was requested"""
+
+
+class LeaseLost(Exception):
+    """Raised from JobContext.progress when the job no longer belongs to this claim"""
+
+
+def job_handler(kind, validate):
+    """Register ``handler(ctx, params)`` for jobs of ``kind``"""
+
+    def register(handler):
+        JOB_HANDLERS[kind] = (handler, validate)
+        return handler
+
+    return register
+
+
+class JobContext:
+    """What a handler gets besides its params: chunk size, resume point, progress
+
+    Handlers work in chunks of ``chunk_size`` rows and call ``progress``
+    after each one. It commits the chunk together with the job's progress
+    and a renewed lease, so a retry can resume from ``processed``. It
+    raises JobCancelled once a cancel was requested (the committed chunks
+    stay) and LeaseLost if the job was requeued to another worker (the
+    chunk is rolled back).
+    """
+
+    def __init__(self, job, token, chunk_size, lease_seconds):
+        self.job_id = job.id
+        self.token = token
+        self.chunk_size = chunk_size
+        self.lease_seconds = lease_seconds
+        self.processed = job.processed
+
+    def progress(self, processed, total=None):
+        values = {
+            "processed": processed,
+            "lease_until": datetime.utcnow() + timedelta(seconds=self.lease_seconds),
+        }
+        if total is not None:
+            values["total"] = total
+        row = db.session.execute(
+            update(Job)
+            .where(Job.id == self.job_id, Job.locked_by == self.token)
+            .values(**values)
+            .returning(Job.cancel_requested)
+            .execution_options(synchronize_session=False)
+        ).first()
+        if row is None:
+            db.session.rollback()
+            raise LeaseLost(f"Job {self.job_id} was requeued")
+        db.session.commit()
+        self.processed = processed
+        if row.cancel_requested:
+            raise JobCancelled(f"Job {self.job_id} was cancelled")
+
+
+def _validate_import(params, config):
+    todos = params.get("todos")
+    if not isinstance(todos, list) or not todos:
+        raise ValueError("params.todos must be a non-empty list")
+    if len(todos) > config["JOBS_IMPORT_MAX_TODOS"]:
+        raise ValueError(f"An import may contain at most {config['JOBS_IMPORT_MAX_TODOS']} todos")
+    for index, todo in enumerate(todos):
+        if not isinstance(todo, dict) or not todo.get("title"):
+            raise ValueError(f"params.todos[{index}]: Title is required")
+    return {
+        "todos": [
+            {
+                "title": todo["title"],
+                "description": todo.get("description", ""),
+                "completed": bool(todo.get("completed", False)),
+            }
+            for todo in todos
+        ]
+    }
+
+
+def _validate_completed(default, allow_all):
+    def validate(params, config):
+        completed = params.get("completed", default)
+        if isinstance(completed, bool) or (allow_all and completed is None):
+            return {"completed": completed}
+        raise ValueError("params.completed must be true or false" + (" or null" if allow_all else ""))
+
+    return validate
+
+
+@job_handler("import", _validate_import)
+def import_todos(ctx, params):
+    """Insert ``params.todos`` (owned by the job's owner), one chunk per transaction"""
+    todos = params["todos"]
+    # เริ่มต่อจาก chunk ที่ commit ไปแล้วในรอบก่อน retry จึงไม่สร้างซ้ำ
+    for start in range(ctx.processed, len(todos), ctx.chunk_size):
+        chunk = todos[start:start + ctx.chunk_size]
+        db.session.execute(insert(Todo), chunk)
+        ctx.progress(start + len(chunk), len(todos))
+    return {"created": len(todos)}
+
+
+@job_handler("export", lambda params, config: {})
+def export_todos(ctx, params):
+    """Write every todo as NDJSON to JOBS_RESULT_DIR (GET /api/jobs/<id>/download)"""
+    path = export_path(ctx.job_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    total = db.session.scalar(select(func.count(Todo.id)))
+    dumps = current_app.json.dumps
+    written, last_id = 0, 0
+    ctx.progress(written, total)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        while True:
+            # keyset ทีละ chunk แทน server-side cursor: progress() commit ระหว่างทางได้
+            rows = db.session.execute(
+                select(*todo_columns(TODO_FIELDS)).where(Todo.id > last_id).order_by(Todo.id).limit(ctx.chunk_size)
+            ).all()
+            if not rows:
+                break
+            f.write("".join(dumps(item) + "\n" for item in serialize_rows(rows, TODO_FIELDS)))
+            written += len(rows)
+            last_id = rows[-1].id
+            ctx.progress(written, max(total, written))
+    os.replace(path + ".tmp", path)
+    return {"rows": written, "download": f"/api/jobs/{ctx.job_id}/download"}
+
+
+def _each_chunk(ctx, stmt):
+    """Ids of the todos matching ``stmt`` one chunk at a time, until none are left"""
+    while True:
+        ids = db.session.scalars(stmt.order_by(Todo.id).limit(ctx.chunk_size)).all()
+        if not ids:
+            return
+        yield ids
+
+
+@job_handler("complete", _validate_completed(default=True, allow_all=False))
+def complete_todos(ctx, params):
+    """Set ``completed`` on every todo that differs, one chunk per transaction"""
+    pending = select(Todo.id).where(Todo.completed != params["completed"])
+    total = ctx.processed + db.session.scalar(select(func.count(Todo.id)).where(Todo.completed != params["completed"]))
+    done = ctx.processed
+    ctx.progress(done, total)
+    for ids in _each_chunk(ctx, pending):
+        db.session.execute(
+            update(Todo).where(Todo.id.in_(ids)).values(completed=params["completed"]),
+            execution_options={"synchronize_session": False},
+        )
+        done += len(ids)
+        # todos ที่ถูกสร้างระหว่างทางก็ถูกรวมด้วย total จึงโตตามได้
+        ctx.progress(done, max(total, done))
+    return {"updated": done}
+
+
+@job_handler("purge", _validate_completed(default=True, allow_all=True))
+def purge_todos(ctx, params):
+    """Delete completed (default), open (``false``) or all (``null``) todos in chunks"""
+    matching = select(Todo.id)
+    counted = select(func.count(Todo.id))
+    if params["completed"] is not None:
+        matching = matching.where(Todo.completed == params["completed"])
+        counted = counted.where(Todo.completed == params["completed"])
+    total = ctx.processed + db.session.scalar(counted)
+    done = ctx.processed
+    ctx.progress(done, total)
+    for ids in _each_chunk(ctx, matching):
+        db.session.execute(delete(Todo).where(Todo.id.in_(ids)), execution_options={"synchronize_session": False})
+        done += len(ids)
+        ctx.progress(done, max(total, done))
+    return {"deleted": done}
+
+
+def export_path(job_id):
+    return os.path.join(current_app.config["JOBS_RESULT_DIR"], f"job-{job_id}.ndjson")
+
+
+def validate_job(payload, config):
+    """Validate a POST /api/jobs body and return (kind, params)"""
+    kind = payload.get("kind") if isinstance(payload, dict) else None
+    if kind not in JOB_HANDLERS:
+        raise ValueError("kind must be one of: " + ", ".join(JOB_HANDLERS))
+    params = payload.get("params", {})
+    if not isinstance(params, dict):
+        raise ValueError("params must be an object")
+    return kind, JOB_HANDLERS[kind][1](params, config)
+
+
+def enqueue_job(kind, params, max_attempts):
+    """Queue a job for the current owner and commit it"""
+    job = Job(kind=kind, params=params, max_attempts=max_attempts)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def cancel_job(job_id):
+    """Cancel a queued job now, or ask a running one to stop at its next progress report"""
+    # UPDATE แบบมีเงื่อนไข status: ไม่ทับ job ที่ worker เพิ่ง claim หรือทำเสร็จไประหว่างนี้
+    cancelled = db.session.execute(
+        update(Job).where(Job.id == job_id, Job.status == QUEUED)
+        .values(status=CANCELLED, finished_at=datetime.utcnow()),
+        execution_options={"synchronize_session": False},
+    )
+    if not cancelled.rowcount:
+        db.session.execute(
+            update(Job).where(Job.id == job_id, Job.status == RUNNING).values(cancel_requested=True),
+            execution_options={"synchronize_session": False},
+        )
+    db.session.commit()
+
+
+def claim_jobs(worker_id, limit, lease_seconds):
+    """Claim up to ``limit`` due jobs; returns [(job id, claim token)]
+
+    Candidates are locked with SELECT ... FOR UPDATE SKIP LOCKED, so
+    workers polling at the same time on Postgres each take different rows
+    instead of queueing behind one another. SQLite has no row locks (the
+    clause is not rendered); there the ``status = 'queued'`` condition on
+    the UPDATE keeps a job from being claimed twice.
+    """
+    if limit <= 0:
+        return []
+    now = datetime.utcnow()
+    ids = db.session.scalars(
+        select(Job.id)
+        .where(Job.status == QUEUED, Job.run_after <= now)
+        .order_by(Job.run_after, Job.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).all()
+    claimed = []
+    for job_id in ids:
+        token = f"{worker_id}:{uuid.uuid4().hex[:12]}"
+        result = db.session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == QUEUED)
+            .values(
+                status=RUNNING,
+                locked_by=token,
+                lease_until=now + timedelta(seconds=lease_seconds),
+                attempts=Job.attempts + 1,
+                started_at=now,
+            ),
+            execution_options={"synchronize_session": False},
+        )
+        if result.rowcount:
+            claimed.append((job_id, token))
+    db.session.commit()
+    return claimed
+
+
+def requeue_expired():
+    """Put running jobs whose lease expired (worker died) back in the queue
+
+    Jobs that already used all their attempts fail instead, and jobs with
+    a pending cancel are cancelled. Returns how many jobs were released.
+    """
+    now = datetime.utcnow()
+    out_of_attempts = Job.attempts >= Job.max_attempts
+    result = db.session.execute(
+        update(Job)
+        .where(Job.status == RUNNING, Job.lease_until < now)
+        .values(
+            status=case((Job.cancel_requested, CANCELLED), (out_of_attempts, FAILED), else_=QUEUED),
+            finished_at=case((Job.cancel_requested | out_of_attempts, now), else_=None),
+            error="Worker stopped renewing its lease",
+            locked_by=None,
+            lease_until=None,
+            run_after=now,
+        ),
+        execution_options={"synchronize_session": False},
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def _finish(job_id, token, status, **values):
+    if status in FINISHED:
+        values["finished_at"] = datetime.utcnow()
+    db.session.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.locked_by == token)
+        .values(status=status, lease_until=None, **values),
+        execution_options={"synchronize_session": False},
+    )
+    db.session.commit()
+
+
+def execute_job(job_id, token):
+    """Run a claimed job in the current app context; returns its new status
+
+    Failures are retried after JOBS_RETRY_BACKOFF_SECONDS, doubled per
+    attempt, until ``max_attempts``; the error of the last attempt is kept.
+    """
+    config = current_app.config
+    job = db.session.get(Job, job_id)
+    if job is None or job.locked_by != token:
+        return None
+    kind, attempts, max_attempts, params = job.kind, job.attempts, job.max_attempts, job.params
+    handler = JOB_HANDLERS[kind][0]
+    ctx = JobContext(job, token, config["JOBS_CHUNK_SIZE"], config["JOBS_LEASE_SECONDS"])
+    # ทุก query ของ handler ถูกจำกัดเฉพาะ todos ของเจ้าของ job (app/tenancy.py)
+    g.owner_id = job.owner_id
+    try:
+        result = handler(ctx, params)
+    except LeaseLost:
+        logger.warning(f"⚠️ Job {job_id} was requeued while running, stopping")
+        return None
+    except JobCancelled:
+        db.session.rollback()
+        _finish(job_id, token, CANCELLED)
+        return CANCELLED
+    except Exception as e:
+        db.session.rollback()
+        logger.exception(f"❌ Job {job_id} ({kind}) failed on attempt {attempts}/{max_attempts}: {e}")
+        if attempts < max_attempts:
+            delay = config["JOBS_RETRY_BACKOFF_SECONDS"] * 2 ** (attempts - 1)
+            _finish(
+                job_id, token, QUEUED,
+                error=str(e), locked_by=None, run_after=datetime.utcnow() + timedelta(seconds=delay),
+            )
+            return QUEUED
+        _finish(job_id, token, FAILED, error=str(e))
+        return FAILED
+    finally:
+        # cache ของ worker อื่น: ใช้ได้จริงเมื่อ CACHE_BACKEND=redis (memory cache หมดอายุตาม CACHE_TTL)
+        invalidate_todos()
+    _finish(job_id, token, SUCCEEDED, result=result, error=None)
+    return SUCCEEDED
+
+
+class JobWorker:
+    """Poll for due jobs and run them on an executor (a process pool in worker.py)
+
+    Each pass requeues jobs whose lease expired, then claims as many jobs
+    as there are free slots, so a claimed job never waits for a process.
+    """
+
+    def __init__(self, app, executor, concurrency, run=None, poll_interval=1.0, lease_seconds=300):
+        self.app = app
+        self.executor = executor
+        self.concurrency = concurrency
+        self.run = run or run_job
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"[:48]
+        self._running = {}
+
+    def run_once(self):
+        """One poll; returns the number of jobs claimed"""
+        for future in [future for future in self._running if future.done()]:
+            job_id = self._running.pop(future)
+            if future.exception() is not None:
+                logger.error(f"❌ Job {job_id} crashed its process: {future.exception()}")
+        free = self.concurrency - len(self._running)
+        with self.app.app_context():
+            requeue_expired()
+            claimed = claim_jobs(self.worker_id, free, self.lease_seconds)
+        for job_id, token in claimed:
+            self._running[self.executor.submit(self.run, job_id, token)] = job_id
+        return len(claimed)
+
+    def run_forever(self, stop):
+        """Poll until ``stop`` (a threading.Event) is set"""
+        while not stop.is_set():
+            try:
+                claimed = self.run_once()
+            except SQLAlchemyError as e:
+                logger.warning(f"⚠️ Job poll failed: {e}")
+                claimed = 0
+            if not claimed:
+                stop.wait(self.poll_interval)
+
+
+# app ของ process ใน pool (สร้างครั้งเดียวต่อ process โดย init_job_process)
+_process_app = None
+
+
+def init_job_process():
+    """ProcessPoolExecutor initializer: one app and engine per pool process"""
+    global _process_app
+    from app import create_app
+
+    _process_app = create_app()
+
+
+def run_job(job_id, token):
+    with _process_app.app_context():
+        return execute_job(job_id, token)
@@ -0,0 +1,77 @@
+import dataclasses
+import decimal
+import uuid
+from datetime import date, time
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson เป็น optional dependency
+    orjson = None
+
+JSON_ENCODERS = ("auto", "orjson", "stdlib")
+
+
+def _default(o):
+    # datetime เป็น ISO 8601 เหมือน orjson (Flask ตั้งต้นใช้ HTTP date)
+    if isinstance(o, (date, time)):
+        return o.isoformat()
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if hasattr(o, "__html__"):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    """Flask's provider with datetimes encoded as ISO 8601"""
+
+    default = staticmethod(_default)
+
+
+class OrjsonJSONProvider(StdlibJSONProvider):
+    """JSON provider backed by orjson
+
+    Keeps Flask's output conventions (sorted keys, compact unless
+    debugging, trailing newline on responses) but writes UTF-8 instead of
+    ``\\uXXXX`` escapes. Calls with stdlib-only keyword arguments fall back
+    to the stdlib encoder.
+    """
+
+    def _options(self):
+        options = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if self.compact is False or (self.compact is None and self._app.debug):
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_default, option=self._options()).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=_default, option=self._options() | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def init_json(app):
+    """Install the JSON provider chosen by JSON_ENCODER (auto = orjson if installed)"""
+    encoder = app.config["JSON_ENCODER"]
+    if encoder not in JSON_ENCODERS:
+        raise ValueError(f"JSON_ENCODER must be one of: {', '.join(JSON_ENCODERS)}")
+    if encoder == "orjson" and orjson is None:
+        raise ValueError("JSON_ENCODER=orjson requires the orjson package")
+    use_orjson = orjson is not None and encoder != "stdlib"
+    app.json = (OrjsonJSONProvider if use_orjson else StdlibJSONProvider)(app)
+    return app.json
@@ -1,13 +1,220 @@
+import atexit
+import copy
+import json
 import logging
+import os
+import queue
+import random
+import re
 import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
 
-def setup_logging(app):
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setLevel(logging.INFO)
-    formatter = logging.Formatter(
-        '%(asctime)s - %(levelname)s - %(message)s'
-    )
-    handler.setFormatter(formatter)
-    app.logger.addHandler(handler)
-    app.logger.setLevel(logging.INFO)
-    return app.logger
+from flask import g, has_request_context, request
+from flask.logging import default_handler
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+LOG_FORMATS = ("text", "json")
+REQUEST_ID_HEADER = "X-Request-ID"
+# รับ request ID จาก proxy เฉพาะรูปแบบที่ปลอดภัยสำหรับ log
+_REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,128}$")
+# attribute มาตรฐานของ LogRecord; ที่เหลือคือ field จาก extra=
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the record's ``extra`` fields"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRS)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp every record with the current request's ID (``-`` outside a request)"""
+
+    def filter(self, record):
+        if not hasattr(record, "request_id"):
+            record.request_id = g.get("request_id", "-") if has_request_context() else "-"
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full
+
+    Records are formatted by the listener thread; only the message and the
+    traceback text are rendered here so that no references to request
+    objects cross threads.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class AccessSampler:
+    """Keep the first ``burst`` success-path access logs per second, then ``rate`` of the rest"""
+
+    def __init__(self, rate=1.0, burst=0):
+        self.rate = rate
+        self.burst = burst
+        self._second = 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def sample(self):
+        """Sample rate the kept line represents, or None to drop it"""
+        second = int(time.monotonic())
+        # worker แบบ threads: request พร้อมกันต้องไม่นับ burst ซ้ำ
+        with self._lock:
+            if second != self._second:
+                self._second, self._count = second, 0
+            self._count += 1
+            count = self._count
+        if count <= self.burst or self.rate >= 1:
+            return 1.0
+        return self.rate if random.random() < self.rate else None
+
+
+def _stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _restart_listener_after_fork():
+    # gunicorn --preload: thread ของ listener ไม่ถูก fork ตามมาใน worker
+    global _listener
+    if _listener is None:
+        return
+    handlers = _listener.handlers
+    log_queue = queue.Queue(_listener.queue.maxsize)
+    for handler in logging.getLogger("app").handlers:
+        if isinstance(handler, NonBlockingQueueHandler):
+            handler.queue = log_queue
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+atexit.register(_stop_listener)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_listener_after_fork)
+
+
+def flush_logs():
+    """Write out everything still queued and stop the listener thread"""
+    _stop_listener()
+
+
+def setup_logging(app, stream=None):
+    """Log through a queue so request threads never block on stdout
+
+    LOG_FORMAT picks ``text`` or ``json`` lines and LOG_LEVEL the level;
+    the stream handler runs in a single QueueListener thread per process.
+    """
+    global _listener
+    log_format = app.config["LOG_FORMAT"]
+    if log_format not in LOG_FORMATS:
+        raise ValueError(f"LOG_FORMAT must be one of: {', '.join(LOG_FORMATS)}")
+
+    _stop_listener()
+    logger = app.logger
+    # create_app ซ้ำ (tests) ใช้ logger "app" ตัวเดิม: ไม่เพิ่ม handler ซ้ำ
+    for handler in list(logger.handlers):
+        if handler is default_handler or isinstance(handler, NonBlockingQueueHandler):
+            logger.removeHandler(handler)
+
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT))
+    log_queue = queue.Queue(app.config["LOG_QUEUE_SIZE"])
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+    logger.addHandler(queue_handler)
+    logger.setLevel(app.config["LOG_LEVEL"].upper())
+
+    _listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+    return logger
+
+
+def init_request_logging(app):
+    """Request IDs on every response plus a sampled access log line per request
+
+    Errors (status >= 400) and requests slower than LOG_SLOW_REQUEST_MS are
+    always logged; other requests go through LOG_ACCESS_BURST /
+    LOG_ACCESS_SAMPLE_RATE and carry the ``sample_rate`` they represent.
+    """
+    access_logger = logging.getLogger("app.access")
+    sampler = AccessSampler(app.config["LOG_ACCESS_SAMPLE_RATE"], app.config["LOG_ACCESS_BURST"])
+    slow_seconds = app.config["LOG_SLOW_REQUEST_MS"] / 1000
+
+    def assign_request_id():
+        request_id = request.headers.get(REQUEST_ID_HEADER, "")
+        g.request_id = request_id if _REQUEST_ID_PATTERN.match(request_id) else uuid.uuid4().hex
+        g.log_start = time.perf_counter()
+
+    # ก่อน rate limiter เพื่อให้ 429 มี request ID ด้วย
+    app.before_request_funcs.setdefault(None, []).insert(0, assign_request_id)
+
+    @app.after_request
+    def log_access(response):
+        if "request_id" not in g:
+            return response
+        response.headers[REQUEST_ID_HEADER] = g.request_id
+        if not app.config["LOG_ACCESS_ENABLED"] or request.endpoint == "metrics":
+            return response
+
+        latency = time.perf_counter() - g.log_start
+        if response.status_code >= 400 or latency >= slow_seconds:
+            sample_rate = 1.0
+        else:
+            sample_rate = sampler.sample()
+            if sample_rate is None:
+                return response
+
+        route = request.url_rule.rule if request.url_rule else None
+        access_logger.info(
+            f"{request.method} {request.path} {response.status_code} {latency * 1000:.1f}ms",
+            extra={
+                "method": request.method,
+                "route": route,
+                "path": request.path,
+                "status": response.status_code,
+                "latency_ms": round(latency * 1000, 3),
+                "db_ms": round(g.get("db_time", 0.0) * 1000, 3),
+                "db_queries": g.get("db_queries", 0),
+                "sample_rate": sample_rate,
+            },
+        )
+        return response
@@ -0,0 +1,107 @@
+import os
+import time
+
+from flask import Response, g, has_app_context, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Multi-process mode (gunicorn) is switched on by PROMETHEUS_MULTIPROC_DIR:
+# every worker writes its samples to mmap'd files in that directory and
+# /metrics aggregates them, see gunicorn.conf.py.
+
+REQUEST_COUNT = Counter(
+    "http_requests_total", "HTTP requests", ["endpoint", "method", "status"]
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency",
+    ["endpoint", "method"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "HTTP response body size",
+    ["endpoint"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+DB_QUERIES = Histogram(
+    "db_queries_per_request", "SQL statements per request", ["endpoint"], buckets=(0, 1, 2, 3, 5, 10, 25, 50, 100)
+)
+DB_TIME = Histogram(
+    "db_time_seconds_per_request",
+    "Time spent in SQL per request",
+    ["endpoint"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+RATE_LIMIT_REJECTIONS = Counter(
+    "rate_limit_rejections_total", "Requests rejected by the rate limiter", ["endpoint"]
+)
+
+
+def _endpoint():
+    return request.endpoint or "unmatched"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # เก็บไว้ที่ execution context ของ statement นี้ ไม่ใช่ที่ connection: statement ที่ error
+    # ไม่มี after_cursor_execute และ context ก็ถูกทิ้งไปพร้อมกัน ไม่ค้างอยู่ใน pool
+    context._metrics_query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._metrics_query_start
+    if has_app_context():
+        g.db_queries = g.get("db_queries", 0) + 1
+        g.db_time = g.get("db_time", 0.0) + elapsed
+
+
+def record_rate_limit_rejection(request_limit):
+    """``on_breach`` callback for Flask-Limiter"""
+    RATE_LIMIT_REJECTIONS.labels(_endpoint()).inc()
+
+
+def metrics_view():
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+def init_metrics(app, limiter):
+    """Collect per-route request, response size and DB metrics; serve /metrics"""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+    @app.before_request
+    def start_timer():
+        g.request_start = time.perf_counter()
+        g.db_queries = 0
+        g.db_time = 0.0
+
+    @app.after_request
+    def record_request(response):
+        endpoint = _endpoint()
+        if endpoint == "metrics":
+            return response
+        REQUEST_COUNT.labels(endpoint, request.method, response.status_code).inc()
+        if "request_start" in g:
+            REQUEST_LATENCY.labels(endpoint, request.method).observe(time.perf_counter() - g.request_start)
+            DB_QUERIES.labels(endpoint).observe(g.db_queries)
+            DB_TIME.labels(endpoint).observe(g.db_time)
+        if not response.is_streamed:
+            RESPONSE_SIZE.labels(endpoint).observe(response.calculate_content_length() or 0)
+        return response
+
+    app.add_url_rule("/metrics", "metrics", limiter.exempt(metrics_view))
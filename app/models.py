@@ -1,21 +1,62 @@
 from datetime import datetime
 
+from flask import g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
 
-db = SQLAlchemy()
+from app.replicas import RoutingSession
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+# owner ของ request ที่ไม่ได้ส่ง owner header มา และของแถวที่มีอยู่ก่อน migration 0006
+DEFAULT_OWNER = "default"
+
+
+def _owner_default():
+    # insert ระหว่าง request เป็นของ owner ที่ app/tenancy.py ระบุไว้
+    owner = g.get("owner_id") if has_app_context() else None
+    return owner or DEFAULT_OWNER
 
 
 class Todo(db.Model):
     """Todo item model"""
 
     __tablename__ = "todos"
+    # ทุก query ใน request ถูกจำกัดด้วย owner_id (app/tenancy.py) ทุก index จึงขึ้นต้นด้วย
+    # owner_id: แต่ละหน้าเป็น range scan ในข้อมูลของ owner นั้นเท่านั้น
+    __table_args__ = (
+        # Keyset pagination: ORDER BY created_at DESC, id DESC
+        db.Index("ix_todos_owner_created_at_id", "owner_id", "created_at", "id"),
+        # GET /api/todos?sort=-updated_at / updated_since=
+        db.Index("ix_todos_owner_updated_at_id", "owner_id", "updated_at", "id"),
+        # "open todos, newest first"
+        db.Index(
+            "ix_todos_owner_open_created_at_id", "owner_id", "created_at", "id",
+            postgresql_where=db.text("completed = false"),
+            sqlite_where=db.text("completed = 0"),
+        ),
+        # "completed recently"
+        db.Index(
+            "ix_todos_owner_done_updated_at_id", "owner_id", "updated_at", "id",
+            postgresql_where=db.text("completed = true"),
+            sqlite_where=db.text("completed = 1"),
+        ),
+        # the list ETag (max change_seq)
+        db.Index("ix_todos_owner_change_seq", "owner_id", "change_seq"),
+        # GET /api/todos/changes?since= (feed order, app/changes.py)
+        db.Index("ix_todos_owner_change_xid_seq", "owner_id", "change_xid", "change_seq"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
+    owner_id = db.Column(db.String(64), nullable=False, default=_owner_default, server_default=DEFAULT_OWNER)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
     completed = db.Column(db.Boolean, default=False, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    # ตั้งโดย trigger ในฐานข้อมูลทุกครั้งที่ insert/update (ดู app/changes.py)
+    change_seq = db.Column(db.BigInteger, server_default=db.FetchedValue(), server_onupdate=db.FetchedValue())
+    # transaction ที่เขียน change ล่าสุด (Postgres); SQLite เป็น 0 เสมอ
+    change_xid = db.Column(db.BigInteger, nullable=False, server_default="0")
 
     def to_dict(self):
         """Convert model to dictionary for JSON serialization"""
@@ -30,3 +71,82 @@ class Todo(db.Model):
 
     def __repr__(self):
         return f"<Todo {self.id}: {self.title}>"
+
+
+class TodoTombstone(db.Model):
+    """Marker left by a deleted todo so sync clients can see the delete"""
+
+    __tablename__ = "todo_tombstones"
+    __table_args__ = (
+        db.Index("ix_todo_tombstones_owner_change_seq", "owner_id", "change_seq"),
+        db.Index("ix_todo_tombstones_owner_change_xid_seq", "owner_id", "change_xid", "change_seq"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    owner_id = db.Column(db.String(64), nullable=False, server_default=DEFAULT_OWNER)
+    change_xid = db.Column(db.BigInteger, nullable=False, server_default="0")
+    change_seq = db.Column(db.BigInteger, nullable=False)
+    deleted_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<TodoTombstone {self.id}>"
+
+
+class Job(db.Model):
+    """Background job (app/jobs.py), run by ``python worker.py`` outside the web workers"""
+
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # worker claim: queued jobs whose run_after has passed, oldest first
+        db.Index(
+            "ix_jobs_queued_run_after_id", "run_after", "id",
+            postgresql_where=db.text("status = 'queued'"),
+            sqlite_where=db.text("status = 'queued'"),
+        ),
+        # requeue jobs whose worker died (lease expired)
+        db.Index(
+            "ix_jobs_running_lease_until", "lease_until",
+            postgresql_where=db.text("status = 'running'"),
+            sqlite_where=db.text("status = 'running'"),
+        ),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    owner_id = db.Column(db.String(64), nullable=False, default=_owner_default, server_default=DEFAULT_OWNER)
+    kind = db.Column(db.String(32), nullable=False)
+    params = db.Column(db.JSON, nullable=False, default=dict)
+    status = db.Column(db.String(16), nullable=False, default="queued")
+    processed = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer)
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    cancel_requested = db.Column(db.Boolean, nullable=False, default=False)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # claim token ของ worker ที่ถือ job อยู่ และเวลาที่ lease หมด (ต่ออายุทุกครั้งที่รายงาน progress)
+    locked_by = db.Column(db.String(64))
+    lease_until = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        """Convert model to dictionary for JSON serialization"""
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": {"processed": self.processed, "total": self.total},
+            "result": self.result,
+            "error": self.error,
+            "attempts": self.attempts,
+            "max_attempts": self.max_attempts,
+            "cancel_requested": self.cancel_requested,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+    def __repr__(self):
+        return f"<Job {self.id}: {self.kind} {self.status}>"
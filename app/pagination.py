@@ -0,0 +1,84 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+def _encode_token(payload):
+    """Opaque URL-safe token: unpadded base64 of compact JSON"""
+    data = json.dumps(payload, separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def _decode_token(token, parse, error):
+    """Decode a token from ``_encode_token`` and ``parse`` its payload; InvalidCursor(``error``) on failure"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        return parse(json.loads(base64.urlsafe_b64decode(padded.encode())))
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise InvalidCursor(error)
+
+
+def _keyset_position(payload):
+    created_at, todo_id = payload
+    return datetime.fromisoformat(created_at), int(todo_id)
+
+
+def _rank_position(payload):
+    rank, todo_id = payload
+    return float(rank), int(todo_id)
+
+
+def _change_position(payload):
+    if len(payload) == 2:
+        # token ก่อนมี change_xid: แถวเดิมทั้งหมดมี change_xid = 0
+        payload = [0, *payload]
+    change_xid, change_seq, issued_at = payload
+    return (int(change_xid), int(change_seq)), datetime.fromisoformat(issued_at)
+
+
+def encode_cursor(created_at, todo_id):
+    """Build an opaque cursor token from a (created_at, id) keyset position"""
+    return _encode_token([created_at.isoformat(), todo_id])
+
+
+def decode_cursor(token):
+    """Decode a cursor token back into (created_at, id)"""
+    return _decode_token(token, _keyset_position, "Invalid cursor")
+
+
+def encode_rank_cursor(rank, todo_id):
+    """Build a cursor for ranked search results from a (rank, id) position"""
+    return _encode_token([rank, todo_id])
+
+
+def decode_rank_cursor(token):
+    """Decode a search cursor token back into (rank, id)"""
+    return _decode_token(token, _rank_position, "Invalid cursor")
+
+
+def encode_change_token(position, issued_at):
+    """Build a sync token for GET /api/todos/changes from a (change_xid, change_seq) feed position"""
+    return _encode_token([*position, issued_at.isoformat()])
+
+
+def decode_change_token(token):
+    """Decode a sync token back into ((change_xid, change_seq), issued_at)"""
+    return _decode_token(token, _change_position, "Invalid sync token")
+
+
+def parse_limit(value, default, maximum):
+    """Parse the ``limit`` query parameter and clamp it to the server-side cap"""
+    if value is None:
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if limit < 1:
+        raise ValueError("limit must be a positive integer")
+    return min(limit, maximum)
@@ -0,0 +1,87 @@
+import click
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex
+
+from app.changes import POSTGRES_DDL as CHANGE_FEED_DDL
+from app.models import Todo, db
+from app.search import POSTGRES_DDL as SEARCH_DDL
+from app.stream import POSTGRES_DDL as NOTIFY_DDL
+
+COLUMNS = "id, owner_id, title, description, completed, created_at, updated_at, change_xid, change_seq"
+
+
+def rebuild_statements(partitions):
+    """Postgres DDL that rebuilds todos hash-partitioned by owner_id
+
+    ``partitions`` = 0 rebuilds a plain table (the create_all layout), so
+    the same command migrates both ways. Everything runs in one
+    transaction holding an ACCESS EXCLUSIVE lock on todos while the rows
+    are copied: run it in a maintenance window. Ids, change_xid and
+    change_seq are kept; the primary key becomes (owner_id, id) because a
+    partitioned table's unique constraints must include the partition key
+    (ids stay unique through todos_id_seq).
+    """
+    if partitions < 0:
+        raise ValueError("partitions must be 0 or more")
+    primary_key = "owner_id, id" if partitions else "id"
+    statements = [
+        "LOCK TABLE todos IN ACCESS EXCLUSIVE MODE",
+        "CREATE TABLE todos_rebuild ("
+        "id integer NOT NULL DEFAULT nextval('todos_id_seq'), "
+        "owner_id varchar(64) NOT NULL DEFAULT 'default', "
+        "title varchar(200) NOT NULL, "
+        "description text, "
+        "completed boolean NOT NULL, "
+        "created_at timestamp without time zone NOT NULL, "
+        "updated_at timestamp without time zone NOT NULL, "
+        "change_xid bigint NOT NULL DEFAULT 0, "
+        "change_seq bigint, "
+        f"PRIMARY KEY ({primary_key}))" + (" PARTITION BY HASH (owner_id)" if partitions else ""),
+    ]
+    statements += [
+        f"CREATE TABLE todos_rebuild_p{i} PARTITION OF todos_rebuild "
+        f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {i})"
+        for i in range(partitions)
+    ]
+    statements += [
+        # trigger ยังไม่ถูกสร้างบนตารางใหม่ change_xid/change_seq เดิมจึงไม่เปลี่ยน
+        f"INSERT INTO todos_rebuild ({COLUMNS}) SELECT {COLUMNS} FROM todos",
+        # ย้าย sequence ออกก่อน DROP ไม่งั้นจะถูกลบตามตารางเดิม
+        "ALTER SEQUENCE todos_id_seq OWNED BY todos_rebuild.id",
+        "ALTER SEQUENCE todos_change_seq OWNED BY todos_rebuild.change_seq",
+        "DROP TABLE todos",
+        "ALTER TABLE todos_rebuild RENAME TO todos",
+        "ALTER TABLE todos RENAME CONSTRAINT todos_rebuild_pkey TO todos_pkey",
+    ]
+    statements += [f"ALTER TABLE todos_rebuild_p{i} RENAME TO todos_p{i}" for i in range(partitions)]
+    dialect = postgresql.dialect()
+    indexes = sorted(Todo.__table__.indexes, key=lambda index: index.name)
+    statements += list(SEARCH_DDL)
+    statements += [str(CreateIndex(index).compile(dialect=dialect)) for index in indexes]
+    statements += list(CHANGE_FEED_DDL)
+    statements += list(NOTIFY_DDL)
+    statements.append("ANALYZE todos")
+    return statements
+
+
+def init_partitioning(app):
+    """Register ``flask partition-todos`` (optional Postgres layout)"""
+
+    @app.cli.command("partition-todos")
+    @click.option("--partitions", type=int, required=True, help="Hash partitions by owner_id (0 = one plain table)")
+    @click.option("--sql", "print_sql", is_flag=True, help="Print the statements instead of running them")
+    def partition_todos_command(partitions, print_sql):
+        """Rebuild todos as a table hash-partitioned by owner_id"""
+        try:
+            statements = rebuild_statements(partitions)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint="--partitions")
+        if print_sql:
+            click.echo(";\n".join(statements) + ";")
+            return
+        if db.engine.dialect.name != "postgresql":
+            raise click.ClickException("partition-todos needs PostgreSQL")
+        with db.engine.begin() as connection:
+            for statement in statements:
+                connection.exec_driver_sql(statement)
+        click.echo(f"todos rebuilt with {partitions or 'no'} partitions")
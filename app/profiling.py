@@ -0,0 +1,270 @@
+import cProfile
+import hmac
+import logging
+import os
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+from app.models import db
+
+logger = logging.getLogger("app.profiling")
+slow_query_logger = logging.getLogger("app.slow_query")
+
+# EXPLAIN เฉพาะ DML; DDL/SET/LISTEN ไม่มี plan
+_EXPLAINABLE = re.compile(r"^\s*(SELECT|WITH|INSERT|UPDATE|DELETE)\b", re.IGNORECASE)
+_EXPLAIN_PREFIX = {"postgresql": "EXPLAIN ", "sqlite": "EXPLAIN QUERY PLAN "}
+# statement ยาว (insertmanyvalues) ตัดก่อนลง log
+STATEMENT_MAX_LENGTH = 2000
+SHAPE_MAX_PARAMETERS = 20
+
+
+def parameter_shape(parameters):
+    """Type names of the bound parameters, never their values"""
+    if isinstance(parameters, dict):
+        items = list(parameters.items())
+        shape = {key: type(value).__name__ for key, value in items[:SHAPE_MAX_PARAMETERS]}
+        if len(items) > SHAPE_MAX_PARAMETERS:
+            shape["..."] = len(items) - SHAPE_MAX_PARAMETERS
+        return shape
+    if isinstance(parameters, (list, tuple)):
+        shape = [type(value).__name__ for value in parameters[:SHAPE_MAX_PARAMETERS]]
+        if len(parameters) > SHAPE_MAX_PARAMETERS:
+            shape.append(f"... {len(parameters) - SHAPE_MAX_PARAMETERS} more")
+        return shape
+    return type(parameters).__name__
+
+
+class SlowQueryLog:
+    """Log statements slower than ``threshold_ms`` with their plan
+
+    The plan is read with EXPLAIN (EXPLAIN QUERY PLAN on SQLite) on the
+    statement's own DBAPI connection, at most once per statement every
+    ``explain_interval`` seconds so that a slow database is not asked to
+    plan the same query for every request. On Postgres it runs inside a
+    savepoint: a failed EXPLAIN must not abort the caller's transaction.
+    """
+
+    def __init__(self, threshold_ms, explain=True, explain_interval=60.0):
+        self.threshold = threshold_ms / 1000
+        self.explain = explain
+        self.explain_interval = explain_interval
+        self.logged = 0
+        self._explained = {}
+        self._lock = threading.Lock()
+
+    def attach(self, engine):
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # ที่ execution context เหมือน app/metrics.py: statement ที่ error ไม่ทิ้งค่าไว้ที่ connection
+        context._slow_query_start = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._slow_query_start
+        if elapsed < self.threshold:
+            return
+        plan = None
+        if self.explain and not executemany and self._should_explain(statement):
+            plan = self._plan(cursor, conn.dialect.name, statement, parameters)
+        self.logged += 1
+        first_line = statement.strip().splitlines()[0][:120] if statement.strip() else ""
+        slow_query_logger.warning(
+            f"🐢 Slow query {elapsed * 1000:.1f}ms: {first_line}",
+            extra={
+                "duration_ms": round(elapsed * 1000, 3),
+                "statement": statement[:STATEMENT_MAX_LENGTH],
+                "parameters": (
+                    {"rows": len(parameters), "each": parameter_shape(parameters[0]) if parameters else None}
+                    if executemany else parameter_shape(parameters)
+                ),
+                "plan": plan,
+                "endpoint": request.endpoint if has_request_context() else None,
+            },
+        )
+
+    def _should_explain(self, statement):
+        if not _EXPLAINABLE.match(statement):
+            return False
+        now = time.monotonic()
+        with self._lock:
+            if now - self._explained.get(statement, float("-inf")) < self.explain_interval:
+                return False
+            if len(self._explained) >= 1000:
+                self._explained.clear()
+            self._explained[statement] = now
+        return True
+
+    def _plan(self, cursor, dialect, statement, parameters):
+        prefix = _EXPLAIN_PREFIX.get(dialect)
+        if prefix is None:
+            return None
+        connection = cursor.connection
+        savepoint = dialect == "postgresql" and not getattr(connection, "autocommit", False)
+        # cursor ของ DBAPI ตรง ๆ: ไม่ผ่าน event ของ engine (ไม่วนกลับมาที่นี่)
+        explain = connection.cursor()
+        try:
+            if savepoint:
+                explain.execute("SAVEPOINT slow_query_explain")
+            try:
+                explain.execute(prefix + statement, parameters)
+                rows = explain.fetchall()
+            except Exception:
+                if savepoint:
+                    explain.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+                raise
+            if savepoint:
+                explain.execute("RELEASE SAVEPOINT slow_query_explain")
+            return "\n".join(str(row[-1]) for row in rows)
+        except Exception as e:
+            logger.warning(f"⚠️ EXPLAIN of a slow query failed: {e}")
+            return None
+        finally:
+            explain.close()
+
+
+class RequestProfiler:
+    """cProfile a sample of requests and those that ask for it
+
+    Each profile is written to ``directory`` as a pstats file named after
+    the time, duration, endpoint and request ID (open it with ``python -m
+    pstats`` or snakeviz); only the newest ``max_files`` are kept.
+    """
+
+    def __init__(self, directory, sample_rate=0.0, header="X-Profile", token="", max_files=1000):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.header = header
+        self.token = token
+        self.max_files = max_files
+        self.written = 0
+
+    def wanted(self):
+        value = request.headers.get(self.header)
+        if value is not None and self.token and hmac.compare_digest(value, self.token):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Python 3.12+: profiler ทำงานได้ทีละตัวต่อ process; request อื่นกำลังถูก profile อยู่
+            return None
+        return profiler
+
+    def save(self, profiler, duration):
+        """Write ``profiler``'s stats; returns the file name"""
+        started = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        endpoint = (request.endpoint or "unmatched").replace(".", "-")
+        name = f"{started}-{duration * 1000:.0f}ms-{request.method}-{endpoint}-{g.get('request_id', '-')}.prof"
+        os.makedirs(self.directory, exist_ok=True)
+        profiler.dump_stats(os.path.join(self.directory, name))
+        self.written += 1
+        self._prune()
+        return name
+
+    def _prune(self):
+        # ชื่อไฟล์ขึ้นต้นด้วยเวลา: เรียงตามชื่อ = เรียงตามเวลา
+        files = sorted(f for f in os.listdir(self.directory) if f.endswith(".prof"))
+        for name in files[:max(len(files) - self.max_files, 0)]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:  # pragma: no cover - worker อื่นลบไปก่อน
+                pass
+
+
+def server_timing(db_time, db_queries, serialize_time, total):
+    """Server-Timing header value (milliseconds)"""
+    return (
+        f'db;dur={db_time * 1000:.1f};desc="{db_queries} queries", '
+        f"serialize;dur={serialize_time * 1000:.1f}, "
+        f"total;dur={total * 1000:.1f}"
+    )
+
+
+def _timed_serialize(response):
+    @wraps(response)
+    def timed(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return response(*args, **kwargs)
+        finally:
+            if has_request_context():
+                g.serialize_time = g.get("serialize_time", 0.0) + time.perf_counter() - start
+
+    return timed
+
+
+def init_profiling(app):
+    """Opt-in profiling: Server-Timing header, per-request cProfile, slow-query log
+
+    Each part is only hooked in when enabled (SERVER_TIMING_ENABLED,
+    PROFILE_ENABLED, SLOW_QUERY_MS > 0), so with all three off requests
+    and queries run exactly as without this module. Call after
+    db.init_app: the slow-query listeners go on this app's engines.
+    """
+    config = app.config
+    timing = config["SERVER_TIMING_ENABLED"]
+    profiler = None
+    if config["PROFILE_ENABLED"]:
+        profiler = RequestProfiler(
+            config["PROFILE_DIR"],
+            sample_rate=config["PROFILE_SAMPLE_RATE"],
+            header=config["PROFILE_HEADER"],
+            token=config["PROFILE_TOKEN"],
+            max_files=config["PROFILE_MAX_FILES"],
+        )
+    slow_queries = None
+    if config["SLOW_QUERY_MS"] > 0:
+        slow_queries = SlowQueryLog(config["SLOW_QUERY_MS"], explain=config["SLOW_QUERY_EXPLAIN"])
+        with app.app_context():
+            for engine in db.engines.values():
+                slow_queries.attach(engine)
+    app.extensions["profiling"] = {"profiler": profiler, "slow_queries": slow_queries}
+    if not timing and profiler is None:
+        return app.extensions["profiling"]
+
+    if timing:
+        # jsonify ทั้งหมดผ่าน app.json.response
+        app.json.response = _timed_serialize(app.json.response)
+
+    def start_profile():
+        g.profile_start = time.perf_counter()
+        g.serialize_time = 0.0
+        g.profiler = profiler.start() if profiler is not None and profiler.wanted() else None
+
+    def finish_profile(response):
+        if "profile_start" not in g:
+            return response
+        active = g.pop("profiler", None)
+        if active is not None:
+            active.disable()
+        total = time.perf_counter() - g.profile_start
+        if timing:
+            response.headers["Server-Timing"] = server_timing(
+                g.get("db_time", 0.0), g.get("db_queries", 0), g.serialize_time, total
+            )
+        if active is not None:
+            response.headers["X-Profile-Id"] = profiler.save(active, total)
+        return response
+
+    def stop_profile(exc):
+        # after_request ไม่ได้รัน (exception หลุดออกไป): ปิด profiler ของ thread นี้
+        active = g.pop("profiler", None)
+        if active is not None:
+            active.disable()
+
+    # เริ่มก่อนและจบหลัง hook อื่นทั้งหมด: total รวม rate limit, cache, compression
+    app.before_request_funcs.setdefault(None, []).insert(0, start_profile)
+    app.after_request_funcs.setdefault(None, []).insert(0, finish_profile)
+    app.teardown_request(stop_profile)
+    return app.extensions["profiling"]
@@ -0,0 +1,169 @@
+import threading
+import time
+from dataclasses import dataclass
+
+from flask import current_app, request
+from limits.storage import MovingWindowSupport, Storage, storage_from_string
+
+LOCAL_PREFIX = "local+"
+# ไม่ให้ dict ของ bucket โตไม่จำกัดเมื่อมี client จำนวนมาก
+MAX_BUCKETS = 10000
+
+
+@dataclass
+class _Bucket:
+    tokens: int = 0
+    pending: int = 0
+    expires_at: float = 0.0
+    blocked_until: float = 0.0
+
+
+class LocalBucketStorage(Storage, MovingWindowSupport):
+    """Moving-window storage with a per-process token-bucket pre-check
+
+    Wraps a shared storage (``local+redis://...``). While at least half of
+    a key's window is free, a sync grants the worker ``local_share`` of the
+    limit as local tokens, valid for ``local_sync_seconds``; hits are
+    answered from those tokens and their count is written back on the next
+    sync. In the busier half every hit goes to the shared storage, and a
+    key that is over its limit is rejected locally until the window frees
+    a slot. Hits still held in other workers' buckets are invisible to the
+    shared storage, so a window can admit up to workers x local_share x
+    limit extra hits.
+    """
+
+    STORAGE_SCHEME = [LOCAL_PREFIX + scheme for scheme in (
+        "memory", "redis", "rediss", "redis+unix", "redis+sentinel", "redis+cluster",
+    )]
+
+    def __init__(self, uri, wrap_exceptions=False, local_share=0.01, local_sync_seconds=1.0, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self.backend = storage_from_string(uri[len(LOCAL_PREFIX):], wrap_exceptions=wrap_exceptions, **options)
+        self.local_share = float(local_share)
+        self.local_sync_seconds = float(local_sync_seconds)
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.remote_syncs = 0
+
+    @property
+    def base_exceptions(self):
+        return self.backend.base_exceptions
+
+    def acquire_entry(self, key, limit, expiry, amount=1):
+        now = time.time()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            pending = 0
+            if bucket is not None:
+                if now < bucket.blocked_until:
+                    self.local_hits += 1
+                    return False
+                if now < bucket.expires_at and bucket.tokens >= amount:
+                    bucket.tokens -= amount
+                    bucket.pending += amount
+                    self.local_hits += 1
+                    return True
+                pending, bucket.pending, bucket.tokens = bucket.pending, 0, 0
+            self.remote_syncs += 1
+        return self._sync(key, limit, expiry, amount, pending, now)
+
+    def _sync(self, key, limit, expiry, amount, pending, now):
+        # hit ที่ตอบจาก token ไปแล้วถูกเขียนกลับพร้อม hit นี้ในรอบเดียว
+        allowed = self.backend.acquire_entry(key, limit, expiry, pending + amount)
+        if not allowed and pending:
+            self.backend.acquire_entry(key, limit, expiry, pending)
+        oldest, count = self.backend.get_moving_window(key, limit, expiry)
+
+        bucket = _Bucket()
+        if allowed:
+            if 2 * count <= limit:
+                bucket.tokens = int(limit * self.local_share)
+            bucket.expires_at = now + self.local_sync_seconds
+        else:
+            bucket.blocked_until = oldest + expiry
+        with self._lock:
+            if len(self._buckets) >= MAX_BUCKETS:
+                self._evict(now)
+            self._buckets[key] = bucket
+        return allowed
+
+    def _evict(self, now):
+        for key in [key for key, bucket in self._buckets.items()
+                    if bucket.pending == 0 and max(bucket.expires_at, bucket.blocked_until) <= now]:
+            del self._buckets[key]
+
+    def get_moving_window(self, key, limit, expiry):
+        return self.backend.get_moving_window(key, limit, expiry)
+
+    def incr(self, key, expiry, amount=1):
+        return self.backend.incr(key, expiry, amount)
+
+    def get(self, key):
+        return self.backend.get(key)
+
+    def get_expiry(self, key):
+        return self.backend.get_expiry(key)
+
+    def check(self):
+        return self.backend.check()
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+        return self.backend.reset()
+
+    def clear(self, key):
+        with self._lock:
+            self._buckets.pop(key, None)
+        self.backend.clear(key)
+
+    def stats(self):
+        with self._lock:
+            return {"local_hits": self.local_hits, "remote_syncs": self.remote_syncs, "buckets": len(self._buckets)}
+
+
+def limiter_settings(config):
+    """Flask-Limiter storage settings derived from RATELIMIT_* config
+
+    A shared storage with the moving-window strategy gets the local
+    token-bucket pre-check unless RATELIMIT_LOCAL_SHARE is 0.
+    """
+    uri = config["RATELIMIT_STORAGE_URI"]
+    settings = {"RATELIMIT_STORAGE_URI": uri}
+    if (
+        config["RATELIMIT_STRATEGY"] == "moving-window"
+        and config["RATELIMIT_LOCAL_SHARE"] > 0
+        and not uri.startswith(("memory://", LOCAL_PREFIX))
+    ):
+        settings["RATELIMIT_STORAGE_URI"] = LOCAL_PREFIX + uri
+        settings["RATELIMIT_STORAGE_OPTIONS"] = {
+            **config.get("RATELIMIT_STORAGE_OPTIONS", {}),
+            "local_share": config["RATELIMIT_LOCAL_SHARE"],
+            "local_sync_seconds": config["RATELIMIT_LOCAL_SYNC_SECONDS"],
+        }
+    return settings
+
+
+def read_limit():
+    return current_app.config["RATELIMIT_READ"]
+
+
+def write_limit():
+    return current_app.config["RATELIMIT_WRITE"]
+
+
+def init_rate_limits(limiter, blueprint, exempt=()):
+    """Separate per-endpoint limits for reads (GET) and writes on ``blueprint``
+
+    Views in ``exempt`` (health probes) are not limited at all.
+    """
+    exempt_endpoints = {f"{blueprint.name}.{view.__name__}" for view in exempt}
+
+    def is_exempt():
+        return request.endpoint in exempt_endpoints
+
+    limiter.limit(read_limit, methods=["GET"], exempt_when=is_exempt)(blueprint)
+    limiter.limit(write_limit, methods=["POST", "PUT", "PATCH", "DELETE"], exempt_when=is_exempt)(blueprint)
+    for view in exempt:
+        limiter.exempt(view)
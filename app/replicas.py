@@ -0,0 +1,99 @@
+import itertools
+import time
+
+from flask import current_app, g, request
+from flask_sqlalchemy.session import Session
+
+from app.db_pool import database_url, engine_options
+
+READ_METHODS = ("GET", "HEAD")
+# ตั้งหลัง write สำเร็จ: read ของ client นี้ไปที่ primary จนกว่าจะหมดอายุ
+PRIMARY_COOKIE = "db_primary_until"
+# ค่าเดียวกันสำหรับ client ที่ไม่ส่ง cookie กลับ (cross-origin, ไม่ใช่ browser): ส่ง header นี้กลับมาเอง
+PRIMARY_HEADER = "X-DB-Primary-Until"
+
+
+class RoutingSession(Session):
+    """Session that sends a request's queries to the replica chosen for it
+
+    Only requests routed by ``init_replicas`` carry ``g.db_read_bind``;
+    everything else (writes, flushes, CLI, background threads) uses the
+    primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing:
+            key = g.get("db_read_bind")
+            if key is not None:
+                return self._db.engines[key]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def use_primary(view):
+    """Keep a read-only view on the primary (e.g. health checks)"""
+    view.use_primary = True
+    return view
+
+
+def replica_binds(config):
+    """SQLALCHEMY_BINDS entries for DATABASE_REPLICA_URLS, keyed replica0, replica1, ..."""
+    binds = {}
+    for i, url in enumerate(u.strip() for u in config["DATABASE_REPLICA_URLS"].split(",") if u.strip()):
+        url = database_url(url)
+        # binds ไม่ได้รับ SQLALCHEMY_ENGINE_OPTIONS จึงต้องใส่ pool settings เอง
+        binds[f"replica{i}"] = {"url": url, **engine_options(config)} if url.startswith("postgresql") else url
+    return binds
+
+
+def _recent_writer(now):
+    value = request.headers.get(PRIMARY_HEADER) or request.cookies.get(PRIMARY_COOKIE, 0)
+    try:
+        return float(value) > now
+    except ValueError:
+        return False
+
+
+def init_replicas(app):
+    """Route read-only requests to the DATABASE_REPLICA_URLS round-robin
+
+    GET/HEAD requests go to the next replica unless the view is marked
+    ``use_primary`` or the client wrote within DB_REPLICA_STICKY_SECONDS.
+    A successful write sets the ``db_primary_until`` cookie and the
+    ``X-DB-Primary-Until`` header to the same deadline; a client that
+    sends either back reads its own changes from the primary until
+    replication catches up. Must run before ``db.init_app`` (it adds the replicas to SQLALCHEMY_BINDS).
+    """
+    binds = replica_binds(app.config)
+    if not binds:
+        return
+    app.config["SQLALCHEMY_BINDS"] = {**app.config.get("SQLALCHEMY_BINDS", {}), **binds}
+    keys = list(binds)
+    counter = itertools.count()
+    sticky_seconds = app.config["DB_REPLICA_STICKY_SECONDS"]
+
+    @app.before_request
+    def route_reads():
+        # ตั้งใหม่ทุก request: app context (และ g) อาจถูกใช้ซ้ำข้าม request เช่นใน tests
+        g.db_read_bind = None
+        g.read_your_writes = request.method in READ_METHODS and _recent_writer(time.time())
+        if request.method not in READ_METHODS or g.read_your_writes:
+            # cached_response ข้าม lookup ด้วย: entry อาจถูกเติมจาก replica ที่ยังตามไม่ทัน
+            return
+        view = current_app.view_functions.get(request.endpoint)
+        if view is None or getattr(view, "use_primary", False):
+            return
+        g.db_read_bind = keys[next(counter) % len(keys)]
+
+    @app.after_request
+    def stick_to_primary(response):
+        if request.method not in READ_METHODS + ("OPTIONS",) and response.status_code < 400:
+            until = f"{time.time() + sticky_seconds:.3f}"
+            response.headers[PRIMARY_HEADER] = until
+            response.set_cookie(
+                PRIMARY_COOKIE,
+                until,
+                max_age=sticky_seconds,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
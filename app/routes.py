@@ -1,17 +1,600 @@
-from flask import Blueprint, jsonify
+from datetime import datetime, timedelta
+from functools import wraps
+
+import hmac
+import os
+
+from flask import Blueprint, Response, current_app, jsonify, request, send_file, stream_with_context
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.batch import UPDATABLE_FIELDS, BatchValidationError, apply_operations, validate_fields, validate_operations
+from app.cache import cached_response, get_cache, invalidate_todos, list_key, todo_key
+from app.changes import changes_since, current_change_seq, current_position
+from app.conditional import list_etag, not_modified, precondition_failed, tag_response, todo_etag
+from app.db_pool import pool_status
+from app.health import get_health_monitor
+from app.filters import apply_filters, list_statement, parse_list_filters, sort_field
+from app.jobs import FINISHED, RUNNING, SUCCEEDED, cancel_job, enqueue_job, export_path, validate_job
+from app.models import Job, Todo, db
+from app.pagination import (
+    InvalidCursor,
+    decode_change_token,
+    decode_cursor,
+    decode_rank_cursor,
+    encode_change_token,
+    encode_cursor,
+    encode_rank_cursor,
+    parse_limit,
+)
+from app.replicas import use_primary
+from app.search import search_statement
+from app.serializers import TODO_FIELDS, parse_fields, serialize_rows, todo_columns
+from app.stream import get_change_hub
+from app.tenancy import current_owner
+from app.write_behind import get_write_behind, settle_write_behind
 
 api = Blueprint("api", __name__)
 
+INTERNAL_TOKEN_HEADER = "X-Internal-Token"
+
+
+def internal_only(view):
+    """Serve /api/internal/* only when INTERNAL_ENDPOINTS_ENABLED, and with INTERNAL_TOKEN if set"""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not current_app.config["INTERNAL_ENDPOINTS_ENABLED"]:
+            # ปิดอยู่: ตอบเหมือนไม่มี route นี้
+            return jsonify({"success": False, "error": "Resource not found"}), 404
+        token = current_app.config["INTERNAL_TOKEN"]
+        if token and not hmac.compare_digest(request.headers.get(INTERNAL_TOKEN_HEADER, ""), token):
+            return jsonify({"success": False, "error": f"Invalid {INTERNAL_TOKEN_HEADER} header"}), 401
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
 @api.route("/health", methods=["GET"])
+@use_primary
 def health():
-    return jsonify({"status": "ok"}), 200
+    """Health check endpoint (one DB round trip per call; probes should use live/ready)"""
+    try:
+        db.session.execute(db.text("SELECT 1"))
+        return jsonify({"status": "healthy", "database": "connected"}), 200
+    except Exception as e:
+        return jsonify({
+            "status": "unhealthy",
+            "database": "disconnected",
+            "error": str(e),
+        }), 503
+
+
+@api.route("/health/live", methods=["GET"])
+def health_live():
+    """Liveness probe: the worker is serving requests (no I/O)"""
+    return jsonify({"status": "alive"}), 200
+
+
+@api.route("/health/ready", methods=["GET"])
+def health_ready():
+    """Readiness probe: cached DB check per engine with latency and pool usage
+
+    Answers from the result of the background check (HEALTH_CHECK_INTERVAL),
+    so probing does not add DB round trips. 503 while the primary is
+    unreachable or the last check is older than HEALTH_CHECK_MAX_AGE.
+    """
+    ready, body = get_health_monitor().status()
+    return jsonify(body), 200 if ready else 503
+
+
+# probes ของ orchestrator ไม่นับรวมใน rate limit
+PROBE_VIEWS = (health, health_live, health_ready)
 
 
 @api.route("/todos", methods=["GET"])
+@cached_response(list_key)
 def get_todos():
-    # ตัวอย่างข้อมูลจำลอง
-    todos = [
-        {"id": 1, "title": "Learn Flask", "done": False},
-        {"id": 2, "title": "Setup CI/CD", "done": True}
-    ]
-    return jsonify(todos), 200
+    """Get one page of todos, newest first
+
+    Uses keyset pagination on (created_at, id) so every page costs the same
+    index range scan instead of an OFFSET scan. Rows are selected as plain
+    columns and serialized without hydrating Todo objects; ``fields=``
+    narrows the output to a sparse fieldset. The highest change_seq (an
+    index lookup) yields the ETag, so a matching If-None-Match skips the
+    page query entirely.
+
+    ``completed``, ``created_after``, ``created_before``, ``updated_since``
+    and ``sort`` filter and order the list; each supported shape is backed
+    by an index (see app/filters.py).
+
+    ``q=`` switches to full-text search over title and description, ranked
+    best match first and paginated on (rank, id).
+    """
+    try:
+        limit = parse_limit(
+            request.args.get("limit"),
+            current_app.config["TODOS_PAGE_SIZE"],
+            current_app.config["TODOS_MAX_PAGE_SIZE"],
+        )
+        search = request.args.get("q", "").strip()
+        cursor = request.args.get("cursor")
+        position = None
+        if cursor:
+            position = decode_rank_cursor(cursor) if search else decode_cursor(cursor)
+        fields = parse_fields(request.args.get("fields"))
+        filters = parse_list_filters(request.args)
+    except (InvalidCursor, ValueError) as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    # คอลัมน์ที่ใช้ sort และ id ต้องถูก select เสมอเพื่อสร้าง cursor
+    selected = tuple(dict.fromkeys(fields + (sort_field(filters), "id")))
+    if search:
+        dialect_name = db.session.get_bind().dialect.name
+        stmt = apply_filters(search_statement(dialect_name, search, todo_columns(selected), position), filters)
+    else:
+        stmt = list_statement(todo_columns(selected), filters, position)
+    try:
+        etag = None
+        if not search:
+            etag = list_etag(current_change_seq())
+            unchanged = not_modified(etag)
+            if unchanged is not None:
+                return unchanged
+        # ดึงเกินมา 1 แถวเพื่อดูว่ายังมีหน้าถัดไปหรือไม่
+        rows = db.session.execute(stmt.limit(limit + 1)).all()
+    except SQLAlchemyError:
+        return jsonify({"success": False, "error": "Database error occurred"}), 500
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        if search:
+            next_cursor = encode_rank_cursor(last.rank, last.id)
+        else:
+            next_cursor = encode_cursor(getattr(last, sort_field(filters)), last.id)
+
+    response = jsonify({
+        "success": True,
+        "data": serialize_rows(rows, selected, fields),
+        "count": len(rows),
+        "next_cursor": next_cursor,
+    })
+    if etag is None:
+        # ผลค้นหาไม่ผูกกับ aggregate ทั้งตาราง จึงใช้ hash ของ body แทน
+        response.add_etag()
+        return response.make_conditional(request)
+    return tag_response(response, etag)
+
+
+@api.route("/todos/changes", methods=["GET"])
+def todo_changes():
+    """Todos created, updated or deleted since a sync token
+
+    Omit ``since`` for the initial full sync, then keep passing back
+    ``next_since`` (also while ``has_more`` is true). Each page is a range
+    scan on (change_xid, change_seq), so a sync costs O(changes) rather
+    than O(todos). Changes of transactions still running are held back
+    until they commit (app/changes.py).
+    Tokens older than TODOS_TOMBSTONE_TTL_DAYS may have missed compacted
+    deletes and get 410; the client must then resync from scratch.
+    """
+    try:
+        limit = parse_limit(
+            request.args.get("limit"),
+            current_app.config["TODOS_PAGE_SIZE"],
+            current_app.config["TODOS_MAX_PAGE_SIZE"],
+        )
+        since = request.args.get("since")
+        position, issued_at = decode_change_token(since) if since else ((0, 0), None)
+    except (InvalidCursor, ValueError) as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    now = datetime.utcnow()
+    if issued_at is not None and issued_at < now - timedelta(days=current_app.config["TODOS_TOMBSTONE_TTL_DAYS"]):
+        return jsonify({"success": False, "error": "Sync token expired, full resync required"}), 410
+
+    try:
+        updated, deleted, last_position, has_more = changes_since(position, limit)
+    except SQLAlchemyError:
+        return jsonify({"success": False, "error": "Database error occurred"}), 500
+
+    return jsonify({
+        "success": True,
+        "updated": updated,
+        "deleted": deleted,
+        "next_since": encode_change_token(last_position, now),
+        "has_more": has_more,
+    }), 200
+
+
+@api.route("/todos/export", methods=["GET"])
+def export_todos():
+    """Stream every todo as NDJSON (default) or as a JSON array
+
+    Rows come from a server-side cursor in chunks of EXPORT_CHUNK_SIZE, so
+    memory stays flat regardless of table size.
+    """
+    export_format = request.args.get("format", "ndjson")
+    if export_format not in ("ndjson", "json"):
+        return jsonify({"success": False, "error": "format must be ndjson or json"}), 400
+
+    stmt = (
+        select(*todo_columns(TODO_FIELDS))
+        .order_by(Todo.id)
+        .execution_options(stream_results=True, yield_per=current_app.config["EXPORT_CHUNK_SIZE"])
+    )
+
+    dumps = current_app.json.dumps
+
+    def generate():
+        first = True
+        if export_format == "json":
+            yield "["
+        try:
+            for partition in db.session.execute(stmt).partitions():
+                lines = [dumps(item) for item in serialize_rows(partition, TODO_FIELDS)]
+                if export_format == "ndjson":
+                    yield "\n".join(lines) + "\n"
+                else:
+                    yield ("" if first else ",") + ",".join(lines)
+                first = False
+        except SQLAlchemyError as e:
+            # ส่ง header ไปแล้ว เปลี่ยน status ไม่ได้ ทำได้แค่ log แล้วตัด stream
+            current_app.logger.error(f"❌ Export aborted: {e}")
+            raise
+        if export_format == "json":
+            yield "]"
+
+    mimetype = "application/x-ndjson" if export_format == "ndjson" else "application/json"
+    return Response(stream_with_context(generate()), mimetype=mimetype)
+
+
+@api.route("/todos/stream", methods=["GET"])
+@use_primary
+def stream_todos():
+    """Server-sent events for every change to the caller's todos
+
+    ``todo`` events carry a created or updated todo, ``delete`` events its
+    id. Every event id is a sync token like ``next_since`` of
+    /todos/changes, so a reconnecting EventSource resumes from
+    Last-Event-ID (or ``?since=``) without missing a change; without one
+    the stream starts from now. A comment every SSE_HEARTBEAT_SECONDS keeps
+    idle connections open through proxies. The stream holds no database
+    connection while idle.
+    """
+    since = request.headers.get("Last-Event-ID") or request.args.get("since")
+    try:
+        position, issued_at = decode_change_token(since) if since else (None, None)
+    except InvalidCursor as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    ttl = timedelta(days=current_app.config["TODOS_TOMBSTONE_TTL_DAYS"])
+    if issued_at is not None and issued_at < datetime.utcnow() - ttl:
+        return jsonify({"success": False, "error": "Sync token expired, full resync required"}), 410
+    if position is None:
+        try:
+            position = current_position()
+        except SQLAlchemyError:
+            return jsonify({"success": False, "error": "Database error occurred"}), 500
+
+    hub = get_change_hub()
+    subscription = hub.subscribe(current_owner(), position)
+    if subscription is None:
+        response = jsonify({"success": False, "error": "Too many open streams"})
+        response.status_code = 503
+        response.headers["Retry-After"] = str(current_app.config["SSE_RETRY_MS"] // 1000 or 1)
+        return response
+    heartbeat = current_app.config["SSE_HEARTBEAT_SECONDS"]
+    retry_ms = current_app.config["SSE_RETRY_MS"]
+
+    # ไม่ใช้ stream_with_context: request context (และ DB session) ปิดไปตั้งแต่ตอนนี้
+    def generate():
+        try:
+            yield f"retry: {retry_ms}\n\n"
+            while True:
+                chunk = subscription.next_chunk(heartbeat)
+                if chunk is None:
+                    return
+                yield chunk or ": heartbeat\n\n"
+        finally:
+            hub.unsubscribe(subscription)
+
+    response = Response(generate(), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    # nginx: ส่งทุก event ทันที ไม่ buffer
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+@api.route("/todos/<int:todo_id>", methods=["GET"])
+@cached_response(lambda cache, todo_id: todo_key(todo_id))
+def get_todo(todo_id):
+    """Get a single todo by ID"""
+    try:
+        todo = db.session.get(Todo, todo_id)
+    except SQLAlchemyError:
+        return jsonify({"success": False, "error": "Database error occurred"}), 500
+    if todo is None:
+        return jsonify({"success": False, "error": "Todo not found"}), 404
+
+    etag = todo_etag(todo.id, todo.updated_at)
+    unchanged = not_modified(etag, todo.updated_at)
+    if unchanged is not None:
+        return unchanged
+    return tag_response(jsonify({"success": True, "data": todo.to_dict()}), etag, todo.updated_at)
+
+
+@api.route("/todos", methods=["POST"])
+def create_todo():
+    """Create a new todo"""
+    data = request.get_json(silent=True)
+    if not data or not data.get("title"):
+        return jsonify({"success": False, "error": "Title is required"}), 400
+
+    try:
+        todo = Todo(
+            title=data["title"],
+            description=data.get("description", ""),
+            completed=bool(data.get("completed", False)),
+        )
+        db.session.add(todo)
+        db.session.commit()
+        invalidate_todos()
+        response = jsonify({
+            "success": True,
+            "data": todo.to_dict(),
+            "message": "Todo created successfully",
+        })
+        response.status_code = 201
+        return tag_response(response, todo_etag(todo.id, todo.updated_at), todo.updated_at)
+    except SQLAlchemyError:
+        db.session.rollback()
+        return jsonify({"success": False, "error": "Database error occurred"}), 500
+
+
+@api.route("/todos/<int:todo_id>", methods=["PUT"])
+def update_todo(todo_id):
+    """Update an existing todo
+
+    An If-Match header makes the update conditional on the current ETag.
+    """
+    try:
+        settle_write_behind(todo_id)
+    except SQLAlchemyError:
+        return jsonify({"success": False, "error": "Database error occurred"}), 500
+    todo = db.session.get(Todo, todo_id, with_for_update=bool(request.if_match))
+    if todo is None:
+        return jsonify({"success": False, "error": "Todo not found"}), 404
+    if precondition_failed(todo_etag(todo.id, todo.updated_at)):
+        db.session.rollback()
+        return jsonify({"success": False, "error": "Precondition failed"}), 412
+
+    data = request.get_json(silent=True) or {}
+    try:
+        if "title" in data:
+            todo.title = data["title"]
+        if "description" in data:
+            todo.description = data["description"]
+        if "completed" in data:
+            todo.completed = bool(data["completed"])
+        db.session.commit()
+        invalidate_todos(todo_id)
+        response = jsonify({
+            "success": True,
+            "data": todo.to_dict(),
+            "message": "Todo updated successfully",
+        })
+        return tag_response(response, todo_etag(todo.id, todo.updated_at), todo.updated_at)
+    except SQLAlchemyError:
+        db.session.rollback()
+        return jsonify({"success": False, "error": "Database error occurred"}), 500
+
+
+@api.route("/todos/<int:todo_id>", methods=["PATCH"])
+def patch_todo(todo_id):
+    """Partially update a todo, e.g. ``{"completed": true}``
+
+    With WRITE_BEHIND_ENABLED the update is acknowledged with 202 and
+    written with other pending updates within WRITE_BEHIND_FLUSH_MS.
+    Conditional (If-Match) updates and updates arriving while the buffer
+    is full are written immediately, as with PUT, after any update still
+    queued for the todo.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not any(field in data for field in UPDATABLE_FIELDS):
+        return jsonify({"success": False, "error": "No updatable fields given"}), 400
+    # ตรวจก่อนเข้า buffer: แถวที่เขียนไม่ได้จะรู้ตอน flush เมื่อตอบ 202 ไปแล้ว
+    error = validate_fields(data)
+    if error:
+        return jsonify({"success": False, "error": error}), 400
+
+    buffer = get_write_behind()
+    if buffer is None or request.if_match:
+        return update_todo(todo_id)
+    try:
+        exists = db.session.scalar(select(Todo.id).where(Todo.id == todo_id)) is not None
+    except SQLAlchemyError:
+        return jsonify({"success": False, "error": "Database error occurred"}), 500
+    if not exists:
+        return jsonify({"success": False, "error": "Todo not found"}), 404
+
+    fields = {field: data[field] for field in UPDATABLE_FIELDS if field in data}
+    if not buffer.submit(todo_id, fields):
+        return update_todo(todo_id)
+    return jsonify({
+        "success": True,
+        "data": {"id": todo_id, **fields},
+        "message": "Todo update queued",
+    }), 202
+
+
+@api.route("/todos/<int:todo_id>", methods=["DELETE"])
+def delete_todo(todo_id):
+    """Delete a todo
+
+    An If-Match header makes the delete conditional on the current ETag.
+    """
+    try:
+        settle_write_behind(todo_id)
+    except SQLAlchemyError:
+        return jsonify({"success": False, "error": "Database error occurred"}), 500
+    todo = db.session.get(Todo, todo_id, with_for_update=bool(request.if_match))
+    if todo is None:
+        return jsonify({"success": False, "error": "Todo not found"}), 404
+    if precondition_failed(todo_etag(todo.id, todo.updated_at)):
+        db.session.rollback()
+        return jsonify({"success": False, "error": "Precondition failed"}), 412
+
+    try:
+        db.session.delete(todo)
+        db.session.commit()
+        invalidate_todos(todo_id)
+        return jsonify({"success": True, "message": "Todo deleted successfully"}), 200
+    except SQLAlchemyError:
+        db.session.rollback()
+        return jsonify({"success": False, "error": "Database error occurred"}), 500
+
+
+@api.route("/todos/batch", methods=["POST"])
+def batch_todos():
+    """Apply many create/update/delete operations in one transaction"""
+    try:
+        operations = validate_operations(
+            request.get_json(silent=True), current_app.config["BATCH_MAX_OPERATIONS"]
+        )
+    except BatchValidationError as e:
+        return jsonify({"success": False, "error": str(e), "results": e.results}), 400
+
+    try:
+        settle_write_behind(*(operation["id"] for operation in operations if operation["op"] != "create"))
+        results = apply_operations(operations)
+        db.session.commit()
+    except SQLAlchemyError:
+        db.session.rollback()
+        return jsonify({"success": False, "error": "Database error occurred"}), 500
+    invalidate_todos(*(r["id"] for r in results if r["op"] != "create" and r["status"] == 200))
+
+    return jsonify({"success": True, "results": results, "count": len(results)}), 200
+
+
+@api.route("/jobs", methods=["POST"])
+def create_job():
+    """Queue a background job; poll GET /api/jobs/<id> for its progress
+
+    ``{"kind": "import", "params": {"todos": [...]}}``, ``export``,
+    ``complete`` (``{"completed": true}``) or ``purge`` (deletes completed
+    todos; ``{"completed": null}`` deletes all). Jobs run in
+    ``python worker.py`` instead of a request thread.
+    """
+    try:
+        kind, params = validate_job(request.get_json(silent=True), current_app.config)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    try:
+        job = enqueue_job(kind, params, current_app.config["JOBS_MAX_ATTEMPTS"])
+    except SQLAlchemyError:
+        db.session.rollback()
+        return jsonify({"success": False, "error": "Database error occurred"}), 500
+    response = jsonify({"success": True, "data": job.to_dict(), "message": "Job queued"})
+    response.status_code = 202
+    response.headers["Location"] = f"/api/jobs/{job.id}"
+    return response
+
+
+@api.route("/jobs/<int:job_id>", methods=["GET"])
+def get_job(job_id):
+    """Job status, progress (processed/total), attempts, error and result"""
+    try:
+        job = db.session.get(Job, job_id)
+    except SQLAlchemyError:
+        return jsonify({"success": False, "error": "Database error occurred"}), 500
+    if job is None:
+        return jsonify({"success": False, "error": "Job not found"}), 404
+    return jsonify({"success": True, "data": job.to_dict()}), 200
+
+
+@api.route("/jobs/<int:job_id>/cancel", methods=["POST"])
+def cancel_job_route(job_id):
+    """Cancel a queued job (200), or stop a running one after its current chunk (202)"""
+    job = db.session.get(Job, job_id)
+    if job is None:
+        return jsonify({"success": False, "error": "Job not found"}), 404
+    if job.status in FINISHED:
+        return jsonify({"success": False, "error": f"Job already {job.status}"}), 409
+    try:
+        cancel_job(job_id)
+    except SQLAlchemyError:
+        db.session.rollback()
+        return jsonify({"success": False, "error": "Database error occurred"}), 500
+    job = db.session.get(Job, job_id)
+    return jsonify({"success": True, "data": job.to_dict()}), 202 if job.status == RUNNING else 200
+
+
+@api.route("/jobs/<int:job_id>/download", methods=["GET"])
+def download_job_result(job_id):
+    """NDJSON file written by a finished export job"""
+    job = db.session.get(Job, job_id)
+    if job is None or job.kind != "export":
+        return jsonify({"success": False, "error": "Job not found"}), 404
+    if job.status != SUCCEEDED:
+        return jsonify({"success": False, "error": f"Job is {job.status}"}), 409
+    path = export_path(job_id)
+    if not os.path.exists(path):
+        # JOBS_RESULT_DIR ต้องเป็น volume เดียวกับของ worker
+        return jsonify({"success": False, "error": "Export file not found"}), 404
+    response = send_file(
+        path, mimetype="application/x-ndjson", as_attachment=True, download_name=f"todos-{job_id}.ndjson", max_age=0
+    )
+    # ข้อมูลของ owner คนเดียว: proxy/CDN ห้ามเก็บไว้
+    response.headers["Cache-Control"] = "private, no-store"
+    return response
+
+
+@api.route("/internal/cache", methods=["GET"])
+@internal_only
+def cache_stats():
+    """Response cache hit/miss/eviction counters"""
+    cache = get_cache()
+    return jsonify({"enabled": cache is not None, **(cache.stats() if cache else {})}), 200
+
+
+@api.route("/internal/write-behind", methods=["GET"])
+@internal_only
+def write_behind_stats():
+    """Write-behind buffer counters for PATCH"""
+    buffer = get_write_behind()
+    return jsonify({"enabled": buffer is not None, **(buffer.stats() if buffer else {})}), 200
+
+
+@api.route("/internal/stream", methods=["GET"])
+@internal_only
+def stream_stats():
+    """Open change streams and LISTEN/dispatch counters for this process"""
+    return jsonify(get_change_hub().stats()), 200
+
+
+@api.route("/internal/ratelimit", methods=["GET"])
+@internal_only
+def rate_limit_stats():
+    """Rate limiter storage and local pre-check counters"""
+    limiters = current_app.extensions.get("limiter")
+    if not limiters:
+        return jsonify({"enabled": False}), 200
+    storage = next(iter(limiters)).storage
+    return jsonify({
+        "enabled": True,
+        "storage": type(storage).__name__,
+        "strategy": current_app.config["RATELIMIT_STRATEGY"],
+        **(storage.stats() if hasattr(storage, "stats") else {}),
+    }), 200
+
+
+@api.route("/internal/pool", methods=["GET"])
+@internal_only
+def pool_stats():
+    """Connection pool usage and checkout wait times, per engine"""
+    return jsonify({
+        (name or "default"): pool_status(engine) for name, engine in db.engines.items()
+    }), 200
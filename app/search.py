@@ -0,0 +1,82 @@
+from sqlalchemy import Double, column, event, func, literal_column, select, table, tuple_
+
+from app.models import Todo
+
+# 'simple' = no stemming/stop words, so Thai and English titles behave the same
+SEARCH_CONFIG = "simple"
+
+POSTGRES_DDL = (
+    "ALTER TABLE todos ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    f"GENERATED ALWAYS AS (to_tsvector('{SEARCH_CONFIG}', "
+    "coalesce(title, '') || ' ' || coalesce(description, ''))) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_todos_search_vector ON todos USING gin (search_vector)",
+)
+
+# SQLite (tests): external-content FTS5 table kept in sync by triggers
+SQLITE_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS todos_fts USING fts5("
+    "title, description, content='todos', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS todos_fts_ai AFTER INSERT ON todos BEGIN "
+    "INSERT INTO todos_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS todos_fts_ad AFTER DELETE ON todos BEGIN "
+    "INSERT INTO todos_fts(todos_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS todos_fts_au AFTER UPDATE OF title, description ON todos BEGIN "
+    "INSERT INTO todos_fts(todos_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO todos_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+)
+SQLITE_DROP = (
+    "DROP TRIGGER IF EXISTS todos_fts_ai",
+    "DROP TRIGGER IF EXISTS todos_fts_ad",
+    "DROP TRIGGER IF EXISTS todos_fts_au",
+    "DROP TABLE IF EXISTS todos_fts",
+)
+
+todos_fts = table("todos_fts", column("rowid"))
+
+
+@event.listens_for(Todo.__table__, "after_create")
+def create_search_index(target, connection, **kw):
+    """Add the search index whenever the todos table is created via create_all"""
+    statements = {"postgresql": POSTGRES_DDL, "sqlite": SQLITE_DDL}.get(connection.dialect.name, ())
+    for statement in statements:
+        connection.exec_driver_sql(statement)
+
+
+@event.listens_for(Todo.__table__, "before_drop")
+def drop_search_index(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        for statement in SQLITE_DROP:
+            connection.exec_driver_sql(statement)
+
+
+def _fts5_query(text):
+    # ครอบทุกคำด้วย "..." เพื่อไม่ให้ผู้ใช้ส่ง FTS5 syntax เข้ามาได้
+    return " ".join('"' + term.replace('"', '""') + '"' for term in text.split())
+
+
+def search_statement(dialect_name, text, columns, position=None):
+    """Ranked full-text search over title and description
+
+    Returns a select of ``columns`` plus a ``rank`` column (higher is
+    better), ordered by (rank, id) descending so it can be keyset paginated
+    from ``position``.
+    """
+    if dialect_name == "postgresql":
+        query = func.websearch_to_tsquery(SEARCH_CONFIG, text)
+        vector = literal_column("todos.search_vector")
+        # ts_rank_cd คืน real; cast เป็น double เพื่อให้ค่าใน cursor เทียบกลับได้ตรงทุก bit
+        rank = func.ts_rank_cd(vector, query).cast(Double)
+        stmt = select(*columns, rank.label("rank")).where(vector.op("@@")(query))
+    else:
+        # bm25() เป็นค่าติดลบ ยิ่งน้อยยิ่งตรง จึงกลับเครื่องหมาย
+        rank = -func.bm25(literal_column("todos_fts"))
+        stmt = (
+            select(*columns, rank.label("rank"))
+            .join(todos_fts, todos_fts.c.rowid == Todo.id)
+            .where(literal_column("todos_fts").op("MATCH")(_fts5_query(text)))
+        )
+    if position is not None:
+        stmt = stmt.where(tuple_(rank, Todo.id) < position)
+    return stmt.order_by(rank.desc(), Todo.id.desc())
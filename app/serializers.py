@@ -0,0 +1,33 @@
+from app.models import Todo
+
+TODO_FIELDS = ("id", "title", "description", "completed", "created_at", "updated_at")
+
+
+def parse_fields(value):
+    """Parse the ``fields=`` sparse fieldset parameter against the allow-list"""
+    if not value:
+        return TODO_FIELDS
+    fields = tuple(dict.fromkeys(f.strip() for f in value.split(",") if f.strip()))
+    unknown = [f for f in fields if f not in TODO_FIELDS]
+    if not fields or unknown:
+        raise ValueError("fields must be a comma separated subset of: " + ", ".join(TODO_FIELDS))
+    return fields
+
+
+def todo_columns(fields):
+    """Return the Todo columns for ``fields``, for column-projected selects"""
+    return [getattr(Todo, field) for field in fields]
+
+
+def serialize_rows(rows, selected, fields=None):
+    """Serialize Core rows into dicts without building Todo objects
+
+    ``selected`` names the columns of each row in order; ``fields`` picks
+    which of them go into the output (default: all). Timestamps stay
+    ``datetime`` objects; the app's JSON provider writes them as ISO 8601.
+    """
+    fields = fields or selected
+    if fields == selected:
+        return [dict(zip(fields, row)) for row in rows]
+    indexes = [selected.index(field) for field in fields]
+    return [dict(zip(fields, [row[i] for i in indexes])) for row in rows]
@@ -0,0 +1,317 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from flask import current_app, g, has_app_context
+from sqlalchemy import event
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.changes import change_events
+from app.models import Todo, db
+from app.pagination import encode_change_token
+from app.replicas import RoutingSession
+from app.serializers import TODO_FIELDS, serialize_rows
+from app.tenancy import current_owner
+
+logger = logging.getLogger("app.stream")
+
+CHANNEL = "todo_changes"
+# owner ที่ถูกเขียนใน transaction นี้ (session.info) รอ publish ตอน commit
+PENDING_KEY = "stream_owners"
+
+# Postgres: NOTIFY the owner of every changed todo when the transaction
+# commits. Identical payloads in one transaction are folded into one
+# notification, so a batch of 500 writes wakes each listener once.
+POSTGRES_DDL = (
+    "CREATE OR REPLACE FUNCTION todos_notify_change() RETURNS trigger LANGUAGE plpgsql AS $$ "
+    "BEGIN "
+    f"IF TG_OP = 'DELETE' THEN PERFORM pg_notify('{CHANNEL}', OLD.owner_id); "
+    f"ELSE PERFORM pg_notify('{CHANNEL}', NEW.owner_id); END IF; "
+    "RETURN NULL; END $$",
+    "CREATE TRIGGER todos_notify_change AFTER INSERT OR UPDATE OR DELETE ON todos "
+    "FOR EACH ROW EXECUTE FUNCTION todos_notify_change()",
+)
+
+
+@event.listens_for(Todo.__table__, "after_create")
+def create_change_notify(target, connection, **kw):
+    """Install the NOTIFY trigger whenever todos is created via create_all (Postgres)"""
+    if connection.dialect.name == "postgresql":
+        for statement in POSTGRES_DDL:
+            connection.exec_driver_sql(statement)
+
+
+class Subscription:
+    """One open stream: its owner, the feed position it was sent up to and a bounded buffer"""
+
+    def __init__(self, owner, position, max_queued):
+        self.owner = owner
+        self.position = position
+        self.max_queued = max_queued
+        self.overflowed = False
+        self._events = deque()
+        self._wake = threading.Event()
+
+    def push(self, events):
+        """Queue the ``(position, text)`` events this stream has not seen (hub thread)"""
+        fresh = [text for position, text in events if position > self.position]
+        if not fresh:
+            return
+        if len(self._events) + len(fresh) > self.max_queued:
+            # client ช้าเกินไป: ปิด stream แล้วให้ EventSource ต่อใหม่จาก Last-Event-ID
+            self.overflowed = True
+        else:
+            self._events.extend(fresh)
+        self.position = events[-1][0]
+        self._wake.set()
+
+    def next_chunk(self, timeout):
+        """Queued events as one chunk; "" after ``timeout`` without any, None once overflowed"""
+        if not self._events and not self.overflowed:
+            self._wake.wait(timeout)
+        self._wake.clear()
+        if self.overflowed:
+            return None
+        chunks = []
+        while self._events:
+            chunks.append(self._events.popleft())
+        return "".join(chunks)
+
+
+class ChangeHub:
+    """Fan todo changes out to the open streams of this process
+
+    Changes are signalled per owner: by Postgres NOTIFY on one LISTEN
+    connection per process, so every process hears every write, or on
+    other databases by commits in this process only. On a signal one
+    thread reads that owner's change feed once, from the oldest position
+    among its streams, and hands each stream the events it has not seen:
+    idle streams cost no queries, and a write costs one query per owner
+    per process however many streams are open.
+
+    The feed stops at the oldest running transaction (app/changes.py).
+    An owner whose changes were held back there is read again every
+    ``retry_seconds`` until they come through: the transaction that held
+    them may notify another owner, or none at all.
+    """
+
+    def __init__(self, app, listen=False, max_connections=100, max_queued=1000, page_size=200,
+                 retry_seconds=1.0):
+        self.app = app
+        self.listen = listen
+        self.max_connections = max_connections
+        self.max_queued = max_queued
+        self.page_size = page_size
+        self.retry_seconds = retry_seconds
+        self.notifications = self.dispatches = self.rejected = 0
+        self.listening = False
+        self._subscribers = {}
+        # owner ที่ต้องอ่าน feed ใหม่; None = ทุก owner
+        self._dirty = set()
+        # owner ที่ยังมี change รอ transaction อื่น commit
+        self._waiting = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._threads = []
+        self._pid = None
+
+    def subscribe(self, owner, position):
+        """Open a stream for ``owner`` after feed ``position``; None when at max_connections"""
+        subscription = Subscription(owner, position, self.max_queued)
+        with self._lock:
+            if self.connections() >= self.max_connections:
+                self.rejected += 1
+                return None
+            self._subscribers.setdefault(owner, set()).add(subscription)
+            self._ensure_threads()
+        # อ่าน feed ทันที: ส่งสิ่งที่เปลี่ยนหลัง position (resume) หรือระหว่างที่เพิ่ง subscribe
+        self.publish(owner)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscribers.get(subscription.owner, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self._subscribers.pop(subscription.owner, None)
+
+    def connections(self):
+        return sum(len(subscriptions) for subscriptions in self._subscribers.values())
+
+    def publish(self, owner=None):
+        """Signal that ``owner``'s todos changed (None: any owner's)"""
+        with self._lock:
+            self._dirty.add(owner)
+        self._wake.set()
+
+    def dispatch(self):
+        """Read the feed for every signalled owner and push the events to its streams"""
+        with self._lock:
+            dirty, self._dirty = self._dirty | self._waiting, set()
+            owners = self._subscribers if None in dirty else [owner for owner in dirty if owner in self._subscribers]
+            targets = {owner: list(self._subscribers[owner]) for owner in owners}
+        for owner, subscriptions in targets.items():
+            try:
+                held_back = self._dispatch(owner, subscriptions)
+            except SQLAlchemyError as e:
+                logger.warning(f"⚠️ Change stream read failed for {owner}, retrying: {e}")
+                with self._lock:
+                    self._dirty.add(owner)
+                time.sleep(self.retry_seconds)
+                self._wake.set()
+                continue
+            with self._lock:
+                (self._waiting.add if held_back else self._waiting.discard)(owner)
+
+    def _dispatch(self, owner, subscriptions):
+        """Push ``owner``'s new events; True when some are held back behind the horizon"""
+        position = min(subscription.position for subscription in subscriptions)
+        dumps = self.app.json.dumps
+        with self.app.app_context():
+            # อ่านเฉพาะ feed ของ owner นี้ (app/tenancy.py)
+            g.owner_id = owner
+            while True:
+                events, has_more, held_back = change_events(position, self.page_size)
+                if not events:
+                    return held_back
+                issued_at = datetime.utcnow()
+                # todo ที่เปลี่ยนหลายครั้งในหน้านี้: ส่งเฉพาะครั้งล่าสุด (ทุกครั้งมีสถานะปัจจุบันอยู่แล้ว)
+                last = {todo_id: index for index, (_, todo_id, _) in enumerate(events)}
+                rendered = [
+                    (event_position, render_event(event_position, todo_id, row, issued_at, dumps))
+                    for index, (event_position, todo_id, row) in enumerate(events)
+                    if last[todo_id] == index
+                ]
+                for subscription in subscriptions:
+                    subscription.push(rendered)
+                self.dispatches += 1
+                position = events[-1][0]
+                if not has_more:
+                    return held_back
+
+    def _ensure_threads(self):
+        # thread ไม่ตามมาหลัง fork (gunicorn --preload) จึงเช็ค pid ด้วย
+        if self._threads and self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        targets = [self._run] + ([self._listen] if self.listen else [])
+        self._threads = [
+            threading.Thread(target=target, name=f"change-{target.__name__.strip('_')}", daemon=True)
+            for target in targets
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.retry_seconds if self._waiting else None)
+            self._wake.clear()
+            if not self._stopped:
+                self.dispatch()
+
+    def _listen(self):
+        import psycopg
+
+        with self.app.app_context():
+            conninfo = db.engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        while not self._stopped:
+            try:
+                with psycopg.connect(conninfo, autocommit=True) as connection:
+                    connection.execute(f"LISTEN {CHANNEL}")
+                    self.listening = True
+                    # อาจพลาด notification ระหว่างต่อใหม่: ให้ทุก owner อ่าน feed อีกรอบ
+                    self.publish(None)
+                    while not self._stopped:
+                        for notify in connection.notifies(timeout=1.0):
+                            self.notifications += 1
+                            self.publish(notify.payload)
+            except psycopg.Error as e:
+                self.listening = False
+                logger.warning(f"⚠️ LISTEN {CHANNEL} connection lost, reconnecting: {e}")
+                time.sleep(self.retry_seconds)
+
+    def close(self):
+        self._stopped = True
+        self._wake.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "mode": "listen" if self.listen else "local",
+                "listening": self.listening,
+                "connections": self.connections(),
+                "owners": len(self._subscribers),
+                "waiting": len(self._waiting),
+                "max_connections": self.max_connections,
+                "rejected": self.rejected,
+                "notifications": self.notifications,
+                "dispatches": self.dispatches,
+            }
+
+
+def render_event(position, todo_id, row, issued_at, dumps):
+    """One SSE event; its id is a /api/todos/changes sync token"""
+    token = encode_change_token(position, issued_at)
+    if row is None:
+        return f"id: {token}\nevent: delete\ndata: {dumps({'id': todo_id})}\n\n"
+    return f"id: {token}\nevent: todo\ndata: {dumps(serialize_rows([row], TODO_FIELDS)[0])}\n\n"
+
+
+def _mark_owner(session):
+    session.info.setdefault(PENDING_KEY, set()).add(current_owner())
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _track_todo_statements(state):
+    # INSERT/UPDATE/DELETE บน todos ทั้งแบบ ORM และ Core (write-behind) ผ่าน session.execute
+    if state.is_insert or state.is_update or state.is_delete:
+        if getattr(getattr(state.statement, "table", None), "name", None) == Todo.__tablename__:
+            _mark_owner(state.session)
+
+
+@event.listens_for(RoutingSession, "before_flush")
+def _track_todo_flush(session, flush_context, instances):
+    if any(isinstance(obj, Todo) for obj in (*session.new, *session.dirty, *session.deleted)):
+        _mark_owner(session)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _publish_commit(session):
+    """Signal the local hub after a commit that wrote todos (databases without NOTIFY)"""
+    owners = session.info.pop(PENDING_KEY, None)
+    if not owners or not has_app_context():
+        return
+    hub = current_app.extensions.get("change_hub")
+    if hub is not None and not hub.listen:
+        for owner in owners:
+            hub.publish(owner)
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _discard_pending(session):
+    session.info.pop(PENDING_KEY, None)
+
+
+def init_stream(app):
+    """Create the change hub behind GET /api/todos/stream
+
+    Postgres fans out from LISTEN/NOTIFY. Other databases (SQLite in
+    tests and development) only see writes committed by this process.
+    """
+    hub = ChangeHub(
+        app,
+        listen=app.config["SQLALCHEMY_DATABASE_URI"].startswith("postgresql"),
+        max_connections=app.config["SSE_MAX_CONNECTIONS"],
+        max_queued=app.config["SSE_QUEUE_SIZE"],
+        page_size=app.config["TODOS_MAX_PAGE_SIZE"],
+    )
+    app.extensions["change_hub"] = hub
+    return hub
+
+
+def get_change_hub():
+    return current_app.extensions["change_hub"]
@@ -1,7 +1,14 @@
+import hashlib
+import os
+
 from flask_swagger_ui import get_swaggerui_blueprint
 
 SWAGGER_URL = '/docs'  # URL ที่ใช้เปิด Swagger UI
-API_URL = '/static/swagger.json'  # ไฟล์ swagger.json ที่จะอ้างอิง API schema
+
+# ?v=<hash ของไฟล์> ทำให้ cache /static ได้นาน: ไฟล์เปลี่ยน URL ก็เปลี่ยน
+with open(os.path.join(os.path.dirname(__file__), 'static', 'swagger.json'), 'rb') as _f:
+    SPEC_VERSION = hashlib.sha1(_f.read()).hexdigest()[:12]
+API_URL = f'/static/swagger.json?v={SPEC_VERSION}'  # ไฟล์ swagger.json ที่จะอ้างอิง API schema
 
 swagger_ui_blueprint = get_swaggerui_blueprint(
     SWAGGER_URL,
@@ -0,0 +1,68 @@
+import re
+
+from flask import g, has_app_context, jsonify, request
+from sqlalchemy import event
+from sqlalchemy.orm import with_loader_criteria
+
+from app.models import DEFAULT_OWNER, Job, Todo, TodoTombstone
+from app.replicas import RoutingSession
+
+OWNER_PATTERN = re.compile(r"^[A-Za-z0-9._@:-]{1,64}$")
+OWNED_MODELS = (Todo, TodoTombstone, Job)
+OWNED_PATHS = ("/api/todos", "/api/jobs")
+
+
+def current_owner():
+    """Owner of the current request, or None outside a request (CLI, background threads)"""
+    return g.get("owner_id") if has_app_context() else None
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _scope_to_owner(state):
+    """Add ``owner_id = <current owner>`` to every ORM select/update/delete of owned models
+
+    Applies to statements built from the models (``select(Todo.id)``,
+    ``db.session.get``, ``delete(Todo)``). Core statements on
+    ``Todo.__table__`` and ORM bulk UPDATE by primary key are not
+    filtered; callers only pass them ids read through a scoped select.
+    """
+    owner = current_owner()
+    if owner is None or state.is_column_load or state.is_relationship_load:
+        return
+    if state.is_select or state.is_update or state.is_delete:
+        state.statement = state.statement.options(*(
+            with_loader_criteria(model, model.owner_id == owner, include_aliases=True) for model in OWNED_MODELS
+        ))
+
+
+def init_tenancy(app):
+    """Scope /api/todos and /api/jobs requests to the owner named by the OWNER_HEADER request header
+
+    The header is trusted as-is: it must be set by the authenticating
+    proxy in front of the API, never passed through from end users.
+    Requests without it act as DEFAULT_OWNER unless OWNER_REQUIRED is set.
+    """
+    header = app.config["OWNER_HEADER"]
+    required = app.config["OWNER_REQUIRED"]
+
+    @app.before_request
+    def identify_owner():
+        # ตั้งใหม่ทุก request: app context (และ g) อาจถูกใช้ซ้ำข้าม request เช่นใน tests
+        g.owner_id = None
+        if not request.path.startswith(OWNED_PATHS):
+            return None
+        owner = request.headers.get(header)
+        if owner is None:
+            if required:
+                return jsonify({"success": False, "error": f"{header} header is required"}), 401
+            owner = DEFAULT_OWNER
+        elif not OWNER_PATTERN.match(owner):
+            return jsonify({"success": False, "error": f"Invalid {header} header"}), 400
+        g.owner_id = owner
+        return None
+
+    @app.after_request
+    def vary_on_owner(response):
+        if request.path.startswith(OWNED_PATHS):
+            response.vary.add(header)
+        return response
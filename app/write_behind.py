@@ -0,0 +1,228 @@
+import atexit
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from flask import current_app
+from sqlalchemy import bindparam, update
+from sqlalchemy.exc import DataError, IntegrityError, ProgrammingError, SQLAlchemyError
+
+from app.cache import invalidate_todos
+from app.models import Todo, db
+
+logger = logging.getLogger("app.write_behind")
+
+# error ของค่าในแถวเอง: เขียนซ้ำกี่ครั้งก็ไม่ผ่าน
+ROW_ERRORS = (DataError, IntegrityError, ProgrammingError)
+
+# buffer ของทุก app ใน process นี้ (flush ตอน worker ปิด)
+_buffers = []
+
+
+class WriteBehindBuffer:
+    """Coalesce PATCH updates per todo and write them in batches
+
+    ``submit`` merges the fields into the pending entry for that id (last
+    write wins per field) and returns immediately. A background thread
+    writes everything pending every ``flush_interval`` seconds, or as soon
+    as ``flush_size`` ids are pending, with one executemany UPDATE per set
+    of fields in a single transaction.
+
+    Durability: an acknowledged update lives only in this worker's memory
+    until its flush commits. Graceful shutdown flushes (``close``); a crash
+    or SIGKILL loses at most the updates acknowledged since the last flush.
+    When a batch fails it is written again one id at a time: an update
+    the database rejects (ROW_ERRORS) is logged and dropped so it cannot
+    hold up the others; on any other error the rest is merged back behind
+    newer updates and retried.
+
+    Ordering: PUT, DELETE and batch writes call ``settle`` for their ids
+    first, so a queued PATCH never lands after a direct write that
+    followed it. This holds within one process only; each gunicorn
+    worker has its own buffer.
+    """
+
+    def __init__(self, app, flush_interval=0.2, flush_size=100, max_pending=1000):
+        self.app = app
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.max_pending = max_pending
+        self.submitted = self.coalesced = self.rejected = 0
+        self.flushes = self.written = self.failures = self.dropped = 0
+        self._pending = OrderedDict()
+        self._lock = threading.Lock()
+        # flush ทีละรอบ: batch ที่ส่งก่อน commit ก่อนเสมอ
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread = None
+        self._pid = None
+
+    def submit(self, todo_id, fields):
+        """Queue ``fields`` for ``todo_id``; False when the buffer is full"""
+        with self._lock:
+            if self._stopped:
+                return False
+            entry = self._pending.get(todo_id)
+            if entry is not None:
+                entry.update(fields)
+                self.coalesced += 1
+            elif len(self._pending) >= self.max_pending:
+                self.rejected += 1
+                return False
+            else:
+                self._pending[todo_id] = dict(fields)
+            self.submitted += 1
+            if len(self._pending) >= self.flush_size:
+                self._wake.set()
+            self._ensure_thread()
+        return True
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self):
+        """Write everything pending now; returns the number of ids written"""
+        try:
+            return self._flush()
+        except SQLAlchemyError:
+            return 0
+
+    def settle(self, *todo_ids):
+        """Write the pending updates of ``todo_ids`` ahead of a direct write to them
+
+        Also waits for a flush already in progress. Raises SQLAlchemyError
+        when the database cannot be written; the updates stay queued.
+        """
+        return self._flush(todo_ids)
+
+    def _flush(self, todo_ids=None):
+        with self._flush_lock:
+            with self._lock:
+                if todo_ids is None:
+                    batch, self._pending = self._pending, OrderedDict()
+                else:
+                    batch = OrderedDict(
+                        (todo_id, self._pending.pop(todo_id)) for todo_id in todo_ids if todo_id in self._pending
+                    )
+            if not batch:
+                return 0
+            try:
+                with self.app.app_context():
+                    written = self._write(batch)
+            except SQLAlchemyError:
+                written = self._write_each(batch)
+            with self._lock:
+                self.flushes += 1
+                self.written += written
+            return written
+
+    def _write_each(self, batch):
+        written = 0
+        items = list(batch.items())
+        for index, (todo_id, fields) in enumerate(items):
+            try:
+                with self.app.app_context():
+                    written += self._write({todo_id: fields})
+            except ROW_ERRORS as e:
+                with self._lock:
+                    self.dropped += 1
+                logger.error(f"❌ Write-behind update of todo {todo_id} rejected, dropped: {e}")
+            except SQLAlchemyError as e:
+                with self._lock:
+                    self.failures += 1
+                    self.written += written
+                    for pending_id, pending_fields in items[index:]:
+                        newer = self._pending.pop(pending_id, {})
+                        self._pending[pending_id] = {**pending_fields, **newer}
+                logger.warning(f"⚠️ Write-behind flush failed, {len(items) - index} updates kept for retry: {e}")
+                raise
+        return written
+
+    def _write(self, batch):
+        groups = {}
+        for todo_id, fields in batch.items():
+            groups.setdefault(tuple(sorted(fields)), []).append({"todo_id": todo_id, **fields})
+        table = Todo.__table__
+        try:
+            # id ที่ถูกลบไปแล้วระหว่างรอ flush จะไม่ match แถวไหน
+            for params in groups.values():
+                db.session.execute(update(table).where(table.c.id == bindparam("todo_id")), params)
+            db.session.commit()
+        except SQLAlchemyError:
+            db.session.rollback()
+            raise
+        invalidate_todos(*batch)
+        return len(batch)
+
+    def _ensure_thread(self):
+        # thread ไม่ตามมาหลัง fork (gunicorn --preload) จึงเช็ค pid ด้วย
+        if self._thread is None or self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def close(self):
+        """Stop accepting updates and flush what is pending"""
+        with self._lock:
+            self._stopped = True
+        self._wake.set()
+        if self in _buffers:
+            _buffers.remove(self)
+        return self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pending": len(self._pending),
+                "submitted": self.submitted,
+                "coalesced": self.coalesced,
+                "rejected": self.rejected,
+                "flushes": self.flushes,
+                "written": self.written,
+                "failures": self.failures,
+                "dropped": self.dropped,
+            }
+
+
+def close_write_behind():
+    """Flush every buffer in this process (gunicorn worker_exit, atexit)"""
+    for buffer in list(_buffers):
+        buffer.close()
+
+
+atexit.register(close_write_behind)
+
+
+def init_write_behind(app):
+    """Create the PATCH write-behind buffer when WRITE_BEHIND_ENABLED is set"""
+    buffer = None
+    if app.config["WRITE_BEHIND_ENABLED"]:
+        buffer = WriteBehindBuffer(
+            app,
+            flush_interval=app.config["WRITE_BEHIND_FLUSH_MS"] / 1000,
+            flush_size=app.config["WRITE_BEHIND_FLUSH_SIZE"],
+            max_pending=app.config["WRITE_BEHIND_MAX_PENDING"],
+        )
+        _buffers.append(buffer)
+    app.extensions["write_behind"] = buffer
+    return buffer
+
+
+def get_write_behind():
+    return current_app.extensions.get("write_behind")
+
+
+def settle_write_behind(*todo_ids):
+    """Write any PATCH still queued for ``todo_ids`` before a direct write to them"""
+    buffer = get_write_behind()
+    if buffer is not None:
+        buffer.settle(*todo_ids)
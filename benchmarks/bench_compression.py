@@ -0,0 +1,76 @@
+"""Benchmark response compression: CPU cost vs bytes saved
+
+Usage:
+    python benchmarks/bench_compression.py [--items 10 50 200 1000 10000]
+
+Encodes GET /api/todos-shaped bodies with ``--items`` todos through the
+app's JSON provider, then compresses each with every installed codec at
+the levels from Config (what the API uses per request). Reports the
+compression time, the bytes saved, and how long those bytes take to send
+at --link-mbps, so the CPU cost can be weighed against transfer time.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from app.compression import available_codecs  # noqa: E402
+
+
+def body(app, items):
+    start = datetime(2026, 1, 1)
+    todos = [
+        {
+            "id": i,
+            "title": f"Todo {i}",
+            "description": "benchmark row",
+            "completed": i % 3 == 0,
+            "created_at": start + timedelta(minutes=i),
+            "updated_at": start + timedelta(minutes=i, seconds=i % 60),
+        }
+        for i in range(items)
+    ]
+    return app.json.dumps({"success": True, "data": todos, "count": items, "next_cursor": None}).encode()
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, nargs="*", default=[10, 50, 200, 1000, 10000])
+    parser.add_argument("--link-mbps", type=float, default=10.0)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_app("testing")
+    codecs = available_codecs(app.config)
+    print(
+        f"{'items':>6} {'bytes':>9} {'codec':>5} {'out':>8} {'ratio':>6} {'cpu (ms)':>9}"
+        f" {'saved (KB)':>11} {f'transfer saved @{args.link_mbps:g}Mbps (ms)':>34}"
+    )
+    for items in args.items:
+        data = body(app, items)
+        for name, codec in codecs.items():
+            out = codec.compress(data)
+            cpu = best_of(lambda: codec.compress(data), args.repeat)
+            saved = len(data) - len(out)
+            transfer_saved = saved * 8 / (args.link_mbps * 1_000_000)
+            print(
+                f"{items:>6} {len(data):>9} {name:>5} {len(out):>8} {len(data) / len(out):>5.1f}x"
+                f" {cpu * 1000:>9.3f} {saved / 1024:>11.1f} {transfer_saved * 1000:>34.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Benchmark the latency the rate limiter adds to each request
+
+Usage:
+    python benchmarks/bench_rate_limit.py [--requests N] [--clients N] [--rtt MS]
+
+Drives GET /api/todos/changes?limit=1 through the Flask test client with
+requests spread over ``--clients`` addresses and reports p50/p99 per
+storage setup, minus the p50/p99 with the limiter disabled. The shared
+storage is simulated by an in-memory storage that sleeps ``--rtt`` per call,
+so it needs no Redis.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from limits.storage import MemoryStorage  # noqa: E402
+
+from app import create_app  # noqa: E402
+from app.config import TestingConfig  # noqa: E402
+from app.models import db  # noqa: E402
+from app.rate_limit import LocalBucketStorage  # noqa: E402
+
+
+class SimulatedRemoteStorage(MemoryStorage):
+    """MemoryStorage with a network round trip per call"""
+
+    STORAGE_SCHEME = ["simulated"]
+
+    def __init__(self, uri=None, rtt=0.0005, **options):
+        super().__init__(uri, **options)
+        self.rtt = rtt
+
+    def acquire_entry(self, *args, **kwargs):
+        time.sleep(self.rtt)
+        return super().acquire_entry(*args, **kwargs)
+
+    def get_moving_window(self, *args, **kwargs):
+        time.sleep(self.rtt)
+        return super().get_moving_window(*args, **kwargs)
+
+
+class LocalSimulatedStorage(LocalBucketStorage):
+    STORAGE_SCHEME = ["local+simulated"]
+
+
+def run(setup, requests, clients, rtt):
+    TestingConfig.RATELIMIT_ENABLED = setup != "disabled"
+    TestingConfig.RATELIMIT_STORAGE_URI = "memory://" if setup == "memory" else "simulated://"
+    TestingConfig.RATELIMIT_STORAGE_OPTIONS = {"rtt": rtt}
+    TestingConfig.RATELIMIT_LOCAL_SHARE = 0.01 if setup == "local+shared" else 0
+    TestingConfig.RATELIMIT_READ = "100000 per hour"
+    app = create_app("testing")
+
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    timings = []
+    for i in range(requests):
+        environ = {"REMOTE_ADDR": f"10.0.{i % clients // 256}.{i % clients % 256}"}
+        start = time.perf_counter()
+        client.get("/api/todos/changes?limit=1", environ_base=environ)
+        timings.append(time.perf_counter() - start)
+    quantiles = statistics.quantiles(timings, n=100)
+    return quantiles[49] * 1000, quantiles[98] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--rtt", type=float, default=0.5, help="simulated storage round trip in ms")
+    args = parser.parse_args()
+
+    results = {
+        setup: run(setup, args.requests, args.clients, args.rtt / 1000)
+        for setup in ("disabled", "memory", "shared", "local+shared")
+    }
+    base_p50, base_p99 = results["disabled"]
+    print(f"{'storage':>14} {'p50 (ms)':>9} {'p99 (ms)':>9} {'+p50':>7} {'+p99':>7}")
+    for setup, (p50, p99) in results.items():
+        print(f"{setup:>14} {p50:>9.3f} {p99:>9.3f} {p50 - base_p50:>7.3f} {p99 - base_p99:>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
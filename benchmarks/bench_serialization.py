@@ -0,0 +1,87 @@
+"""Benchmark list serialization: ORM + Todo.to_dict vs column-projected rows
+
+Usage:
+    python benchmarks/bench_serialization.py [ROWS ...]
+
+Runs against the TestingConfig in-memory SQLite database, so it needs no
+services. Each size reports the best of ``--repeat`` runs of query plus
+encoding, and the encoding alone with the stdlib and orjson providers.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert, select  # noqa: E402
+
+from app import create_app  # noqa: E402
+from app.json_provider import OrjsonJSONProvider, StdlibJSONProvider  # noqa: E402
+from app.models import Todo, db  # noqa: E402
+from app.serializers import TODO_FIELDS, serialize_rows, todo_columns  # noqa: E402
+
+
+def seed(rows):
+    db.session.execute(Todo.__table__.delete())
+    db.session.execute(
+        insert(Todo),
+        [{"title": f"Todo {i}", "description": "benchmark row", "completed": i % 2 == 0} for i in range(rows)],
+    )
+    db.session.commit()
+
+
+def orm_to_dict():
+    todos = Todo.query.order_by(Todo.created_at.desc(), Todo.id.desc()).all()
+    body = json.dumps([todo.to_dict() for todo in todos])
+    db.session.expunge_all()
+    return body
+
+
+def core_rows(provider):
+    stmt = select(*todo_columns(TODO_FIELDS)).order_by(Todo.created_at.desc(), Todo.id.desc())
+    rows = db.session.execute(stmt).all()
+    return provider.dumps(serialize_rows(rows, TODO_FIELDS))
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("rows", nargs="*", type=int, default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    app = create_app("testing")
+    stdlib, fast = StdlibJSONProvider(app), OrjsonJSONProvider(app)
+    with app.app_context():
+        db.create_all()
+        print(
+            f"{'rows':>8} {'to_dict (ms)':>13} {'core+stdlib':>12} {'core+orjson':>12} {'speedup':>8}"
+            f" {'encode stdlib (rows/s)':>23} {'encode orjson (rows/s)':>23}"
+        )
+        for rows in args.rows:
+            seed(rows)
+            assert json.loads(orm_to_dict()) == json.loads(core_rows(stdlib)) == json.loads(core_rows(fast))
+            orm = best_of(orm_to_dict, args.repeat)
+            core_stdlib = best_of(lambda: core_rows(stdlib), args.repeat)
+            core_fast = best_of(lambda: core_rows(fast), args.repeat)
+            page = serialize_rows(db.session.execute(select(*todo_columns(TODO_FIELDS))).all(), TODO_FIELDS)
+            encode_stdlib = best_of(lambda: stdlib.dumps(page), args.repeat)
+            encode_fast = best_of(lambda: fast.dumps(page), args.repeat)
+            print(
+                f"{rows:>8} {orm * 1000:>13.1f} {core_stdlib * 1000:>12.1f} {core_fast * 1000:>12.1f}"
+                f" {orm / core_fast:>7.1f}x {rows / encode_stdlib:>23,.0f} {rows / encode_fast:>23,.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+"""WSGI app for load tests: the real app plus artificial DB latency
+
+Every SQL statement sleeps BENCH_DB_LATENCY_MS first, standing in for a
+slow or distant database. Run it with gunicorn, e.g.
+
+    gunicorn benchmarks.latency_app:app
+"""
+import os
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import create_app
+
+DB_LATENCY = int(os.getenv("BENCH_DB_LATENCY_MS", "50")) / 1000
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _inject_latency(conn, cursor, statement, parameters, context, executemany):
+    time.sleep(DB_LATENCY)
+
+
+app = create_app()
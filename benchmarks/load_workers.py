@@ -0,0 +1,110 @@
+"""Load test: gunicorn sync workers vs gthread workers under DB latency
+
+Usage:
+    python benchmarks/load_workers.py [--latency-ms 200] [--concurrency 4 16 64]
+
+Starts benchmarks.latency_app under gunicorn once per worker model
+against a throwaway SQLite file, drives GET /api/todos/<id> from a pool
+of client threads and prints throughput and latency percentiles.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PORT = 5077
+MODELS = {
+    "sync": ["--worker-class", "sync", "--threads", "1"],
+    "gthread": ["--worker-class", "gthread", "--threads", "8"],
+}
+
+
+def start_server(model, db_path, latency_ms):
+    env = dict(
+        os.environ,
+        FLASK_ENV="development",
+        DATABASE_URL=f"sqlite:///{db_path}",
+        RATELIMIT_ENABLED="false",
+        BENCH_DB_LATENCY_MS=str(latency_ms),
+        DB_POOL_SIZE="8",
+    )
+    cmd = [
+        sys.executable, "-m", "gunicorn", "--bind", f"127.0.0.1:{PORT}", "--workers", "4",
+        "--log-level", "warning", *MODELS[model], "benchmarks.latency_app:app",
+    ]
+    server = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{PORT}/", timeout=1)
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError(f"gunicorn ({model}) did not start")
+
+
+def drive(url, concurrency, duration):
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            urllib.request.urlopen(url, timeout=30).read()
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    return {
+        "rps": len(latencies) / duration,
+        "p50": statistics.median(latencies) * 1000,
+        "p99": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency-ms", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="*", default=[4, 16, 64])
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"{'model':>8} {'clients':>8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        for model in MODELS:
+            server = start_server(model, db_path, args.latency_ms)
+            try:
+                urllib.request.urlopen(
+                    urllib.request.Request(
+                        f"http://127.0.0.1:{PORT}/api/todos",
+                        data=b'{"title": "load test"}',
+                        headers={"Content-Type": "application/json"},
+                    )
+                ).read()
+                for concurrency in args.concurrency:
+                    result = drive(f"http://127.0.0.1:{PORT}/api/todos/1", concurrency, args.duration)
+                    print(
+                        f"{model:>8} {concurrency:>8} {result['rps']:>8.1f} "
+                        f"{result['p50']:>8.1f} {result['p99']:>8.1f}"
+                    )
+            finally:
+                server.terminate()
+                server.wait()
+
+
+if __name__ == "__main__":
+    main()
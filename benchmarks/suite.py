@@ -0,0 +1,339 @@
+"""Benchmark suite with saved baselines and regression comparison
+
+Usage:
+    python benchmarks/suite.py [--only micro routes gunicorn scaling] [--save FILE] [--compare FILE]
+    python benchmarks/suite.py --load new.json --compare baseline.json
+
+Groups:
+    micro     Todo.to_dict, serialize_rows and JSON encoding of one page
+    routes    p50/p99 and req/s of every /api/todos route via the Flask test client
+    gunicorn  req/s and p50/p99 of the read routes against a local gunicorn
+    scaling   read routes on SQLite (and Postgres with --postgres-url) at each --rows
+
+Everything runs offline against throwaway SQLite files; --postgres-url
+points the scaling runs at a local Postgres whose todos tables are
+dropped and recreated. --save writes the results as JSON; --compare
+prints the change against a saved run and exits 1 when a metric got
+worse by more than --threshold. Compare runs from the same machine only.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Config อ่าน env ตอน import: ปิด rate limit / cache / access log ให้ผลวัดเทียบกันได้
+BENCH_ENV = {
+    "RATELIMIT_ENABLED": "false",
+    "CACHE_BACKEND": "none",
+    "LOG_LEVEL": "WARNING",
+    "LOG_ACCESS_ENABLED": "false",
+    "WRITE_BEHIND_ENABLED": "false",
+}
+os.environ.update(BENCH_ENV)
+
+from sqlalchemy import select, text  # noqa: E402
+
+from app import create_app  # noqa: E402
+from app.models import Todo, TodoTombstone, db  # noqa: E402
+from app.pagination import encode_change_token  # noqa: E402
+from app.serializers import TODO_FIELDS, serialize_rows, todo_columns  # noqa: E402
+from benchmarks.load_workers import drive  # noqa: E402
+
+GROUPS = ("micro", "routes", "gunicorn", "scaling")
+PORT = 5078
+PAGE_SIZE = 50
+TABLES = [TodoTombstone.__table__, Todo.__table__]
+
+# GET routes ที่วัดทั้งใน routes, gunicorn และ scaling; {id} = แถวกลางตาราง
+READ_ROUTES = {
+    "list": "/api/todos",
+    "list_filtered": "/api/todos?completed=false&sort=-updated_at",
+    "search": "/api/todos?q=todo%2042",
+    "get": "/api/todos/{id}",
+    "changes": "/api/todos/changes?limit=50&since={since}",
+}
+
+SEED_SQL = {
+    "sqlite": (
+        "WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < :rows) "
+        "INSERT INTO todos (title, description, completed, created_at, updated_at) "
+        "SELECT 'todo ' || n, 'benchmark row', n % 10 = 0, "
+        "datetime('2026-01-01', '+' || n || ' seconds'), "
+        "datetime('2026-01-01', '+' || (n % 997) || ' minutes') FROM seq"
+    ),
+    "postgresql": (
+        "INSERT INTO todos (title, description, completed, created_at, updated_at) "
+        "SELECT 'todo ' || n, 'benchmark row', n % 10 = 0, "
+        "timestamp '2026-01-01' + n * interval '1 second', "
+        "timestamp '2026-01-01' + (n % 997) * interval '1 minute' FROM generate_series(1, :rows) AS n"
+    ),
+}
+
+
+def metric(value, unit, better="lower"):
+    return {"value": round(value, 4), "unit": unit, "better": better}
+
+
+def latency_metrics(prefix, timings):
+    timings = sorted(timings)
+    return {
+        f"{prefix}.p50_ms": metric(statistics.median(timings) * 1000, "ms"),
+        f"{prefix}.p99_ms": metric(timings[max(int(len(timings) * 0.99) - 1, 0)] * 1000, "ms"),
+        f"{prefix}.rps": metric(len(timings) / sum(timings), "req/s", "higher"),
+    }
+
+
+def make_app(database_url):
+    os.environ["DATABASE_URL"] = database_url
+    return create_app("production")
+
+
+def seed(rows):
+    """Recreate the todo tables with ``rows`` deterministic rows"""
+    # test client ใช้ app context เดียวกัน: session ที่ค้างอยู่ถือ lock ของตาราง
+    db.session.remove()
+    engine = db.engine
+    db.metadata.drop_all(engine, tables=TABLES)
+    db.metadata.create_all(engine, tables=TABLES)
+    with engine.begin() as conn:
+        conn.execute(text(SEED_SQL[engine.dialect.name]), {"rows": rows})
+        conn.execute(text("ANALYZE"))
+
+
+def route_urls(rows):
+    since = encode_change_token(max(rows - PAGE_SIZE, 0), datetime.utcnow())
+    return {name: url.format(id=rows // 2 or 1, since=since) for name, url in READ_ROUTES.items()}
+
+
+def time_requests(client, method, urls, **kwargs):
+    timings = []
+    for url in urls:
+        start = time.perf_counter()
+        response = client.open(url, method=method, **kwargs)
+        timings.append(time.perf_counter() - start)
+        assert response.status_code < 400, (url, response.status_code)
+    return timings
+
+
+def run_micro(args):
+    app = make_app("sqlite://")
+    results = {}
+    with app.app_context():
+        seed(PAGE_SIZE)
+        todos = Todo.query.all()
+        rows = db.session.execute(select(*todo_columns(TODO_FIELDS))).all()
+        page = [todo.to_dict() for todo in todos]
+        cases = {
+            "to_dict": lambda: todos[0].to_dict(),
+            "to_dict_page": lambda: [todo.to_dict() for todo in todos],
+            "serialize_rows_page": lambda: serialize_rows(rows, TODO_FIELDS),
+            "json_dumps_page": lambda: json.dumps(page),
+            "jsonify_page": lambda: app.json.response({"success": True, "data": page}),
+        }
+        for name, fn in cases.items():
+            timer = timeit.Timer(fn)
+            number, _ = timer.autorange()
+            best = min(timer.repeat(repeat=args.repeat, number=number)) / number
+            results[f"micro.{name}_us"] = metric(best * 1e6, "us")
+    return results
+
+
+def run_routes(args):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(f"sqlite:///{os.path.join(tmp, 'routes.db')}")
+        with app.app_context():
+            seed(args.route_rows)
+            client = app.test_client()
+            n = args.requests
+            for name, url in route_urls(args.route_rows).items():
+                time_requests(client, "GET", [url] * 10)
+                results.update(latency_metrics(f"routes.{name}", time_requests(client, "GET", [url] * n)))
+
+            todo_ids = range(1, n + 1)
+            writes = {
+                "create": ("POST", ["/api/todos"] * n, {"json": {"title": "bench"}}),
+                "update": ("PUT", [f"/api/todos/{i}" for i in todo_ids], {"json": {"completed": True}}),
+                "patch": ("PATCH", [f"/api/todos/{i}" for i in todo_ids], {"json": {"completed": False}}),
+                "batch": ("POST", ["/api/todos/batch"] * n, {"json": {"operations": [
+                    {"op": "create", "data": {"title": f"batch {i}"}} for i in range(10)
+                ]}}),
+                "delete": ("DELETE", [f"/api/todos/{i}" for i in todo_ids], {}),
+            }
+            for name, (method, urls, kwargs) in writes.items():
+                results.update(latency_metrics(f"routes.{name}", time_requests(client, method, urls, **kwargs)))
+
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                b"".join(client.get("/api/todos/export").response)
+            results["routes.export_all_ms"] = metric((time.perf_counter() - start) / args.repeat * 1000, "ms")
+    return results
+
+
+def run_gunicorn(args):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'gunicorn.db')}"
+        app = make_app(database_url)
+        with app.app_context():
+            seed(args.route_rows)
+            db.engine.dispose()
+        env = dict(os.environ, FLASK_ENV="production", DATABASE_URL=database_url)
+        server = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "--bind", f"127.0.0.1:{PORT}", "--workers", str(args.workers),
+             "--log-level", "warning", "run:app"],
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            _wait_for(f"http://127.0.0.1:{PORT}/api/todos")
+            for name, url in route_urls(args.route_rows).items():
+                drive(f"http://127.0.0.1:{PORT}{url}", args.concurrency, 1)
+                result = drive(f"http://127.0.0.1:{PORT}{url}", args.concurrency, args.duration)
+                results[f"gunicorn.{name}.rps"] = metric(result["rps"], "req/s", "higher")
+                results[f"gunicorn.{name}.p50_ms"] = metric(result["p50"], "ms")
+                results[f"gunicorn.{name}.p99_ms"] = metric(result["p99"], "ms")
+        finally:
+            server.terminate()
+            server.wait()
+    return results
+
+
+def _wait_for(url):
+    import urllib.request
+
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(url, timeout=1)
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("gunicorn did not start")
+
+
+def run_scaling(args):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        targets = {"sqlite": f"sqlite:///{os.path.join(tmp, 'scaling.db')}"}
+        if args.postgres_url:
+            targets["postgres"] = args.postgres_url
+        for backend, database_url in targets.items():
+            app = make_app(database_url)
+            with app.app_context():
+                for rows in args.rows:
+                    start = time.perf_counter()
+                    seed(rows)
+                    print(f"  {backend}: seeded {rows} rows in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+                    client = app.test_client()
+                    for name, url in route_urls(rows).items():
+                        time_requests(client, "GET", [url] * 5)
+                        timings = time_requests(client, "GET", [url] * args.scaling_requests)
+                        results[f"scaling.{backend}.{rows}.{name}.p50_ms"] = metric(
+                            statistics.median(timings) * 1000, "ms"
+                        )
+                db.session.remove()
+                db.metadata.drop_all(db.engine, tables=TABLES)
+                db.engine.dispose()
+    return results
+
+
+RUNNERS = {"micro": run_micro, "routes": run_routes, "gunicorn": run_gunicorn, "scaling": run_scaling}
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline, current, threshold):
+    """Rows of (name, old, new, change) plus the names that regressed beyond ``threshold``"""
+    rows, regressions = [], []
+    for name, new in current["results"].items():
+        old = baseline["results"].get(name)
+        if old is None or not old["value"]:
+            continue
+        change = (new["value"] - old["value"]) / old["value"]
+        worse = change > threshold if new["better"] == "lower" else change < -threshold
+        rows.append((name, old["value"], new["value"], change, worse))
+        if worse:
+            regressions.append(name)
+    return rows, regressions
+
+
+def print_results(results):
+    for name, result in results.items():
+        print(f"{name:<48} {result['value']:>12.3f} {result['unit']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", nargs="*", choices=GROUPS, default=list(GROUPS))
+    parser.add_argument("--requests", type=int, default=300, help="requests per route (routes group)")
+    parser.add_argument("--route-rows", type=int, default=1000, help="rows in the table for routes/gunicorn")
+    parser.add_argument("--rows", type=int, nargs="*", default=[1_000, 10_000, 100_000],
+                        help="scaling sizes, e.g. 1000 10000 100000 1000000")
+    parser.add_argument("--scaling-requests", type=int, default=50)
+    parser.add_argument("--postgres-url", default=os.getenv("BENCH_POSTGRES_URL"),
+                        help="local Postgres for scaling runs (its todos tables are recreated)")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--load", help="compare these saved results instead of running")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed relative slowdown")
+    args = parser.parse_args()
+
+    if args.load:
+        with open(args.load) as f:
+            report = json.load(f)
+    else:
+        report = {
+            "meta": {
+                "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "git": git_revision(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "args": {key: value for key, value in vars(args).items() if key not in ("postgres_url",)},
+            },
+            "results": {},
+        }
+        for group in args.only:
+            print(f"running {group}...", file=sys.stderr)
+            report["results"].update(RUNNERS[group](args))
+        print_results(report["results"])
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        rows, regressions = compare(baseline, report, args.threshold)
+        print(f"\ncompared with {args.compare} (git {baseline['meta'].get('git')}), threshold {args.threshold:.0%}")
+        print(f"{'metric':<48} {'baseline':>12} {'current':>12} {'change':>8}")
+        for name, old, new, change, worse in rows:
+            print(f"{name:<48} {old:>12.3f} {new:>12.3f} {change:>+8.1%}{'  REGRESSION' if worse else ''}")
+        if regressions:
+            print(f"\n{len(regressions)} regressions", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Gunicorn settings shared by every deployment
+
+Gunicorn loads ./gunicorn.conf.py automatically; command line flags in the
+Dockerfile still take precedence.
+"""
+import os
+import shutil
+
+# gthread: each worker serves GUNICORN_THREADS requests concurrently, so a
+# slow query blocks one thread instead of a whole worker. Keep
+# DB_POOL_SIZE + DB_MAX_OVERFLOW >= threads. Set GUNICORN_WORKER_CLASS=sync
+# for the old one-request-per-worker model.
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+# gevent: one greenlet per connection, for instances serving /api/todos/stream
+# (thousands of mostly idle SSE connections per worker)
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "1000"))
+
+# Import the app once in the master and fork workers from it: respawns skip
+# the import, and create_app() opens no DB connections that could end up
+# shared between workers (tests/test_startup.py checks this)
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+# gevent patches threading/socket when the worker starts; a preloaded app would
+# already hold unpatched locks and threads
+if worker_class in ("gevent", "eventlet"):
+    preload_app = False
+
+
+def on_starting(server):
+    # Prometheus multi-process mode: start every master with an empty
+    # metrics directory so stale worker files are not aggregated
+    path = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def worker_exit(server, worker):
+    # PATCH write-behind: commit updates already acknowledged with 202
+    from app.write_behind import close_write_behind
+
+    close_write_behind()
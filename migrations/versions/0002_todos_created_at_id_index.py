@@ -0,0 +1,23 @@
+"""add (created_at, id) index for keyset pagination
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:10:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_todos_created_at_id', 'todos', ['created_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_todos_created_at_id', table_name='todos')
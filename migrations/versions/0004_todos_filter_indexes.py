@@ -0,0 +1,36 @@
+"""add indexes for filtered and sorted todo lists
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_todos_updated_at_id', 'todos', ['updated_at', 'id'], unique=False)
+    op.create_index(
+        'ix_todos_open_created_at_id', 'todos', ['created_at', 'id'], unique=False,
+        postgresql_where=sa.text('completed = false'),
+        sqlite_where=sa.text('completed = 0'),
+    )
+    op.create_index(
+        'ix_todos_done_updated_at_id', 'todos', ['updated_at', 'id'], unique=False,
+        postgresql_where=sa.text('completed = true'),
+        sqlite_where=sa.text('completed = 1'),
+    )
+
+
+def downgrade():
+    op.drop_index('ix_todos_done_updated_at_id', table_name='todos')
+    op.drop_index('ix_todos_open_created_at_id', table_name='todos')
+    op.drop_index('ix_todos_updated_at_id', table_name='todos')
@@ -0,0 +1,93 @@
+"""add change_seq and tombstones for the delta sync feed
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+POSTGRES_DDL = (
+    "CREATE SEQUENCE IF NOT EXISTS todos_change_seq",
+    "ALTER SEQUENCE todos_change_seq OWNED BY todos.change_seq",
+    "CREATE OR REPLACE FUNCTION todos_bump_change_seq() RETURNS trigger LANGUAGE plpgsql AS $$ "
+    "BEGIN NEW.change_seq := nextval('todos_change_seq'); RETURN NEW; END $$",
+    "CREATE TRIGGER todos_change_seq BEFORE INSERT OR UPDATE ON todos "
+    "FOR EACH ROW EXECUTE FUNCTION todos_bump_change_seq()",
+    "CREATE OR REPLACE FUNCTION todos_record_tombstone() RETURNS trigger LANGUAGE plpgsql AS $$ "
+    "BEGIN INSERT INTO todo_tombstones (id, change_seq, deleted_at) "
+    "VALUES (OLD.id, nextval('todos_change_seq'), now() AT TIME ZONE 'utc') "
+    "ON CONFLICT (id) DO UPDATE SET change_seq = EXCLUDED.change_seq, deleted_at = EXCLUDED.deleted_at; "
+    "RETURN OLD; END $$",
+    "CREATE TRIGGER todos_tombstone AFTER DELETE ON todos "
+    "FOR EACH ROW EXECUTE FUNCTION todos_record_tombstone()",
+)
+
+SQLITE_DDL = (
+    "CREATE TABLE IF NOT EXISTS todo_change_counter (value INTEGER NOT NULL)",
+    "INSERT INTO todo_change_counter (value) SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM todo_change_counter)",
+    "CREATE TRIGGER IF NOT EXISTS todos_change_seq_ai AFTER INSERT ON todos BEGIN "
+    "UPDATE todo_change_counter SET value = value + 1; "
+    "UPDATE todos SET change_seq = (SELECT value FROM todo_change_counter) WHERE id = new.id; END",
+    "CREATE TRIGGER IF NOT EXISTS todos_change_seq_au AFTER UPDATE ON todos "
+    "WHEN new.change_seq IS old.change_seq BEGIN "
+    "UPDATE todo_change_counter SET value = value + 1; "
+    "UPDATE todos SET change_seq = (SELECT value FROM todo_change_counter) WHERE id = new.id; END",
+    "CREATE TRIGGER IF NOT EXISTS todos_tombstone AFTER DELETE ON todos BEGIN "
+    "UPDATE todo_change_counter SET value = value + 1; "
+    "INSERT OR REPLACE INTO todo_tombstones (id, change_seq, deleted_at) "
+    "VALUES (old.id, (SELECT value FROM todo_change_counter), strftime('%Y-%m-%d %H:%M:%f', 'now')); END",
+)
+
+SQLITE_DROP = (
+    "DROP TRIGGER IF EXISTS todos_change_seq_ai",
+    "DROP TRIGGER IF EXISTS todos_change_seq_au",
+    "DROP TRIGGER IF EXISTS todos_tombstone",
+    "DROP TABLE IF EXISTS todo_change_counter",
+)
+
+POSTGRES_DROP = (
+    "DROP TRIGGER IF EXISTS todos_tombstone ON todos",
+    "DROP TRIGGER IF EXISTS todos_change_seq ON todos",
+    "DROP FUNCTION IF EXISTS todos_record_tombstone()",
+    "DROP FUNCTION IF EXISTS todos_bump_change_seq()",
+)
+
+
+def upgrade():
+    op.create_table(
+        'todo_tombstones',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('change_seq', sa.BigInteger(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_todo_tombstones_change_seq', 'todo_tombstones', ['change_seq'], unique=False)
+    op.add_column('todos', sa.Column('change_seq', sa.BigInteger(), nullable=True))
+
+    dialect = op.get_bind().dialect.name
+    statements = {'postgresql': POSTGRES_DDL, 'sqlite': SQLITE_DDL}.get(dialect, ())
+    for statement in statements:
+        op.execute(statement)
+    # ให้ trigger ใส่ change_seq ให้แถวเดิม (เขียนทั้งตาราง 1 รอบ)
+    op.execute("UPDATE todos SET updated_at = updated_at")
+    op.create_index('ix_todos_change_seq', 'todos', ['change_seq'], unique=False)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    statements = {'postgresql': POSTGRES_DROP, 'sqlite': SQLITE_DROP}.get(dialect, ())
+    for statement in statements:
+        op.execute(statement)
+    op.drop_index('ix_todos_change_seq', table_name='todos')
+    op.drop_column('todos', 'change_seq')
+    op.drop_index('ix_todo_tombstones_change_seq', table_name='todo_tombstones')
+    op.drop_table('todo_tombstones')
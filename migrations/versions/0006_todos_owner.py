@@ -0,0 +1,88 @@
+"""add owner_id to todos and tombstones, with indexes leading on owner_id
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+# (old, new, columns, partial index predicate)
+INDEXES = (
+    ('ix_todos_created_at_id', 'ix_todos_owner_created_at_id', ['created_at', 'id'], None),
+    ('ix_todos_updated_at_id', 'ix_todos_owner_updated_at_id', ['updated_at', 'id'], None),
+    ('ix_todos_open_created_at_id', 'ix_todos_owner_open_created_at_id', ['created_at', 'id'], False),
+    ('ix_todos_done_updated_at_id', 'ix_todos_owner_done_updated_at_id', ['updated_at', 'id'], True),
+    ('ix_todos_change_seq', 'ix_todos_owner_change_seq', ['change_seq'], None),
+)
+
+
+def _tombstone_ddl(dialect, with_owner):
+    columns, values = ('id, owner_id', 'OLD.id, OLD.owner_id') if with_owner else ('id', 'OLD.id')
+    if dialect == 'postgresql':
+        update_owner = 'owner_id = EXCLUDED.owner_id, ' if with_owner else ''
+        return (
+            "CREATE OR REPLACE FUNCTION todos_record_tombstone() RETURNS trigger LANGUAGE plpgsql AS $$ "
+            f"BEGIN INSERT INTO todo_tombstones ({columns}, change_seq, deleted_at) "
+            f"VALUES ({values}, nextval('todos_change_seq'), now() AT TIME ZONE 'utc') "
+            f"ON CONFLICT (id) DO UPDATE SET {update_owner}change_seq = EXCLUDED.change_seq, "
+            "deleted_at = EXCLUDED.deleted_at; "
+            "RETURN OLD; END $$",
+        )
+    if dialect == 'sqlite':
+        return (
+            "DROP TRIGGER IF EXISTS todos_tombstone",
+            "CREATE TRIGGER todos_tombstone AFTER DELETE ON todos BEGIN "
+            "UPDATE todo_change_counter SET value = value + 1; "
+            f"INSERT OR REPLACE INTO todo_tombstones ({columns}, change_seq, deleted_at) "
+            f"VALUES ({values.lower()}, (SELECT value FROM todo_change_counter), "
+            "strftime('%Y-%m-%d %H:%M:%f', 'now')); END",
+        )
+    return ()
+
+
+def _create_index(name, columns, completed):
+    where = {}
+    if completed is not None:
+        where = {
+            'postgresql_where': sa.text(f"completed = {'true' if completed else 'false'}"),
+            'sqlite_where': sa.text(f"completed = {int(completed)}"),
+        }
+    op.create_index(name, 'todos', columns, unique=False, **where)
+
+
+def upgrade():
+    # server default: แถวเดิมทั้งหมดเป็นของ owner "default" (Postgres 11+ ไม่ต้องเขียนทั้งตาราง)
+    op.add_column('todos', sa.Column('owner_id', sa.String(length=64), server_default='default', nullable=False))
+    op.add_column(
+        'todo_tombstones', sa.Column('owner_id', sa.String(length=64), server_default='default', nullable=False)
+    )
+    for old, new, columns, completed in INDEXES:
+        _create_index(new, ['owner_id'] + columns, completed)
+        op.drop_index(old, table_name='todos')
+    op.drop_index('ix_todo_tombstones_change_seq', table_name='todo_tombstones')
+    op.create_index(
+        'ix_todo_tombstones_owner_change_seq', 'todo_tombstones', ['owner_id', 'change_seq'], unique=False
+    )
+    for statement in _tombstone_ddl(op.get_bind().dialect.name, with_owner=True):
+        op.execute(statement)
+
+
+def downgrade():
+    for statement in _tombstone_ddl(op.get_bind().dialect.name, with_owner=False):
+        op.execute(statement)
+    op.drop_index('ix_todo_tombstones_owner_change_seq', table_name='todo_tombstones')
+    op.create_index('ix_todo_tombstones_change_seq', 'todo_tombstones', ['change_seq'], unique=False)
+    for old, new, columns, completed in INDEXES:
+        _create_index(old, columns, completed)
+        op.drop_index(new, table_name='todos')
+    op.drop_column('todo_tombstones', 'owner_id')
+    op.drop_column('todos', 'owner_id')
@@ -0,0 +1,38 @@
+"""notify listeners of todo changes (LISTEN todo_changes, Postgres only)
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute(
+        "CREATE OR REPLACE FUNCTION todos_notify_change() RETURNS trigger LANGUAGE plpgsql AS $$ "
+        "BEGIN "
+        "IF TG_OP = 'DELETE' THEN PERFORM pg_notify('todo_changes', OLD.owner_id); "
+        "ELSE PERFORM pg_notify('todo_changes', NEW.owner_id); END IF; "
+        "RETURN NULL; END $$"
+    )
+    op.execute(
+        "CREATE TRIGGER todos_notify_change AFTER INSERT OR UPDATE OR DELETE ON todos "
+        "FOR EACH ROW EXECUTE FUNCTION todos_notify_change()"
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("DROP TRIGGER IF EXISTS todos_notify_change ON todos")
+    op.execute("DROP FUNCTION IF EXISTS todos_notify_change()")
@@ -0,0 +1,60 @@
+"""record the writing transaction of every change (feed order by commit-safe position)
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ('ix_todos_owner_change_xid_seq', 'todos'),
+    ('ix_todo_tombstones_owner_change_xid_seq', 'todo_tombstones'),
+)
+
+
+def _postgres_ddl(with_xid):
+    xid_column, xid_value, xid_update = (
+        ('change_xid, ', 'pg_current_xact_id()::text::bigint, ', 'change_xid = EXCLUDED.change_xid, ')
+        if with_xid else ('', '', '')
+    )
+    bump_xid = 'NEW.change_xid := pg_current_xact_id()::text::bigint; ' if with_xid else ''
+    return (
+        "CREATE OR REPLACE FUNCTION todos_bump_change_seq() RETURNS trigger LANGUAGE plpgsql AS $$ "
+        f"BEGIN {bump_xid}NEW.change_seq := nextval('todos_change_seq'); RETURN NEW; END $$",
+        "CREATE OR REPLACE FUNCTION todos_record_tombstone() RETURNS trigger LANGUAGE plpgsql AS $$ "
+        f"BEGIN INSERT INTO todo_tombstones (id, owner_id, {xid_column}change_seq, deleted_at) "
+        f"VALUES (OLD.id, OLD.owner_id, {xid_value}nextval('todos_change_seq'), now() AT TIME ZONE 'utc') "
+        f"ON CONFLICT (id) DO UPDATE SET owner_id = EXCLUDED.owner_id, {xid_update}"
+        "change_seq = EXCLUDED.change_seq, deleted_at = EXCLUDED.deleted_at; "
+        "RETURN OLD; END $$",
+    )
+
+
+def upgrade():
+    # แถวเดิมได้ change_xid = 0 (Postgres 11+ ไม่ต้องเขียนทั้งตาราง): sync token เก่ายังใช้ต่อได้
+    for _, table in INDEXES:
+        op.add_column(table, sa.Column('change_xid', sa.BigInteger(), server_default='0', nullable=False))
+    for name, table in INDEXES:
+        op.create_index(name, table, ['owner_id', 'change_xid', 'change_seq'], unique=False)
+    if op.get_bind().dialect.name == 'postgresql':
+        for statement in _postgres_ddl(with_xid=True):
+            op.execute(statement)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        for statement in _postgres_ddl(with_xid=False):
+            op.execute(statement)
+    for name, table in INDEXES:
+        op.drop_index(name, table_name=table)
+    for _, table in INDEXES:
+        op.drop_column(table, 'change_xid')
@@ -1,6 +1,10 @@
+import json
+from datetime import datetime, timedelta
+
 import pytest
 from unittest.mock import patch
 from sqlalchemy.exc import SQLAlchemyError
+from app.cache import init_cache
 from app.models import Todo, db
 
 
@@ -269,8 +273,7 @@ class TestTodoAPI:
         data = response.get_json()
         assert data["success"] is False
 
-    @patch("app.routes.db.session.commit")
-    def test_update_todo_database_error(self, mock_commit, client, app):
+    def test_update_todo_database_error(self, client, app):
         """Test database error during todo update"""
         with app.app_context():
             todo = Todo(title="Test")
@@ -278,8 +281,9 @@ class TestTodoAPI:
             db.session.commit()
             todo_id = todo.id
 
-        mock_commit.side_effect = SQLAlchemyError("Database error")
-        response = client.put(f"/api/todos/{todo_id}", json={"title": "New"})
+        with patch("app.routes.db.session.commit") as mock_commit:
+            mock_commit.side_effect = SQLAlchemyError("Database error")
+            response = client.put(f"/api/todos/{todo_id}", json={"title": "New"})
         assert response.status_code == 500
         data = response.get_json()
         assert data["success"] is False
@@ -338,19 +342,407 @@ class TestTodoAPI:
         assert data["data"][0]["title"] == "Todo 3"
         assert data["data"][2]["title"] == "Todo 1"
 
-    @patch("app.routes.Todo.query")
-    def test_get_todos_database_error(self, mock_query, client):
+    @patch("app.routes.db.session.execute")
+    def test_get_todos_database_error(self, mock_execute, client):
         """Test database error when getting todos"""
-        mock_query.order_by.return_value.all.side_effect = SQLAlchemyError(
-            "DB Error")
+        mock_execute.side_effect = SQLAlchemyError("DB Error")
         response = client.get("/api/todos")
         assert response.status_code == 500
         data = response.get_json()
         assert data["success"] is False
 
+    def test_get_todos_pagination(self, client, app):
+        """Test keyset pagination walks every todo exactly once"""
+        with app.app_context():
+            db.session.add_all([Todo(title=f"Todo {i}") for i in range(1, 6)])
+            db.session.commit()
+
+        response = client.get("/api/todos?limit=2")
+        data = response.get_json()
+        assert data["count"] == 2
+        assert [t["title"] for t in data["data"]] == ["Todo 5", "Todo 4"]
+        assert data["next_cursor"]
+
+        titles = [t["title"] for t in data["data"]]
+        cursor = data["next_cursor"]
+        while cursor:
+            data = client.get(f"/api/todos?limit=2&cursor={cursor}").get_json()
+            titles += [t["title"] for t in data["data"]]
+            cursor = data["next_cursor"]
+        assert titles == [f"Todo {i}" for i in range(5, 0, -1)]
+
+    def test_get_todos_limit_is_capped(self, client, app):
+        """Test limit is clamped to TODOS_MAX_PAGE_SIZE"""
+        app.config["TODOS_MAX_PAGE_SIZE"] = 3
+        with app.app_context():
+            db.session.add_all([Todo(title=f"Todo {i}") for i in range(5)])
+            db.session.commit()
+
+        data = client.get("/api/todos?limit=1000").get_json()
+        assert data["count"] == 3
+        assert data["next_cursor"] is not None
+
+    def test_get_todos_matches_to_dict(self, client, app):
+        """Test the column-projected list output matches Todo.to_dict"""
+        with app.app_context():
+            todo = Todo(title="Same", description="Shape", completed=True)
+            db.session.add(todo)
+            db.session.commit()
+            expected = todo.to_dict()
+
+        data = client.get("/api/todos").get_json()
+        assert data["data"] == [expected]
+
+    def test_get_todos_sparse_fieldset(self, client, app):
+        """Test fields= limits the keys of each todo"""
+        with app.app_context():
+            db.session.add_all([Todo(title="A"), Todo(title="B")])
+            db.session.commit()
+
+        data = client.get("/api/todos?fields=title,completed&limit=1").get_json()
+        assert data["data"] == [{"title": "B", "completed": False}]
+        assert data["next_cursor"]
+
+    @pytest.mark.parametrize("query", [
+        "limit=abc",
+        "limit=0",
+        "cursor=not-a-cursor",
+        "fields=title,secret",
+        "fields=,",
+        "sort=title",
+        "completed=maybe",
+        "created_after=yesterday",
+    ])
+    def test_get_todos_invalid_pagination(self, client, query):
+        """Test invalid limit or cursor returns 400"""
+        response = client.get(f"/api/todos?{query}")
+        assert response.status_code == 400
+        assert response.get_json()["success"] is False
+
+
+# ---------------------------------------------------------------------------
+# 1.5 TestListFilters
+# ---------------------------------------------------------------------------
+class TestListFilters:
+    """Test filter and sort parameters on GET /api/todos"""
+
+    @pytest.fixture()
+    def seeded(self, app):
+        base = datetime(2026, 1, 1)
+        with app.app_context():
+            for i in range(6):
+                db.session.add(Todo(
+                    title=f"Todo {i}",
+                    completed=i % 2 == 1,
+                    created_at=base + timedelta(days=i),
+                    updated_at=base + timedelta(days=10 - i),
+                ))
+            db.session.commit()
+        return base
+
+    def _titles(self, client, query):
+        response = client.get(f"/api/todos?{query}")
+        assert response.status_code == 200
+        return [todo["title"] for todo in response.get_json()["data"]]
+
+    def test_open_todos_newest_first(self, client, seeded):
+        assert self._titles(client, "completed=false") == ["Todo 4", "Todo 2", "Todo 0"]
+
+    def test_completed_recently(self, client, seeded):
+        query = "completed=true&updated_since=2026-01-07T00:00:00&sort=-updated_at"
+        assert self._titles(client, query) == ["Todo 1", "Todo 3"]
+
+    def test_created_range_with_timezone(self, client, seeded):
+        query = "created_after=2026-01-02T07:00:00%2B07:00&created_before=2026-01-04T12:00:00Z&sort=created_at"
+        assert self._titles(client, query) == ["Todo 2", "Todo 3"]
+
+    @pytest.mark.parametrize("sort, expected", [
+        ("created_at", ["Todo 0", "Todo 1", "Todo 2", "Todo 3", "Todo 4", "Todo 5"]),
+        ("updated_at", ["Todo 5", "Todo 4", "Todo 3", "Todo 2", "Todo 1", "Todo 0"]),
+        ("-updated_at", ["Todo 0", "Todo 1", "Todo 2", "Todo 3", "Todo 4", "Todo 5"]),
+    ])
+    def test_sorted_pagination(self, client, seeded, sort, expected):
+        titles, cursor = [], None
+        while True:
+            query = f"sort={sort}&limit=4" + (f"&cursor={cursor}" if cursor else "")
+            data = client.get(f"/api/todos?{query}").get_json()
+            titles += [todo["title"] for todo in data["data"]]
+            cursor = data["next_cursor"]
+            if not cursor:
+                break
+        assert titles == expected
+
+    def test_search_with_filter(self, client, seeded):
+        assert self._titles(client, "q=todo&completed=true&fields=title") != []
+        assert all(
+            todo["completed"]
+            for todo in client.get("/api/todos?q=todo&completed=true").get_json()["data"]
+        )
+
+
+# ---------------------------------------------------------------------------
+# 1.6 TestBatchAPI
+# ---------------------------------------------------------------------------
+class TestBatchAPI:
+    """Test POST /api/todos/batch"""
+
+    def test_batch_mixed_operations(self, client, app):
+        """Test creates, updates and deletes are applied in one batch"""
+        with app.app_context():
+            keep = Todo(title="Keep", description="Old")
+            drop = Todo(title="Drop")
+            db.session.add_all([keep, drop])
+            db.session.commit()
+            keep_id, drop_id = keep.id, drop.id
+
+        response = client.post("/api/todos/batch", json={"operations": [
+            {"op": "create", "data": {"title": "New 1"}},
+            {"op": "update", "id": keep_id, "data": {"completed": True}},
+            {"op": "delete", "id": drop_id},
+            {"op": "create", "data": {"title": "New 2", "description": "D"}},
+            {"op": "update", "id": 9999, "data": {"title": "Missing"}},
+        ]})
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data["success"] is True
+        assert [r["status"] for r in data["results"]] == [201, 200, 200, 201, 404]
+        assert data["results"][0]["data"]["title"] == "New 1"
+        assert data["results"][3]["data"]["description"] == "D"
+
+        with app.app_context():
+            titles = {todo.title for todo in Todo.query.all()}
+            assert titles == {"Keep", "New 1", "New 2"}
+            updated = db.session.get(Todo, keep_id)
+            assert updated.completed is True
+            assert updated.description == "Old"
+
+    @pytest.mark.parametrize("payload", [
+        None,
+        {"operations": []},
+        {"operations": [{"op": "explode"}]},
+        {"operations": [{"op": "create", "data": {}}]},
+        {"operations": [{"op": "update", "id": "1", "data": {"title": "x"}}]},
+        {"operations": [{"op": "update", "id": 1, "data": {}}]},
+        {"operations": [{"op": "delete", "id": 1}, {"op": "delete", "id": 1}]},
+        {"operations": [{"op": "create", "data": "nope"}]},
+    ])
+    def test_batch_validation_errors(self, client, payload):
+        """Test an invalid batch is rejected without applying anything"""
+        response = client.post("/api/todos/batch", json=payload)
+        assert response.status_code == 400
+        assert response.get_json()["success"] is False
+        assert client.get("/api/todos").get_json()["count"] == 0
+
+    def test_batch_too_many_operations(self, client, app):
+        """Test batch size is capped by BATCH_MAX_OPERATIONS"""
+        app.config["BATCH_MAX_OPERATIONS"] = 2
+        operations = [{"op": "create", "data": {"title": "T"}}] * 3
+        response = client.post("/api/todos/batch", json={"operations": operations})
+        assert response.status_code == 400
+
+    @patch("app.routes.db.session.commit")
+    def test_batch_database_error(self, mock_commit, client):
+        """Test database error rolls back the whole batch"""
+        mock_commit.side_effect = SQLAlchemyError("Database error")
+        response = client.post("/api/todos/batch", json={"operations": [
+            {"op": "create", "data": {"title": "T"}},
+        ]})
+        assert response.status_code == 500
+        assert response.get_json()["success"] is False
+
+
+# ---------------------------------------------------------------------------
+# 1.7 TestExportAPI
+# ---------------------------------------------------------------------------
+class TestExportAPI:
+    """Test GET /api/todos/export"""
+
+    def _seed(self, app, count):
+        with app.app_context():
+            db.session.add_all([Todo(title=f"Todo {i}") for i in range(count)])
+            db.session.commit()
+
+    def test_export_ndjson(self, client, app):
+        """Test NDJSON export streams one todo per line across chunks"""
+        app.config["EXPORT_CHUNK_SIZE"] = 2
+        self._seed(app, 5)
+
+        response = client.get("/api/todos/export")
+        assert response.status_code == 200
+        assert response.mimetype == "application/x-ndjson"
+        assert response.is_streamed
+        lines = response.get_data(as_text=True).splitlines()
+        assert [json.loads(line)["title"] for line in lines] == [f"Todo {i}" for i in range(5)]
+
+    def test_export_json_array(self, client, app):
+        """Test JSON array export is a valid array"""
+        app.config["EXPORT_CHUNK_SIZE"] = 2
+        self._seed(app, 3)
+
+        response = client.get("/api/todos/export?format=json")
+        assert response.mimetype == "application/json"
+        assert [todo["title"] for todo in response.get_json()] == ["Todo 0", "Todo 1", "Todo 2"]
+
+    def test_export_empty(self, client):
+        """Test exporting an empty table"""
+        assert client.get("/api/todos/export").get_data(as_text=True) == ""
+        assert client.get("/api/todos/export?format=json").get_json() == []
+
+    def test_export_invalid_format(self, client):
+        """Test unknown export format returns 400"""
+        response = client.get("/api/todos/export?format=xml")
+        assert response.status_code == 400
+
+    @patch("app.routes.db.session.execute")
+    def test_export_database_error(self, mock_execute, client):
+        """Test a database error aborts the stream"""
+        mock_execute.side_effect = SQLAlchemyError("DB Error")
+        with pytest.raises(SQLAlchemyError):
+            client.get("/api/todos/export")
+
+
+# ---------------------------------------------------------------------------
+# 1.8 TestConditionalRequests
+# ---------------------------------------------------------------------------
+class TestConditionalRequests:
+    """Test ETag / Last-Modified validators and If-Match preconditions"""
+
+    def _create(self, client, title="Conditional"):
+        response = client.post("/api/todos", json={"title": title})
+        return response.get_json()["data"]["id"], response.headers["ETag"]
+
+    @pytest.mark.parametrize("cache_backend", ["memory", "none"])
+    def test_single_todo_if_none_match(self, client, app, cache_backend):
+        """Test a matching If-None-Match returns 304 with or without the cache"""
+        app.config["CACHE_BACKEND"] = cache_backend
+        init_cache(app)
+        todo_id, etag = self._create(client)
+
+        response = client.get(f"/api/todos/{todo_id}")
+        assert response.status_code == 200
+        assert response.headers["ETag"] == etag
+        assert "Last-Modified" in response.headers
+
+        for _ in range(2):
+            response = client.get(f"/api/todos/{todo_id}", headers={"If-None-Match": etag})
+            assert response.status_code == 304
+            assert response.get_data() == b""
+
+    def test_single_todo_if_modified_since(self, client):
+        """Test If-Modified-Since uses updated_at"""
+        todo_id, _ = self._create(client)
+        last_modified = client.get(f"/api/todos/{todo_id}").headers["Last-Modified"]
+        headers = {"If-Modified-Since": last_modified}
+        assert client.get(f"/api/todos/{todo_id}", headers=headers).status_code == 304
+        app_cache = client.application.extensions["todo_cache"]
+        app_cache.delete(f"todo:{todo_id}")
+        assert client.get(f"/api/todos/{todo_id}", headers=headers).status_code == 304
+        headers = {"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"}
+        assert client.get(f"/api/todos/{todo_id}", headers=headers).status_code == 200
+
+    def test_list_etag_changes_on_write(self, client):
+        """Test list ETag answers 304 until the table changes"""
+        self._create(client, "First")
+        etag = client.get("/api/todos").headers["ETag"]
+        assert client.get("/api/todos", headers={"If-None-Match": etag}).status_code == 304
+
+        client.application.extensions["todo_cache"].incr("todos:version")
+        assert client.get("/api/todos", headers={"If-None-Match": etag}).status_code == 304
+
+        self._create(client, "Second")
+        response = client.get("/api/todos", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+        assert client.get("/api/todos?limit=1").headers["ETag"] != response.headers["ETag"]
+
+    def test_update_if_match(self, client):
+        """Test PUT honours If-Match"""
+        todo_id, etag = self._create(client)
+        response = client.put(f"/api/todos/{todo_id}", json={"title": "x"}, headers={"If-Match": '"stale"'})
+        assert response.status_code == 412
+        assert response.get_json()["success"] is False
+
+        response = client.put(f"/api/todos/{todo_id}", json={"title": "New"}, headers={"If-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
+        response = client.put(f"/api/todos/{todo_id}", json={"title": "Again"}, headers={"If-Match": etag})
+        assert response.status_code == 412
+
+    def test_delete_if_match(self, client):
+        """Test DELETE honours If-Match"""
+        todo_id, etag = self._create(client)
+        response = client.delete(f"/api/todos/{todo_id}", headers={"If-Match": '"stale"'})
+        assert response.status_code == 412
+        response = client.delete(f"/api/todos/{todo_id}", headers={"If-Match": "*"})
+        assert response.status_code == 200
+
+
+# ---------------------------------------------------------------------------
+# 1.9 TestSearchAPI
+# ---------------------------------------------------------------------------
+class TestSearchAPI:
+    """Test GET /api/todos?q= full-text search"""
+
+    def _seed(self, client):
+        for title, description in [
+            ("Buy milk", "from the corner shop"),
+            ("Write report", "quarterly milk sales"),
+            ("Milk the cow", "milk milk milk"),
+            ("Walk the dog", None),
+        ]:
+            client.post("/api/todos", json={"title": title, "description": description})
+
+    def test_search_ranks_matches(self, client):
+        """Test search returns only matches, best match first"""
+        self._seed(client)
+        data = client.get("/api/todos?q=milk").get_json()
+        assert data["count"] == 3
+        assert data["data"][0]["title"] == "Milk the cow"
+        assert {t["title"] for t in data["data"]} == {"Buy milk", "Write report", "Milk the cow"}
+
+    def test_search_all_terms_must_match(self, client):
+        """Test multiple terms are ANDed and FTS syntax is neutralised"""
+        self._seed(client)
+        assert client.get("/api/todos?q=milk shop").get_json()["count"] == 1
+        assert client.get('/api/todos?q="dog" OR NEAR(').get_json()["count"] == 0
+
+    def test_search_pagination(self, client):
+        """Test ranked results paginate with a (rank, id) cursor"""
+        self._seed(client)
+        first = client.get("/api/todos?q=milk&limit=2").get_json()
+        assert first["count"] == 2
+        second = client.get(f"/api/todos?q=milk&limit=2&cursor={first['next_cursor']}").get_json()
+        assert second["count"] == 1
+        assert second["next_cursor"] is None
+        titles = [t["title"] for t in first["data"] + second["data"]]
+        assert sorted(titles) == ["Buy milk", "Milk the cow", "Write report"]
+
+    def test_search_index_follows_updates_and_deletes(self, client):
+        """Test the search index is kept in sync with writes"""
+        todo_id = client.post("/api/todos", json={"title": "Old words"}).get_json()["data"]["id"]
+        client.put(f"/api/todos/{todo_id}", json={"title": "Fresh words"})
+        assert client.get("/api/todos?q=old").get_json()["count"] == 0
+        assert client.get("/api/todos?q=fresh").get_json()["count"] == 1
+        client.delete(f"/api/todos/{todo_id}")
+        assert client.get("/api/todos?q=fresh").get_json()["count"] == 0
+
+    def test_search_etag(self, client):
+        """Test search results carry an ETag usable for conditional GETs"""
+        self._seed(client)
+        etag = client.get("/api/todos?q=milk").headers["ETag"]
+        client.application.extensions["todo_cache"].incr("todos:version")
+        response = client.get("/api/todos?q=milk", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+
+    def test_search_rejects_list_cursor(self, client):
+        """Test a search cursor must be a (rank, id) cursor"""
+        response = client.get("/api/todos?q=milk&cursor=bm90LWpzb24")
+        assert response.status_code == 400
+
 
 # ---------------------------------------------------------------------------
-# 1.5 TestIntegration
+# 1.10 TestIntegration
 # ---------------------------------------------------------------------------
 class TestIntegration:
     """Integration tests for complete workflows"""
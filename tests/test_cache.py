@@ -0,0 +1,201 @@
+import sys
+import types
+from unittest.mock import patch
+
+import pytest
+
+from app import create_app
+from app.cache import MemoryCache, RedisCache, init_cache
+from app.models import Todo, db
+
+
+class FakeRedis:
+    """Local stand-in for the subset of redis-py the cache uses"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def incr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) + 1
+        return self.data[key]
+
+    def info(self, section):
+        return {"evicted_keys": 0}
+
+
+@pytest.fixture()
+def redis_app(monkeypatch):
+    """App wired to the Redis backend through FakeRedis"""
+    fake = FakeRedis()
+    module = types.SimpleNamespace(Redis=types.SimpleNamespace(from_url=lambda url: fake))
+    monkeypatch.setitem(sys.modules, "redis", module)
+
+    app = create_app("testing")
+    app.config["CACHE_BACKEND"] = "redis"
+    init_cache(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+class TestMemoryCache:
+    """Test the in-process LRU backend"""
+
+    def test_get_set_and_stats(self):
+        cache = MemoryCache()
+        assert cache.get("a") is None
+        cache.set("a", b"1")
+        assert cache.get("a") == b"1"
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["entries"] == 1
+        assert stats["bytes"] == 2
+
+    def test_ttl_expiry(self):
+        cache = MemoryCache(default_ttl=10)
+        with patch("app.cache.time.monotonic", return_value=100.0):
+            cache.set("a", b"1")
+        with patch("app.cache.time.monotonic", return_value=111.0):
+            assert cache.get("a") is None
+        assert cache.stats()["entries"] == 0
+
+    def test_lru_eviction_by_bytes(self):
+        cache = MemoryCache(max_bytes=6)
+        cache.set("a", b"11")
+        cache.set("b", b"22")
+        cache.get("a")
+        cache.set("c", b"33")
+        assert cache.get("b") is None
+        assert cache.get("a") == b"11"
+        assert cache.get("c") == b"33"
+        assert cache.stats()["evictions"] == 1
+
+    def test_oversized_value_is_not_cached(self):
+        cache = MemoryCache(max_bytes=4)
+        cache.set("a", b"too large")
+        assert cache.get("a") is None
+
+    def test_delete_and_counters(self):
+        cache = MemoryCache()
+        cache.set("a", b"1")
+        cache.set("a", b"2")
+        cache.delete("a", "missing")
+        assert cache.get("a") is None
+        assert cache.get_counter("v") == 0
+        assert cache.incr("v") == 1
+        assert cache.get_counter("v") == 1
+
+
+class TestRedisCache:
+    """Test the Redis backend against FakeRedis"""
+
+    def test_round_trip(self):
+        cache = RedisCache(FakeRedis())
+        assert cache.get("a") is None
+        cache.set("a", b"1")
+        assert cache.get("a") == b"1"
+        cache.delete("a")
+        cache.delete()
+        assert cache.get("a") is None
+        assert cache.incr("v") == 1
+        assert cache.get_counter("v") == 1
+        assert cache.stats() == {"backend": "redis", "hits": 1, "misses": 2, "evictions": 0}
+
+    def test_crud_through_redis_backend(self, redis_app):
+        client = redis_app.test_client()
+        todo_id = client.post("/api/todos", json={"title": "Cached"}).get_json()["data"]["id"]
+
+        assert client.get(f"/api/todos/{todo_id}").get_json()["data"]["title"] == "Cached"
+        assert client.get(f"/api/todos/{todo_id}").get_json()["data"]["title"] == "Cached"
+        client.put(f"/api/todos/{todo_id}", json={"title": "Changed"})
+        assert client.get(f"/api/todos/{todo_id}").get_json()["data"]["title"] == "Changed"
+        assert client.get("/api/internal/cache").get_json()["backend"] == "redis"
+
+
+class TestCachedRoutes:
+    """Test read-through caching and write-driven invalidation"""
+
+    def test_list_is_served_from_cache(self, client, app):
+        client.get("/api/todos")
+        with patch("app.routes.db.session.execute") as mock_execute:
+            data = client.get("/api/todos").get_json()
+            mock_execute.assert_not_called()
+        assert data["count"] == 0
+        stats = client.get("/api/internal/cache").get_json()
+        assert stats["enabled"] is True
+        assert stats["hits"] == 1
+
+    def test_single_todo_is_served_from_cache(self, client, app):
+        with app.app_context():
+            todo = Todo(title="Cached")
+            db.session.add(todo)
+            db.session.commit()
+            todo_id = todo.id
+
+        client.get(f"/api/todos/{todo_id}")
+        with patch("app.routes.db.session.get") as mock_get:
+            data = client.get(f"/api/todos/{todo_id}").get_json()
+            mock_get.assert_not_called()
+        assert data["data"]["title"] == "Cached"
+
+    def test_errors_are_not_cached(self, client):
+        assert client.get("/api/todos/1").status_code == 404
+        client.post("/api/todos", json={"title": "Now exists"})
+        assert client.get("/api/todos/1").status_code == 200
+
+    def test_writes_invalidate_lists(self, client):
+        assert client.get("/api/todos").get_json()["count"] == 0
+        todo_id = client.post("/api/todos", json={"title": "A"}).get_json()["data"]["id"]
+        assert client.get("/api/todos").get_json()["count"] == 1
+
+        client.put(f"/api/todos/{todo_id}", json={"completed": True})
+        assert client.get("/api/todos").get_json()["data"][0]["completed"] is True
+
+        client.post("/api/todos/batch", json={"operations": [{"op": "delete", "id": todo_id}]})
+        assert client.get("/api/todos").get_json()["count"] == 0
+        assert client.get(f"/api/todos/{todo_id}").status_code == 404
+
+    def test_cache_disabled(self, app):
+        app.config["CACHE_BACKEND"] = "none"
+        init_cache(app)
+        client = app.test_client()
+        assert client.get("/api/todos").status_code == 200
+        assert client.get("/api/internal/cache").get_json() == {"enabled": False}
+
+    def test_unknown_backend(self, app):
+        app.config["CACHE_BACKEND"] = "carrier-pigeon"
+        with pytest.raises(ValueError):
+            init_cache(app)
+
+
+class TestInternalEndpoints:
+    """Test INTERNAL_ENDPOINTS_ENABLED and INTERNAL_TOKEN guard /api/internal/*"""
+
+    PATHS = ("cache", "write-behind", "stream", "ratelimit", "pool")
+
+    def test_disabled(self, app, client):
+        app.config["INTERNAL_ENDPOINTS_ENABLED"] = False
+        for path in self.PATHS:
+            response = client.get(f"/api/internal/{path}")
+            assert response.status_code == 404
+            assert response.get_json()["success"] is False
+
+    def test_token(self, app, client):
+        app.config["INTERNAL_TOKEN"] = "s3cret"
+        for path in self.PATHS:
+            assert client.get(f"/api/internal/{path}").status_code == 401
+            assert client.get(f"/api/internal/{path}", headers={"X-Internal-Token": "wrong"}).status_code == 401
+            assert client.get(f"/api/internal/{path}", headers={"X-Internal-Token": "s3cret"}).status_code == 200
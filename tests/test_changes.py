@@ -0,0 +1,186 @@
+import base64
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app import create_app
+from app.changes import compact_tombstones
+from app.config import TestingConfig
+from app.models import Todo, TodoTombstone, db
+from app.pagination import decode_change_token, encode_change_token
+
+POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+
+def sync(client, since=None, **params):
+    query = {"since": since, **params} if since else params
+    response = client.get("/api/todos/changes", query_string=query)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+class TestChangesFeed:
+    """Test GET /api/todos/changes delta sync"""
+
+    def test_initial_sync_then_nothing_new(self, client):
+        for title in ("A", "B"):
+            client.post("/api/todos", json={"title": title})
+        data = sync(client)
+        assert [todo["title"] for todo in data["updated"]] == ["A", "B"]
+        assert data["deleted"] == []
+        assert data["has_more"] is False
+
+        again = sync(client, data["next_since"])
+        assert again["updated"] == [] and again["deleted"] == []
+        assert decode_change_token(again["next_since"])[0] == decode_change_token(data["next_since"])[0]
+
+    def test_updates_and_deletes_since_token(self, client):
+        ids = [client.post("/api/todos", json={"title": f"T{i}"}).get_json()["data"]["id"] for i in range(3)]
+        token = sync(client)["next_since"]
+
+        client.put(f"/api/todos/{ids[0]}", json={"completed": True})
+        client.put(f"/api/todos/{ids[0]}", json={"title": "T0 again"})
+        client.delete(f"/api/todos/{ids[1]}")
+        new_id = client.post("/api/todos", json={"title": "T3"}).get_json()["data"]["id"]
+
+        data = sync(client, token)
+        assert {todo["id"]: todo["title"] for todo in data["updated"]} == {ids[0]: "T0 again", new_id: "T3"}
+        assert data["updated"][0]["completed"] is True
+        assert data["deleted"] == [ids[1]]
+
+    def test_batch_changes_are_tracked(self, client):
+        todo_id = client.post("/api/todos", json={"title": "Old"}).get_json()["data"]["id"]
+        token = sync(client)["next_since"]
+        client.post("/api/todos/batch", json={"operations": [
+            {"op": "update", "id": todo_id, "data": {"completed": True}},
+            {"op": "create", "data": {"title": "New"}},
+        ]})
+        client.post("/api/todos/batch", json={"operations": [{"op": "delete", "id": todo_id}]})
+
+        data = sync(client, token)
+        assert [todo["title"] for todo in data["updated"]] == ["New"]
+        assert data["deleted"] == [todo_id]
+
+    def test_paging_follows_change_order(self, client):
+        for i in range(5):
+            client.post("/api/todos", json={"title": f"T{i}"})
+        titles, token = [], None
+        while True:
+            data = sync(client, token, limit=2)
+            titles += [todo["title"] for todo in data["updated"]]
+            token = data["next_since"]
+            if not data["has_more"]:
+                break
+        assert titles == ["T0", "T1", "T2", "T3", "T4"]
+
+    def test_invalid_and_expired_tokens(self, client, app):
+        assert client.get("/api/todos/changes?since=bogus").status_code == 400
+        assert client.get("/api/todos/changes?limit=0").status_code == 400
+
+        ttl = app.config["TODOS_TOMBSTONE_TTL_DAYS"]
+        stale = encode_change_token((0, 1), datetime.utcnow() - timedelta(days=ttl + 1))
+        response = client.get(f"/api/todos/changes?since={stale}")
+        assert response.status_code == 410
+        assert response.get_json()["success"] is False
+
+    def test_token_without_change_xid_still_resumes(self, client):
+        client.post("/api/todos", json={"title": "A"})
+        seq = db.session.execute(db.select(Todo.change_seq)).scalar()
+        client.post("/api/todos", json={"title": "B"})
+        # token รูปแบบเดิม [change_seq, issued_at] ก่อนมี change_xid
+        payload = json.dumps([seq, datetime.utcnow().isoformat()]).encode()
+        old = base64.urlsafe_b64encode(payload).decode().rstrip("=")
+        assert [todo["title"] for todo in sync(client, old)["updated"]] == ["B"]
+
+    def test_list_etag_changes_on_delete(self, client):
+        todo_id = client.post("/api/todos", json={"title": "Gone"}).get_json()["data"]["id"]
+        etag = client.get("/api/todos").headers["ETag"]
+        client.delete(f"/api/todos/{todo_id}")
+        assert client.get("/api/todos", headers={"If-None-Match": etag}).status_code == 200
+
+
+class TestTombstoneCompaction:
+    """Test tombstone retention"""
+
+    def _create_and_delete(self, client, count):
+        # สร้างครบก่อนค่อยลบ เพราะ SQLite นำ id ที่ถูกลบไปแล้วกลับมาใช้ใหม่
+        ids = [client.post("/api/todos", json={"title": f"T{i}"}).get_json()["data"]["id"] for i in range(count)]
+        for todo_id in ids:
+            client.delete(f"/api/todos/{todo_id}")
+        return ids
+
+    def test_compaction_keeps_recent_and_newest(self, client, app):
+        *old_ids, recent_id = self._create_and_delete(client, 3)
+        with app.app_context():
+            db.session.execute(
+                db.update(TodoTombstone)
+                .where(TodoTombstone.id.in_(old_ids + [recent_id]))
+                .values(deleted_at=datetime.utcnow() - timedelta(days=90))
+            )
+            db.session.execute(
+                db.update(TodoTombstone)
+                .where(TodoTombstone.id == old_ids[1])
+                .values(deleted_at=datetime.utcnow())
+            )
+            assert compact_tombstones(30) == 1
+            remaining = set(db.session.execute(db.select(TodoTombstone.id)).scalars())
+        # old_ids[0] หายไป, old_ids[1] ยังใหม่อยู่, recent_id เป็น tombstone ล่าสุดจึงถูกเก็บไว้
+        assert remaining == {old_ids[1], recent_id}
+
+    def test_cli_command(self, client, app):
+        self._create_and_delete(client, 1)
+        result = app.test_cli_runner().invoke(args=["compact-tombstones", "--days", "0"])
+        assert result.exit_code == 0
+        assert "Removed 0 tombstones" in result.output
+        with app.app_context():
+            assert db.session.query(Todo).count() == 0
+
+
+@pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL not set")
+def test_feed_waits_for_transactions_that_commit_out_of_order(monkeypatch):
+    monkeypatch.setattr(TestingConfig, "SQLALCHEMY_DATABASE_URI", POSTGRES_URL)
+    app = create_app("testing")
+    tables = [TodoTombstone.__table__, Todo.__table__]
+    insert = text(
+        "INSERT INTO todos (title, completed, created_at, updated_at) VALUES (:title, false, now(), now())"
+    )
+    with app.app_context():
+        db.metadata.drop_all(db.engine, tables=tables)
+        db.metadata.create_all(db.engine, tables=tables)
+        other = create_engine(POSTGRES_URL)
+        client = app.test_client()
+
+        def titles(data):
+            return sorted(todo["title"] for todo in data["updated"])
+
+        try:
+            since = sync(client)["next_since"]
+            with other.connect() as first, other.connect() as second:
+                # first ได้ change_seq ต่ำกว่าแต่ commit ทีหลัง
+                first.execute(insert, {"title": "first"})
+                second.execute(insert, {"title": "second"})
+                second.commit()
+                held = sync(client, since)
+                assert held["updated"] == []
+                assert decode_change_token(held["next_since"])[0] == decode_change_token(since)[0]
+                first.commit()
+                data = sync(client, since)
+                assert titles(data) == ["first", "second"]
+                since = data["next_since"]
+
+                # second เริ่ม transaction ก่อน (xid ต่ำกว่า) และ commit ก่อน first จะเสร็จ
+                second.execute(insert, {"title": "early"})
+                first.execute(insert, {"title": "slow"})
+                second.execute(insert, {"title": "late"})
+                second.commit()
+                data = sync(client, since)
+                assert titles(data) == ["early", "late"]
+                first.commit()
+                assert titles(sync(client, data["next_since"])) == ["slow"]
+        finally:
+            other.dispose()
+            db.session.remove()
+            db.metadata.drop_all(db.engine, tables=tables)
@@ -0,0 +1,140 @@
+import gzip
+import json
+import shutil
+
+import brotli
+import pytest
+import zstandard
+
+from app import create_app
+from app.compression import available_codecs
+from app.config import Config, TestingConfig
+
+DECOMPRESS = {
+    "gzip": gzip.decompress,
+    "br": brotli.decompress,
+    "zstd": lambda data: zstandard.ZstdDecompressor().decompressobj().decompress(data),
+}
+
+
+@pytest.fixture()
+def todos(client):
+    for i in range(30):
+        client.post("/api/todos", json={"title": f"todo {i}", "description": "compress me " * 5})
+    return client
+
+
+class TestResponseCompression:
+    """Test Accept-Encoding negotiation for API responses"""
+
+    @pytest.mark.parametrize("encoding", ["gzip", "br", "zstd"])
+    def test_list_is_compressed(self, todos, encoding):
+        plain = todos.get("/api/todos")
+        response = todos.get("/api/todos", headers={"Accept-Encoding": encoding})
+        assert response.headers["Content-Encoding"] == encoding
+        assert "Accept-Encoding" in response.headers["Vary"]
+        assert int(response.headers["Content-Length"]) < len(plain.get_data())
+        assert json.loads(DECOMPRESS[encoding](response.get_data())) == plain.get_json()
+
+    @pytest.mark.parametrize("accept, expected", [
+        ("gzip, deflate, br, zstd", "zstd"),
+        ("gzip;q=1.0, br;q=0.5", "gzip"),
+        ("*", "zstd"),
+    ])
+    def test_negotiation(self, todos, accept, expected):
+        assert todos.get("/api/todos", headers={"Accept-Encoding": accept}).headers["Content-Encoding"] == expected
+
+    def test_identity_and_small_bodies_are_not_compressed(self, todos):
+        response = todos.get("/api/todos")
+        assert "Content-Encoding" not in response.headers
+        assert "Accept-Encoding" in response.headers["Vary"]
+
+        small = todos.get("/api/todos/1", headers={"Accept-Encoding": "gzip"})
+        assert "Content-Encoding" not in small.headers
+
+    def test_etag_per_encoding(self, todos):
+        plain = todos.get("/api/todos").headers["ETag"]
+        etags = {todos.get("/api/todos", headers={"Accept-Encoding": e}).headers["ETag"] for e in DECOMPRESS}
+        assert etags == {plain[:-1] + f'-{encoding}"' for encoding in DECOMPRESS}
+
+        gzipped = plain[:-1] + '-gzip"'
+        again = todos.get("/api/todos", headers={"Accept-Encoding": "gzip", "If-None-Match": gzipped})
+        assert again.status_code == 304
+        assert again.headers["ETag"] == gzipped
+        assert todos.get("/api/todos", headers={"If-None-Match": plain}).status_code == 304
+
+    def test_compressed_etag_passes_if_match(self, client):
+        todo_id = client.post("/api/todos", json={"title": "big", "description": "x" * 2000}).get_json()["data"]["id"]
+        response = client.get(f"/api/todos/{todo_id}", headers={"Accept-Encoding": "br"})
+        assert response.headers["Content-Encoding"] == "br"
+        etag = response.headers["ETag"]
+        assert etag.endswith('-br"')
+        # cache hit ก็ตอบ 304 ด้วย ETag เดียวกัน
+        cached = client.get(f"/api/todos/{todo_id}", headers={"Accept-Encoding": "br", "If-None-Match": etag})
+        assert (cached.status_code, cached.headers["ETag"]) == (304, etag)
+        response = client.put(f"/api/todos/{todo_id}", json={"completed": True}, headers={"If-Match": etag})
+        assert response.status_code == 200
+        stale = client.put(f"/api/todos/{todo_id}", json={"completed": False}, headers={"If-Match": etag})
+        assert stale.status_code == 412
+
+    @pytest.mark.parametrize("encoding", ["gzip", "br", "zstd"])
+    def test_export_stream_is_compressed(self, todos, app, encoding):
+        app.config["EXPORT_CHUNK_SIZE"] = 7
+        plain = todos.get("/api/todos/export").get_data()
+        response = todos.get("/api/todos/export", headers={"Accept-Encoding": encoding})
+        assert response.is_streamed
+        assert response.headers["Content-Encoding"] == encoding
+        assert "Content-Length" not in response.headers
+        assert DECOMPRESS[encoding](response.get_data()) == plain
+
+    def test_disabled(self, monkeypatch):
+        monkeypatch.setattr(TestingConfig, "COMPRESS_ENABLED", False, raising=False)
+        client = create_app("testing").test_client()
+        assert "Content-Encoding" not in client.get("/", headers={"Accept-Encoding": "gzip"}).headers
+
+    def test_algorithms_setting(self):
+        config = {key: getattr(Config, key) for key in dir(Config) if key.startswith("COMPRESS_")}
+        assert list(available_codecs({**config, "COMPRESS_ALGORITHMS": "gzip, br"})) == ["gzip", "br"]
+        with pytest.raises(ValueError):
+            available_codecs({**config, "COMPRESS_ALGORITHMS": "deflate"})
+
+
+class TestPrecompressedStatic:
+    """Test flask compress-static output is served with long-lived caching"""
+
+    @pytest.fixture()
+    def static_app(self, app, tmp_path):
+        shutil.copy(f"{app.static_folder}/swagger.json", tmp_path / "swagger.json")
+        app.static_folder = str(tmp_path)
+        result = app.test_cli_runner().invoke(args=["compress-static"])
+        assert result.exit_code == 0
+        assert sorted(p.name for p in tmp_path.iterdir()) == [
+            "swagger.json", "swagger.json.br", "swagger.json.gz", "swagger.json.zst",
+        ]
+        return app
+
+    @pytest.mark.parametrize("encoding", ["gzip", "br", "zstd"])
+    def test_precompressed_variant(self, static_app, encoding):
+        client = static_app.test_client()
+        plain = client.get("/static/swagger.json").get_data()
+        response = client.get("/static/swagger.json", headers={"Accept-Encoding": encoding})
+        assert response.headers["Content-Encoding"] == encoding
+        assert response.mimetype == "application/json"
+        assert response.cache_control.max_age == 365 * 24 * 3600
+        assert DECOMPRESS[encoding](response.get_data()) == plain
+        response.close()
+
+    def test_identity_fallback(self, static_app):
+        response = static_app.test_client().get("/static/swagger.json")
+        assert "Content-Encoding" not in response.headers
+        assert "Accept-Encoding" in response.headers["Vary"]
+        assert response.cache_control.max_age == 365 * 24 * 3600
+        response.close()
+
+    def test_long_max_age_only_for_static(self, static_app):
+        # send_file นอก /static (เช่นผลของ job) ไม่ได้ max-age หนึ่งปีไปด้วย
+        assert static_app.config["SEND_FILE_MAX_AGE_DEFAULT"] is None
+        assert static_app.get_send_file_max_age("swagger.json") is None
+
+    def test_swagger_url_is_versioned(self, client):
+        assert "/static/swagger.json?v=" in client.get("/docs/").get_data(as_text=True)
@@ -48,6 +48,10 @@ class TestProductionConfig:
         """Test debug mode is disabled in production"""
         assert ProductionConfig.DEBUG is False
 
+    def test_internal_endpoints_disabled(self):
+        """Test /api/internal/* is off in production"""
+        assert ProductionConfig.INTERNAL_ENDPOINTS_ENABLED is False
+
     def test_requires_database_url(self, monkeypatch):
         """Test production requires DATABASE_URL environment variable"""
         # Remove DATABASE_URL if it exists
@@ -0,0 +1,98 @@
+import time
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import create_app, db
+from app.config import TestingConfig
+from app.health import get_health_monitor
+
+
+@pytest.fixture()
+def monitor(app):
+    monitor = get_health_monitor()
+    yield monitor
+    monitor.close()
+
+
+@pytest.fixture()
+def statements(app):
+    executed = []
+
+    def record(*args):
+        executed.append(args[2])
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(db.engine, "before_cursor_execute", record)
+
+
+class TestProbes:
+    """Test liveness and readiness probes"""
+
+    def test_live_does_no_io(self, client, statements):
+        response = client.get("/api/health/live")
+        assert response.status_code == 200
+        assert response.get_json() == {"status": "alive"}
+        assert statements == []
+
+    def test_ready_reports_database_and_pool(self, client, monitor):
+        response = client.get("/api/health/ready")
+        assert response.status_code == 200
+        body = response.get_json()
+        assert body["status"] == "ready"
+        default = body["databases"]["default"]
+        assert default["ok"] is True
+        assert default["latency_ms"] >= 0
+        assert "pool" in default["pool"]
+
+    def test_ready_is_cached(self, client, monitor, statements):
+        client.get("/api/health/ready")
+        for _ in range(5):
+            assert client.get("/api/health/ready").status_code == 200
+        assert monitor.checks == 1
+        assert statements == ["SELECT 1"]
+
+    def test_background_refresh(self, client, monitor):
+        monitor.interval = 0.01
+        client.get("/api/health/ready")
+        deadline = time.monotonic() + 5
+        while monitor.checks < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert monitor.checks >= 3
+
+    def test_database_down_is_not_ready(self, client, monitor, monkeypatch):
+        def fail(self):
+            raise RuntimeError("connection refused")
+
+        monkeypatch.setattr(Engine, "connect", fail)
+        monitor.refresh()
+        response = client.get("/api/health/ready")
+        assert response.status_code == 503
+        default = response.get_json()["databases"]["default"]
+        assert default["ok"] is False
+        assert default["error"] == "connection refused"
+
+    def test_stale_result_is_not_ready(self, client, monitor):
+        client.get("/api/health/ready")
+        monitor.max_age = 0
+        time.sleep(0.01)
+        response = client.get("/api/health/ready")
+        assert response.status_code == 503
+        assert response.get_json()["status"] == "not_ready"
+
+    def test_probes_are_not_rate_limited(self, monkeypatch):
+        monkeypatch.setattr(TestingConfig, "RATELIMIT_READ", "1 per hour", raising=False)
+        app = create_app("testing")
+        with app.app_context():
+            db.create_all()
+            client = app.test_client()
+            for _ in range(3):
+                assert client.get("/api/health/live").status_code == 200
+                assert client.get("/api/health/ready").status_code == 200
+                assert client.get("/api/health").status_code == 200
+            assert client.get("/api/todos").status_code == 200
+            assert client.get("/api/todos").status_code == 429
+            get_health_monitor().close()
+            db.drop_all()
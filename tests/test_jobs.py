@@ -0,0 +1,254 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app import create_app
+from app.config import TestingConfig
+from app.jobs import JOB_HANDLERS, JobWorker, claim_jobs, execute_job, requeue_expired
+from app.models import Job, Todo, db
+
+POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+ALICE = {"X-Owner-ID": "alice"}
+BOB = {"X-Owner-ID": "bob"}
+
+
+@pytest.fixture()
+def app(monkeypatch, tmp_path):
+    monkeypatch.setattr(TestingConfig, "JOBS_RESULT_DIR", str(tmp_path), raising=False)
+    monkeypatch.setattr(TestingConfig, "JOBS_CHUNK_SIZE", 2, raising=False)
+    app = create_app("testing")
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def queue(client, kind, params=None, headers=ALICE):
+    response = client.post("/api/jobs", json={"kind": kind, "params": params or {}}, headers=headers)
+    assert response.status_code == 202
+    return response.get_json()["data"]["id"]
+
+
+def run_next(app):
+    """Claim and run one job like a pool process does (fresh app context, no owner)"""
+    with app.app_context():
+        claimed = claim_jobs("test", 1, 60)
+        assert claimed, "no job was due"
+        return execute_job(*claimed[0])
+
+
+def job(client, job_id, headers=ALICE):
+    return client.get(f"/api/jobs/{job_id}", headers=headers).get_json()["data"]
+
+
+def titles(client, headers=ALICE):
+    return sorted(t["title"] for t in client.get("/api/todos?limit=200", headers=headers).get_json()["data"])
+
+
+class TestJobsApi:
+    """Test POST /api/jobs, GET /api/jobs/<id> and cancel"""
+
+    @pytest.mark.parametrize("body", [
+        {"kind": "reindex"},
+        {"kind": "import", "params": {"todos": []}},
+        {"kind": "import", "params": {"todos": [{"description": "no title"}]}},
+        {"kind": "complete", "params": {"completed": "yes"}},
+        {"kind": "purge", "params": []},
+    ])
+    def test_invalid(self, client, body):
+        response = client.post("/api/jobs", json=body)
+        assert response.status_code == 400
+        assert response.get_json()["success"] is False
+
+    def test_queued(self, client):
+        response = client.post("/api/jobs", json={"kind": "export"}, headers=ALICE)
+        data = response.get_json()["data"]
+        assert response.headers["Location"] == f"/api/jobs/{data['id']}"
+        assert data["status"] == "queued"
+        assert data["progress"] == {"processed": 0, "total": None}
+        assert job(client, data["id"])["status"] == "queued"
+
+    def test_other_owner_cannot_see_or_cancel(self, client):
+        job_id = queue(client, "export")
+        assert client.get(f"/api/jobs/{job_id}", headers=BOB).status_code == 404
+        assert client.post(f"/api/jobs/{job_id}/cancel", headers=BOB).status_code == 404
+
+    def test_cancel_queued(self, client, app):
+        job_id = queue(client, "export")
+        response = client.post(f"/api/jobs/{job_id}/cancel", headers=ALICE)
+        assert response.status_code == 200
+        assert response.get_json()["data"]["status"] == "cancelled"
+        assert client.post(f"/api/jobs/{job_id}/cancel", headers=ALICE).status_code == 409
+        with app.app_context():
+            assert claim_jobs("test", 1, 60) == []
+
+
+class TestJobExecution:
+    """Test the job handlers, retries, cancellation and leases"""
+
+    def test_import_in_chunks(self, client, app):
+        todos = [{"title": f"t{i}", "completed": i == 0} for i in range(5)]
+        job_id = queue(client, "import", {"todos": todos})
+        assert run_next(app) == "succeeded"
+        data = job(client, job_id)
+        assert data["progress"] == {"processed": 5, "total": 5}
+        assert data["result"] == {"created": 5}
+        assert data["attempts"] == 1
+        assert titles(client) == [f"t{i}" for i in range(5)]
+        assert titles(client, BOB) == []
+
+    def test_complete_and_purge(self, client, app):
+        for title in ("a", "b", "c"):
+            client.post("/api/todos", json={"title": title}, headers=ALICE)
+        client.post("/api/todos", json={"title": "bob's"}, headers=BOB)
+
+        queue(client, "complete")
+        assert run_next(app) == "succeeded"
+        assert all(t["completed"] for t in client.get("/api/todos", headers=ALICE).get_json()["data"])
+        assert client.get("/api/todos", headers=BOB).get_json()["data"][0]["completed"] is False
+
+        since = client.get("/api/todos/changes", headers=ALICE).get_json()["next_since"]
+        job_id = queue(client, "purge")
+        assert run_next(app) == "succeeded"
+        assert job(client, job_id)["result"] == {"deleted": 3}
+        assert titles(client) == []
+        assert titles(client, BOB) == ["bob's"]
+        assert len(client.get(f"/api/todos/changes?since={since}", headers=ALICE).get_json()["deleted"]) == 3
+
+    def test_export_and_download(self, client, app):
+        for title in ("a", "b", "c"):
+            client.post("/api/todos", json={"title": title}, headers=ALICE)
+        job_id = queue(client, "export")
+        assert client.get(f"/api/jobs/{job_id}/download", headers=ALICE).status_code == 409
+        assert run_next(app) == "succeeded"
+        assert job(client, job_id)["result"]["rows"] == 3
+
+        response = client.get(f"/api/jobs/{job_id}/download", headers=ALICE)
+        assert response.status_code == 200
+        assert response.headers["Cache-Control"] == "private, no-store"
+        assert [json.loads(line)["title"] for line in response.get_data(as_text=True).splitlines()] == ["a", "b", "c"]
+        response.close()
+        assert client.get(f"/api/jobs/{job_id}/download", headers=BOB).status_code == 404
+
+    def test_retry_resumes_then_fails(self, client, app, monkeypatch):
+        handler, validate = JOB_HANDLERS["import"]
+        calls = []
+
+        def flaky(ctx, params):
+            calls.append(ctx.processed)
+            if len(calls) == 1:
+                # chunk แรก commit แล้วค่อยพัง: รอบถัดไปต้องเริ่มต่อจากตรงนั้น
+                db.session.execute(db.insert(Todo), params["todos"][:2])
+                ctx.progress(2, 4)
+                db.session.execute(db.insert(Todo), [{"title": "rolled back"}])
+                raise RuntimeError("boom")
+            return handler(ctx, params)
+
+        monkeypatch.setitem(JOB_HANDLERS, "import", (flaky, validate))
+        job_id = queue(client, "import", {"todos": [{"title": f"t{i}"} for i in range(4)]})
+        assert run_next(app) == "queued"
+        data = job(client, job_id)
+        assert data["error"] == "boom"
+        with app.app_context():
+            assert claim_jobs("test", 1, 60) == []  # ยังไม่ถึง run_after (backoff)
+            db.session.execute(db.update(Job).values(run_after=datetime.utcnow()))
+            db.session.commit()
+        assert run_next(app) == "succeeded"
+        assert calls == [0, 2]
+        assert titles(client) == ["t0", "t1", "t2", "t3"]
+
+        def broken(ctx, params):
+            raise RuntimeError("still broken")
+
+        monkeypatch.setitem(JOB_HANDLERS, "import", (broken, validate))
+        job_id = queue(client, "import", {"todos": [{"title": "x"}]})
+        with app.app_context():
+            db.session.execute(db.update(Job).where(Job.id == job_id).values(max_attempts=1))
+            db.session.commit()
+        assert run_next(app) == "failed"
+        assert job(client, job_id)["error"] == "still broken"
+
+    def test_cancel_running(self, client, app):
+        job_id = queue(client, "import", {"todos": [{"title": f"t{i}"} for i in range(6)]})
+        with app.app_context():
+            ((claimed_id, token),) = claim_jobs("test", 1, 60)
+        response = client.post(f"/api/jobs/{job_id}/cancel", headers=ALICE)
+        assert response.status_code == 202
+        assert response.get_json()["data"]["cancel_requested"] is True
+        with app.app_context():
+            assert execute_job(claimed_id, token) == "cancelled"
+        data = job(client, job_id)
+        assert data["status"] == "cancelled"
+        # chunk ที่ commit ไปแล้วยังอยู่
+        assert data["progress"]["processed"] == 2
+        assert titles(client) == ["t0", "t1"]
+
+    def test_expired_lease_is_requeued_and_old_claim_stops(self, client, app):
+        job_id = queue(client, "import", {"todos": [{"title": "a"}, {"title": "b"}, {"title": "c"}]})
+        with app.app_context():
+            ((_, stale_token),) = claim_jobs("dead-worker", 1, 60)
+            db.session.execute(db.update(Job).values(lease_until=datetime.utcnow() - timedelta(seconds=1)))
+            db.session.commit()
+            assert requeue_expired() == 1
+        assert job(client, job_id)["status"] == "queued"
+        with app.app_context():
+            ((_, token),) = claim_jobs("test", 1, 60)
+            assert execute_job(job_id, stale_token) is None
+            assert execute_job(job_id, token) == "succeeded"
+        assert job(client, job_id)["attempts"] == 2
+        assert titles(client) == ["a", "b", "c"]
+
+    def test_expired_lease_out_of_attempts_fails(self, client, app):
+        job_id = queue(client, "export")
+        with app.app_context():
+            claim_jobs("dead-worker", 1, 60)
+            db.session.execute(db.update(Job).values(max_attempts=1, lease_until=datetime.utcnow() - timedelta(1)))
+            db.session.commit()
+            requeue_expired()
+        data = job(client, job_id)
+        assert data["status"] == "failed"
+        assert data["finished_at"] is not None
+
+    def test_worker_runs_claimed_jobs_on_executor(self, client, app):
+        job_ids = [queue(client, "import", {"todos": [{"title": f"job{i}"}]}) for i in range(3)]
+
+        def run(job_id, token):
+            with app.app_context():
+                return execute_job(job_id, token)
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            worker = JobWorker(app, executor, concurrency=2, run=run)
+            assert worker.run_once() == 2  # เท่าจำนวน slot ว่าง
+            wait(list(worker._running))
+            assert worker.run_once() == 1
+            wait(list(worker._running))
+        assert [job(client, job_id)["status"] for job_id in job_ids] == ["succeeded"] * 3
+
+
+@pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL not set")
+def test_claim_skips_locked_jobs_on_postgres(monkeypatch):
+    monkeypatch.setattr(TestingConfig, "SQLALCHEMY_DATABASE_URI", POSTGRES_URL)
+    app = create_app("testing")
+    with app.app_context():
+        db.metadata.create_all(db.engine, tables=[Job.__table__])
+        try:
+            first, second = Job(kind="export", params={}), Job(kind="export", params={})
+            db.session.add_all([first, second])
+            db.session.commit()
+            # worker อื่นกำลังถือแถวแรกอยู่ (ยังไม่ commit)
+            other = create_engine(POSTGRES_URL).connect()
+            other.execute(text("SELECT id FROM jobs WHERE id = :id FOR UPDATE"), {"id": first.id})
+            claimed = claim_jobs("test", 2, 60)
+            assert [job_id for job_id, _ in claimed] == [second.id]
+            other.rollback()
+            assert [job_id for job_id, _ in claim_jobs("test", 2, 60)] == [first.id]
+            other.close()
+        finally:
+            db.session.remove()
+            db.metadata.drop_all(db.engine, tables=[Job.__table__])
@@ -0,0 +1,69 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+from app import create_app
+from app.config import TestingConfig
+from app.json_provider import OrjsonJSONProvider, StdlibJSONProvider, init_json
+
+PAYLOAD = {
+    "success": True,
+    "data": [{"id": 1, "title": "งานบ้าน", "completed": False, "created_at": datetime(2026, 1, 2, 3, 4, 5, 678)}],
+    "count": 1,
+    "next_cursor": None,
+}
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def provider(request, app):
+    app.config["JSON_ENCODER"] = request.param
+    return init_json(app)
+
+
+class TestJsonProvider:
+    """Test both JSON providers produce the same documents"""
+
+    def test_orjson_is_default(self, app):
+        assert isinstance(app.json, OrjsonJSONProvider)
+
+    def test_datetimes_are_iso_8601(self, provider):
+        assert json.loads(provider.dumps({"d": datetime(2026, 1, 2, 3, 4, 5)})) == {"d": "2026-01-02T03:04:05"}
+        assert json.loads(provider.dumps([date(2026, 1, 2), Decimal("1.5")])) == ["2026-01-02", "1.5"]
+
+    def test_documents_match_stdlib(self, provider, app):
+        with app.test_request_context():
+            body = provider.response(PAYLOAD).get_data()
+        assert body.endswith(b"}\n")
+        expected = json.dumps(PAYLOAD, default=datetime.isoformat, sort_keys=True)
+        assert json.loads(body) == json.loads(expected)
+        assert list(json.loads(body)) == sorted(PAYLOAD)
+
+    def test_loads(self, provider):
+        assert provider.loads('{"a": [1, 2.5, "ก"]}') == {"a": [1, 2.5, "ก"]}
+
+    def test_non_string_keys_and_unsupported_types(self, provider):
+        assert json.loads(provider.dumps({1: "a"})) == {"1": "a"}
+        with pytest.raises(TypeError):
+            provider.dumps({"a": object()})
+
+    def test_stdlib_keyword_arguments_fall_back(self, app):
+        provider = OrjsonJSONProvider(app)
+        assert provider.dumps({"a": 1}, indent=2) == '{\n  "a": 1\n}'
+        assert provider.loads("1.5", parse_float=Decimal) == Decimal("1.5")
+
+    def test_debug_output_is_indented(self, app):
+        app.debug = True
+        assert OrjsonJSONProvider(app).dumps({"a": 1}) == '{\n  "a": 1\n}'
+
+    def test_stdlib_setting(self, monkeypatch):
+        monkeypatch.setattr(TestingConfig, "JSON_ENCODER", "stdlib", raising=False)
+        app = create_app("testing")
+        assert type(app.json) is StdlibJSONProvider
+        assert app.test_client().get("/nonexistent").get_json() == {"success": False, "error": "Resource not found"}
+
+    def test_invalid_setting(self, app):
+        app.config["JSON_ENCODER"] = "ujson"
+        with pytest.raises(ValueError):
+            init_json(app)
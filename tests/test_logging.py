@@ -0,0 +1,139 @@
+import io
+import json
+import logging
+import queue
+import threading
+
+import pytest
+
+from app import create_app, db
+from app.config import TestingConfig
+from app.logging_config import AccessSampler, NonBlockingQueueHandler, flush_logs, setup_logging
+
+
+@pytest.fixture()
+def json_app(monkeypatch):
+    monkeypatch.setattr(TestingConfig, "LOG_FORMAT", "json", raising=False)
+    monkeypatch.setattr(TestingConfig, "RATELIMIT_ENABLED", False, raising=False)
+    app = create_app("testing")
+    stream = io.StringIO()
+    setup_logging(app, stream)
+    with app.app_context():
+        db.create_all()
+        yield app, stream
+        db.drop_all()
+    flush_logs()
+
+
+def read_lines(stream):
+    flush_logs()
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+class TestJsonLogging:
+    """Test structured access logs written through the log queue"""
+
+    def test_access_line_fields(self, json_app):
+        app, stream = json_app
+        client = app.test_client()
+        client.post("/api/todos", json={"title": "t"})
+        response = client.get("/api/todos/1", headers={"X-Request-ID": "abc-123"})
+        assert response.headers["X-Request-ID"] == "abc-123"
+
+        line = [entry for entry in read_lines(stream) if entry["logger"] == "app.access"][-1]
+        assert line["request_id"] == "abc-123"
+        assert line["route"] == "/api/todos/<int:todo_id>"
+        assert line["path"] == "/api/todos/1"
+        assert line["status"] == 200
+        assert line["latency_ms"] >= 0
+        assert line["db_queries"] >= 1
+        assert line["db_ms"] >= 0
+        assert line["sample_rate"] == 1.0
+
+    def test_request_id_generated_and_sanitized(self, json_app):
+        app, _ = json_app
+        client = app.test_client()
+        first = client.get("/api/todos").headers["X-Request-ID"]
+        second = client.get("/api/todos", headers={"X-Request-ID": "bad id; level=ERROR"}).headers["X-Request-ID"]
+        assert len(first) == 32
+        assert second != first and " " not in second
+
+    def test_app_logs_carry_request_id(self, json_app):
+        app, stream = json_app
+
+        @app.route("/boom")
+        def boom():
+            raise RuntimeError("boom")
+
+        response = app.test_client().get("/boom")
+        assert response.status_code == 500
+        lines = read_lines(stream)
+        error = next(entry for entry in lines if entry["level"] == "ERROR")
+        assert error["request_id"] == response.headers["X-Request-ID"]
+        assert "RuntimeError: boom" in error["exc_info"]
+        assert next(entry for entry in lines if entry["logger"] == "app.access")["status"] == 500
+
+    def test_success_logs_are_sampled(self, monkeypatch):
+        monkeypatch.setattr(TestingConfig, "LOG_FORMAT", "json", raising=False)
+        monkeypatch.setattr(TestingConfig, "LOG_ACCESS_BURST", 2, raising=False)
+        monkeypatch.setattr(TestingConfig, "LOG_ACCESS_SAMPLE_RATE", 0.0, raising=False)
+        monkeypatch.setattr("app.logging_config.time.monotonic", lambda: 100.0)
+        app = create_app("testing")
+        stream = io.StringIO()
+        setup_logging(app, stream)
+        client = app.test_client()
+        for _ in range(5):
+            client.get("/api/internal/cache")
+        client.get("/api/missing")
+
+        statuses = [entry["status"] for entry in read_lines(stream) if entry["logger"] == "app.access"]
+        # 2 แรกใน burst, ที่เหลือถูก sample ทิ้ง; 404 log เสมอ
+        assert statuses == [200, 200, 404]
+
+    def test_invalid_format(self, app):
+        app.config["LOG_FORMAT"] = "xml"
+        with pytest.raises(ValueError):
+            setup_logging(app)
+
+
+class TestAccessSampler:
+    """Test per-second burst plus sampling of success-path access logs"""
+
+    def test_burst_then_sample(self, monkeypatch):
+        monkeypatch.setattr("app.logging_config.time.monotonic", lambda: 100.0)
+        sampler = AccessSampler(rate=0.0, burst=3)
+        assert [sampler.sample() for _ in range(5)] == [1.0, 1.0, 1.0, None, None]
+
+        monkeypatch.setattr("app.logging_config.time.monotonic", lambda: 101.0)
+        assert sampler.sample() == 1.0
+
+    def test_kept_lines_report_rate(self, monkeypatch):
+        monkeypatch.setattr("app.logging_config.random.random", lambda: 0.05)
+        assert AccessSampler(rate=0.1).sample() == 0.1
+
+    def test_burst_is_exact_across_threads(self, monkeypatch):
+        monkeypatch.setattr("app.logging_config.time.monotonic", lambda: 100.0)
+        sampler = AccessSampler(rate=0.0, burst=400)
+        kept = []
+
+        def run():
+            kept.extend(rate for rate in (sampler.sample() for _ in range(100)) if rate is not None)
+
+        threads = [threading.Thread(target=run) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(kept) == 400
+
+
+class TestQueueHandler:
+    """Test the request thread never blocks on a full log queue"""
+
+    def test_full_queue_drops(self):
+        handler = NonBlockingQueueHandler(queue.Queue(1))
+        record = logging.LogRecord("app", logging.INFO, __file__, 1, "hello %s", ("world",), None)
+        handler.handle(record)
+        handler.handle(record)
+        assert handler.dropped == 1
+        assert handler.queue.get_nowait().msg == "hello world"
@@ -0,0 +1,78 @@
+import pytest
+from flask import g
+from prometheus_client import REGISTRY
+from sqlalchemy.exc import OperationalError
+
+from app.models import db
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def snapshot(info):
+    return {key: list(value) if isinstance(value, list) else value for key, value in info.items()}
+
+
+class TestMetrics:
+    """Test the Prometheus /metrics endpoint"""
+
+    def test_request_metrics_are_recorded(self, client):
+        before = sample("http_requests_total", endpoint="api.health", method="GET", status="200")
+        queries_before = sample("db_queries_per_request_sum", endpoint="api.health")
+
+        client.get("/api/health")
+
+        assert sample("http_requests_total", endpoint="api.health", method="GET", status="200") == before + 1
+        assert sample("db_queries_per_request_sum", endpoint="api.health") == queries_before + 1
+        assert sample("http_request_duration_seconds_count", endpoint="api.health", method="GET") >= 1
+        assert sample("http_response_size_bytes_count", endpoint="api.health") >= 1
+
+    def test_metrics_endpoint(self, client):
+        client.get("/api/todos")
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.mimetype == "text/plain"
+        body = response.get_data(as_text=True)
+        assert 'http_request_duration_seconds_bucket{endpoint="api.get_todos"' in body
+        assert "db_time_seconds_per_request" in body
+
+    def test_unmatched_routes_share_a_label(self, client):
+        before = sample("http_requests_total", endpoint="unmatched", method="GET", status="404")
+        client.get("/does-not-exist")
+        assert sample("http_requests_total", endpoint="unmatched", method="GET", status="404") == before + 1
+
+    def test_rate_limit_rejections(self, client):
+        client.application.config["RATELIMIT_READ"] = "5 per hour"
+        before = sample("rate_limit_rejections_total", endpoint="api.get_todos")
+        statuses = {client.get("/api/todos").status_code for _ in range(6)}
+        assert 429 in statuses
+
+        response = client.get("/api/todos")
+        assert response.status_code == 429
+        assert response.get_json()["success"] is False
+        assert sample("rate_limit_rejections_total", endpoint="api.get_todos") >= before + 2
+        assert client.get("/metrics").status_code == 200
+
+    def test_multiprocess_mode(self, client, monkeypatch, tmp_path):
+        monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+        response = client.get("/metrics")
+        assert response.status_code == 200
+
+    def test_http_errors_keep_their_status(self, client):
+        response = client.post("/api/health")
+        assert response.status_code == 405
+        assert response.get_json()["success"] is False
+
+    def test_failed_statement_leaves_nothing_on_the_connection(self, app):
+        with app.test_request_context():
+            g.db_queries, g.db_time = 0, 0.0
+            connection = db.session.connection()
+            info_before = snapshot(connection.info)
+            with pytest.raises(OperationalError):
+                db.session.execute(db.text("SELECT * FROM no_such_table"))
+            db.session.rollback()
+            connection = db.session.connection()
+            db.session.execute(db.text("SELECT 1"))
+            assert snapshot(connection.info) == info_before
+            assert g.db_queries == 1
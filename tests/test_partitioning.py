@@ -0,0 +1,79 @@
+import os
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.models import Todo, TodoTombstone, db
+from app.partitioning import rebuild_statements
+
+POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+TABLES = [TodoTombstone.__table__, Todo.__table__]
+
+
+class TestRebuildStatements:
+    """Test the partition-todos DDL and command"""
+
+    def test_hash_partitions(self):
+        statements = rebuild_statements(4)
+        assert any(s.endswith("PRIMARY KEY (owner_id, id)) PARTITION BY HASH (owner_id)") for s in statements)
+        assert sum("PARTITION OF todos_rebuild" in s for s in statements) == 4
+        assert statements.index("DROP TABLE todos") > statements.index(
+            "ALTER SEQUENCE todos_id_seq OWNED BY todos_rebuild.id"
+        )
+        for index in Todo.__table__.indexes:
+            assert any(f"CREATE INDEX {index.name} ON todos " in s for s in statements)
+        # triggers ถูกลบไปพร้อมตารางเดิม ต้องสร้างใหม่ทั้ง change feed และ NOTIFY
+        assert any(s.startswith("CREATE TRIGGER todos_notify_change") for s in statements)
+
+    def test_plain_table(self):
+        statements = rebuild_statements(0)
+        assert not any("PARTITION" in s for s in statements)
+        assert any(s.endswith("PRIMARY KEY (id))") for s in statements)
+
+    def test_negative(self):
+        with pytest.raises(ValueError):
+            rebuild_statements(-1)
+
+    def test_cli(self, app):
+        runner = app.test_cli_runner()
+        result = runner.invoke(args=["partition-todos", "--partitions", "2", "--sql"])
+        assert result.exit_code == 0
+        assert "FOR VALUES WITH (MODULUS 2, REMAINDER 1);" in result.output
+        # SQLite ใน tests: รันจริงไม่ได้
+        result = runner.invoke(args=["partition-todos", "--partitions", "2"])
+        assert result.exit_code != 0
+        assert "needs PostgreSQL" in result.output
+
+
+@pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL not set")
+def test_rebuild_round_trip_on_postgres():
+    engine = create_engine(POSTGRES_URL)
+    db.metadata.drop_all(engine, tables=TABLES)
+    db.metadata.create_all(engine, tables=TABLES)
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO todos (owner_id, title, completed, created_at, updated_at) "
+                "SELECT 'user' || n % 10, 'todo ' || n, false, now(), now() FROM generate_series(1, 1000) AS n"
+            ))
+            before = conn.execute(text("SELECT sum(change_seq), max(id) FROM todos")).one()
+        for partitions in (4, 0):
+            with engine.begin() as conn:
+                for statement in rebuild_statements(partitions):
+                    conn.exec_driver_sql(statement)
+            with engine.begin() as conn:
+                assert conn.execute(text("SELECT sum(change_seq), max(id) FROM todos")).one() == before
+                plan = "\n".join(conn.execute(text("EXPLAIN SELECT id FROM todos WHERE owner_id = 'user3'")).scalars())
+                scanned = {name for name in ("todos_p0", "todos_p1", "todos_p2", "todos_p3") if name in plan}
+                assert len(scanned) == (1 if partitions else 0)
+                # sequence และ trigger ยังทำงานหลัง rebuild
+                new = conn.execute(text("INSERT INTO todos (owner_id, title, completed, created_at, updated_at) "
+                                        "VALUES ('user3', 'new', false, now(), now()) RETURNING id, change_seq")).one()
+                assert new.id > before[1] and new.change_seq is not None
+                conn.execute(text("DELETE FROM todos WHERE id = :id"), {"id": new.id})
+                tombstone = text("SELECT owner_id FROM todo_tombstones WHERE id = :id")
+                assert conn.execute(tombstone, {"id": new.id}).scalar() == "user3"
+    finally:
+        db.metadata.drop_all(engine, tables=TABLES)
+        engine.dispose()
@@ -0,0 +1,183 @@
+import io
+import json
+import os
+import pstats
+import sys
+
+import pytest
+
+from app import create_app, db
+from app.config import TestingConfig
+from app.logging_config import flush_logs, setup_logging
+from app.models import Todo
+from app.profiling import parameter_shape, server_timing
+
+POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+
+def make_app(monkeypatch, **settings):
+    monkeypatch.setattr(TestingConfig, "RATELIMIT_ENABLED", False, raising=False)
+    monkeypatch.setattr(TestingConfig, "LOG_ACCESS_ENABLED", False, raising=False)
+    for name, value in settings.items():
+        monkeypatch.setattr(TestingConfig, name, value, raising=False)
+    return create_app("testing")
+
+
+@pytest.fixture()
+def profiled(monkeypatch, tmp_path):
+    app = make_app(
+        monkeypatch,
+        SERVER_TIMING_ENABLED=True,
+        PROFILE_ENABLED=True,
+        PROFILE_SAMPLE_RATE=0.0,
+        PROFILE_TOKEN="s3cret",
+        PROFILE_DIR=str(tmp_path),
+        PROFILE_MAX_FILES=2,
+    )
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture()
+def slow_log(monkeypatch):
+    app = make_app(monkeypatch, SLOW_QUERY_MS=0.0001, LOG_FORMAT="json")
+    stream = io.StringIO()
+    setup_logging(app, stream)
+    with app.app_context():
+        db.create_all()
+        yield app, stream
+        db.drop_all()
+    flush_logs()
+
+
+def slow_queries(stream):
+    flush_logs()
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    return [line for line in lines if line["logger"] == "app.slow_query"]
+
+
+class TestDisabled:
+    """Test nothing is hooked in while profiling is off"""
+
+    def test_defaults_hook_nothing(self, app, client):
+        assert app.extensions["profiling"] == {"profiler": None, "slow_queries": None}
+        assert "response" not in vars(app.json)
+        response = client.get("/api/todos", headers={"X-Profile": "anything"})
+        assert "Server-Timing" not in response.headers
+        assert "X-Profile-Id" not in response.headers
+
+
+class TestServerTiming:
+    """Test the Server-Timing header"""
+
+    def test_breakdown(self, profiled):
+        client = profiled.test_client()
+        client.post("/api/todos", json={"title": "t"})
+        header = client.get("/api/todos").headers["Server-Timing"]
+        metrics = dict(part.split(";", 1) for part in header.split(", "))
+        assert list(metrics) == ["db", "serialize", "total"]
+        assert 'desc="' in metrics["db"] and "0 queries" not in metrics["db"]
+        durations = {name: float(value.split("dur=")[1].split(";")[0]) for name, value in metrics.items()}
+        assert durations["total"] >= durations["db"] + durations["serialize"] > 0
+
+    def test_format(self):
+        assert server_timing(0.0123, 2, 0.0004, 0.02) == (
+            'db;dur=12.3;desc="2 queries", serialize;dur=0.4, total;dur=20.0'
+        )
+
+
+class TestRequestProfiler:
+    """Test header-triggered and sampled cProfile dumps"""
+
+    def test_header_with_token(self, profiled, tmp_path):
+        client = profiled.test_client()
+        assert "X-Profile-Id" not in client.get("/api/todos").headers
+        assert "X-Profile-Id" not in client.get("/api/todos", headers={"X-Profile": "wrong"}).headers
+
+        # query string ใหม่: ไม่ใช่ cache hit
+        response = client.get("/api/todos?limit=5", headers={"X-Profile": "s3cret", "X-Request-ID": "req-1"})
+        name = response.headers["X-Profile-Id"]
+        assert name.endswith("-GET-api-get_todos-req-1.prof")
+        stats = pstats.Stats(str(tmp_path / name))
+        assert any(func[2] == "get_todos" for func in stats.stats)
+
+    def test_sampled_and_pruned(self, profiled, tmp_path):
+        profiled.extensions["profiling"]["profiler"].sample_rate = 1.0
+        client = profiled.test_client()
+        names = [client.get("/api/health/live").headers["X-Profile-Id"] for _ in range(3)]
+        # PROFILE_MAX_FILES=2: เหลือสองไฟล์ล่าสุด
+        assert sorted(os.listdir(tmp_path)) == names[1:]
+
+    def test_profiler_stopped_when_after_request_fails(self, profiled):
+        profiled.config["PROPAGATE_EXCEPTIONS"] = True
+
+        @profiled.after_request
+        def boom(response):
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            profiled.test_client().get("/api/health/live", headers={"X-Profile": "s3cret"})
+        assert sys.getprofile() is None
+
+
+class TestSlowQueryLog:
+    """Test slow statements are logged with parameter types and plan"""
+
+    def test_logged_with_plan(self, slow_log):
+        app, stream = slow_log
+        client = app.test_client()
+        client.post("/api/todos", json={"title": "secret title"})
+        client.get("/api/todos/1", headers={"X-Request-ID": "slow-1"})
+
+        entries = slow_queries(stream)
+        select = next(e for e in entries if e["request_id"] == "slow-1" and "FROM todos" in e["statement"])
+        assert select["endpoint"] == "api.get_todo"
+        assert select["duration_ms"] > 0
+        assert "todos" in select["plan"]
+        insert = next(e for e in entries if e["statement"].startswith("INSERT INTO todos"))
+        assert "str" in insert["parameters"]
+        assert "secret title" not in json.dumps(entries)
+
+    def test_each_statement_explained_once_per_interval(self, slow_log):
+        app, stream = slow_log
+        client = app.test_client()
+        for _ in range(2):
+            client.get("/api/todos/1")
+        plans = [e["plan"] for e in slow_queries(stream) if "FROM todos" in e["statement"]]
+        assert plans[0] and plans[-1] is None
+
+    def test_parameter_shape(self):
+        assert parameter_shape({"a": 1, "b": "x"}) == {"a": "int", "b": "str"}
+        assert parameter_shape((1, None)) == ["int", "NoneType"]
+        assert parameter_shape({f"p{i}": i for i in range(25)})["..."] == 5
+        assert parameter_shape(list(range(21)))[-1] == "... 1 more"
+
+
+@pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL not set")
+def test_explain_keeps_postgres_transaction_usable(monkeypatch):
+    monkeypatch.setattr(TestingConfig, "SQLALCHEMY_DATABASE_URI", POSTGRES_URL)
+    app = make_app(monkeypatch, SLOW_QUERY_MS=0.0001)
+    slow_queries = app.extensions["profiling"]["slow_queries"]
+    with app.app_context():
+        db.metadata.create_all(db.engine, tables=[Todo.__table__])
+        try:
+            db.session.add(Todo(title="pg"))
+            db.session.flush()
+            plan = slow_queries._plan(
+                db.session.connection().connection.cursor(), "postgresql", "SELECT * FROM no_such_table", {}
+            )
+            assert plan is None
+            # EXPLAIN ที่พังถูก rollback แค่ถึง savepoint: transaction เดิมยังใช้ต่อได้
+            assert db.session.execute(db.select(Todo.title)).scalars().all() == ["pg"]
+            plan = slow_queries._plan(
+                db.session.connection().connection.cursor(), "postgresql",
+                "SELECT * FROM todos WHERE id = %(id)s", {"id": 1},
+            )
+            assert "todos" in plan
+            db.session.rollback()
+        finally:
+            db.session.remove()
+            db.metadata.drop_all(db.engine, tables=[Todo.__table__])
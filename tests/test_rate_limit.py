@@ -0,0 +1,122 @@
+import time
+
+import pytest
+from limits import parse
+from limits.storage import MemoryStorage
+from limits.strategies import MovingWindowRateLimiter
+
+from app import create_app
+from app.config import Config, TestingConfig
+from app.rate_limit import LocalBucketStorage, limiter_settings
+
+
+def make_config(**overrides):
+    config = {key: getattr(Config, key) for key in dir(Config) if key.startswith("RATELIMIT_")}
+    config.update(overrides)
+    return config
+
+
+class TestLimiterSettings:
+    """Test RATELIMIT_* settings are turned into limiter storage settings"""
+
+    def test_memory_is_used_as_is(self):
+        assert limiter_settings(make_config()) == {"RATELIMIT_STORAGE_URI": "memory://"}
+
+    def test_shared_storage_gets_local_pre_check(self):
+        settings = limiter_settings(make_config(RATELIMIT_STORAGE_URI="redis://redis:6379/1"))
+        assert settings["RATELIMIT_STORAGE_URI"] == "local+redis://redis:6379/1"
+        assert settings["RATELIMIT_STORAGE_OPTIONS"] == {"local_share": 0.01, "local_sync_seconds": 1.0}
+
+    @pytest.mark.parametrize("overrides", [
+        {"RATELIMIT_LOCAL_SHARE": 0},
+        {"RATELIMIT_STRATEGY": "sliding-window-counter", "RATELIMIT_STORAGE_URI": "memcached://mc:11211"},
+    ])
+    def test_pre_check_disabled(self, overrides):
+        config = make_config(**{"RATELIMIT_STORAGE_URI": "redis://redis:6379/1", **overrides})
+        assert limiter_settings(config) == {"RATELIMIT_STORAGE_URI": config["RATELIMIT_STORAGE_URI"]}
+
+
+class TestLocalBucketStorage:
+    """Test the per-worker token bucket in front of a shared moving window"""
+
+    def _workers(self, count, **options):
+        shared = MemoryStorage()
+        workers = [LocalBucketStorage("local+memory://", **options) for _ in range(count)]
+        for worker in workers:
+            worker.backend = shared
+        return shared, workers
+
+    def test_most_hits_stay_local(self):
+        _, (worker,) = self._workers(1, local_share=0.05)
+        limiter = MovingWindowRateLimiter(worker)
+        limit = parse("1000 per hour")
+        assert all(limiter.hit(limit, "client") for _ in range(100))
+        stats = worker.stats()
+        assert stats["local_hits"] + stats["remote_syncs"] == 100
+        assert stats["remote_syncs"] <= 3
+
+    def test_overshoot_is_bounded(self):
+        shared, workers = self._workers(4, local_share=0.01)
+        limiters = [MovingWindowRateLimiter(worker) for worker in workers]
+        limit = parse("1000 per hour")
+        allowed = sum(limiters[i % 4].hit(limit, "client") for i in range(2000))
+        # ไม่เกิน workers x share x limit
+        assert 1000 <= allowed <= 1000 + 4 * 10
+        assert sum(worker.stats()["local_hits"] for worker in workers) > 800
+
+        # เกิน limit แล้วตอบ 429 ได้จาก bucket ในเครื่องโดยไม่ต้องถาม storage
+        syncs = sum(worker.stats()["remote_syncs"] for worker in workers)
+        assert not any(limiters[i % 4].hit(limit, "client") for i in range(100))
+        assert sum(worker.stats()["remote_syncs"] for worker in workers) == syncs
+
+    def test_local_hits_are_written_back(self):
+        shared, (worker,) = self._workers(1, local_share=0.1, local_sync_seconds=0.05)
+        limiter = MovingWindowRateLimiter(worker)
+        limit = parse("100 per hour")
+        for _ in range(10):
+            limiter.hit(limit, "client")
+        time.sleep(0.06)
+        limiter.hit(limit, "client")
+        assert shared.get_moving_window(limit.key_for("client"), 100, limit.get_expiry())[1] == 11
+
+    def test_clear_and_reset(self):
+        _, (worker,) = self._workers(1)
+        limiter = MovingWindowRateLimiter(worker)
+        limit = parse("1 per hour")
+        assert limiter.hit(limit, "client")
+        assert not limiter.hit(limit, "client")
+        worker.clear(limit.key_for("client"))
+        assert limiter.hit(limit, "client")
+        worker.reset()
+        assert worker.stats()["buckets"] == 0
+        assert worker.check()
+
+
+class TestEndpointLimits:
+    """Test separate read and write limits on /api routes"""
+
+    def test_writes_limited_separately_from_reads(self, client, app):
+        app.config["RATELIMIT_WRITE"] = "2 per hour"
+        assert [client.post("/api/todos", json={"title": "t"}).status_code for _ in range(3)] == [201, 201, 429]
+        assert client.get("/api/todos").status_code == 200
+
+    def test_limits_are_per_endpoint(self, client, app):
+        app.config["RATELIMIT_READ"] = "1 per hour"
+        assert client.get("/api/todos").status_code == 200
+        assert client.get("/api/todos").status_code == 429
+        assert client.get("/api/todos/changes").status_code == 200
+
+    def test_app_with_local_pre_check(self, monkeypatch):
+        monkeypatch.setattr(TestingConfig, "RATELIMIT_STORAGE_URI", "local+memory://", raising=False)
+        client = create_app("testing").test_client()
+        for _ in range(3):
+            client.get("/api/internal/cache")
+        data = client.get("/api/internal/ratelimit").get_json()
+        assert data["storage"] == "LocalBucketStorage"
+        assert data["strategy"] == "moving-window"
+        assert data["local_hits"] >= 2
+
+    def test_stats_when_disabled(self, monkeypatch):
+        monkeypatch.setattr(TestingConfig, "RATELIMIT_ENABLED", False, raising=False)
+        client = create_app("testing").test_client()
+        assert client.get("/api/internal/ratelimit").get_json() == {"enabled": False}
@@ -0,0 +1,116 @@
+import pytest
+from sqlalchemy import event
+
+from app import create_app, db
+from app.config import TestingConfig
+from app.replicas import PRIMARY_COOKIE, PRIMARY_HEADER, replica_binds
+
+
+@pytest.fixture()
+def replicated(monkeypatch, tmp_path):
+    """Primary and two replicas as separate SQLite files (no replication between them)"""
+    monkeypatch.setattr(TestingConfig, "SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path / 'primary.db'}")
+    monkeypatch.setattr(
+        TestingConfig, "DATABASE_REPLICA_URLS",
+        f"sqlite:///{tmp_path / 'replica0.db'}, sqlite:///{tmp_path / 'replica1.db'}", raising=False,
+    )
+    app = create_app("testing")
+    with app.app_context():
+        for engine in db.engines.values():
+            db.metadata.create_all(engine)
+        statements = {key: [] for key in db.engines}
+        for key, engine in db.engines.items():
+            event.listen(engine, "before_cursor_execute", lambda *args, key=key: statements[key].append(args[2]))
+        app.statements = statements
+        yield app
+        db.session.remove()
+    # init_app เพิ่ม metadata ต่อ bind key ไว้ใน db ที่ใช้ร่วมกันทุก app
+    for key in ("replica0", "replica1"):
+        db.metadatas.pop(key, None)
+
+
+def executed_on(app):
+    return {key for key, statements in app.statements.items() if statements}
+
+
+def reset(app):
+    for statements in app.statements.values():
+        statements.clear()
+
+
+class TestReadReplicas:
+    """Test GET requests go to replicas and everything else to the primary"""
+
+    def test_reads_round_robin_over_replicas(self, replicated):
+        client = replicated.test_client()
+        seen = []
+        for _ in range(4):
+            reset(replicated)
+            assert client.get("/api/todos/changes").status_code == 200
+            seen.append(executed_on(replicated))
+        assert seen == [{"replica0"}, {"replica1"}, {"replica0"}, {"replica1"}]
+
+    def test_writes_and_health_use_primary(self, replicated):
+        client = replicated.test_client()
+        assert client.post("/api/todos", json={"title": "primary"}).status_code == 201
+        assert executed_on(replicated) == {None}
+
+        reset(replicated)
+        assert client.get("/api/health").status_code == 200
+        assert executed_on(replicated) == {None}
+
+    def test_read_your_writes(self, replicated):
+        writer, reader = replicated.test_client(), replicated.test_client()
+        created = writer.post("/api/todos", json={"title": "mine"})
+        assert writer.get_cookie(PRIMARY_COOKIE) is not None
+
+        # replica ยังไม่มีแถวนี้ (ไม่มี replication จริงใน test)
+        assert reader.get("/api/todos").get_json()["count"] == 0
+        assert writer.get("/api/todos").get_json()["count"] == 1
+        assert writer.get(f"/api/todos/{created.get_json()['data']['id']}").status_code == 200
+
+        writer.set_cookie(PRIMARY_COOKIE, "0")
+        reset(replicated)
+        writer.get("/api/todos/changes")
+        assert executed_on(replicated) in ({"replica0"}, {"replica1"})
+
+    def test_read_your_writes_without_cookies(self, replicated):
+        client = replicated.test_client(use_cookies=False)
+        created = client.post("/api/todos", json={"title": "mine"})
+        until = created.headers[PRIMARY_HEADER]
+
+        assert client.get("/api/todos").get_json()["count"] == 0
+        reset(replicated)
+        assert client.get("/api/todos", headers={PRIMARY_HEADER: until}).get_json()["count"] == 1
+        assert executed_on(replicated) == {None}
+
+    def test_failed_writes_do_not_stick(self, replicated):
+        client = replicated.test_client()
+        response = client.post("/api/todos", json={})
+        assert response.status_code == 400
+        assert client.get_cookie(PRIMARY_COOKIE) is None
+        assert PRIMARY_HEADER not in response.headers
+
+    def test_invalid_cookie_reads_replica(self, replicated):
+        client = replicated.test_client()
+        client.set_cookie(PRIMARY_COOKIE, "soon")
+        client.get("/api/todos/changes")
+        assert executed_on(replicated) == {"replica0"}
+
+
+class TestReplicaConfig:
+    """Test DATABASE_REPLICA_URLS parsing"""
+
+    def test_no_replicas_by_default(self, app):
+        assert list(db.engines) == [None]
+        assert PRIMARY_COOKIE not in app.test_client().post("/api/todos", json={"title": "x"}).headers.get(
+            "Set-Cookie", ""
+        )
+
+    def test_postgres_urls_get_pool_settings(self):
+        config = {key: getattr(TestingConfig, key) for key in dir(TestingConfig) if key.isupper()}
+        config["DATABASE_REPLICA_URLS"] = "postgres://u:p@replica:5432/todo,"
+        binds = replica_binds(config)
+        assert list(binds) == ["replica0"]
+        assert binds["replica0"]["url"] == "postgresql+psycopg://u:p@replica:5432/todo"
+        assert binds["replica0"]["pool_size"] == TestingConfig.DB_POOL_SIZE
@@ -0,0 +1,115 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app import create_app
+from app.cli import LazyMigrateGroup
+from app.config import DevelopmentConfig, ProductionConfig, TestingConfig
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# วัดใน process ใหม่ เพราะ process ของ pytest import ทุกอย่างไว้แล้ว
+STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from sqlalchemy import event
+from sqlalchemy.pool import Pool
+from app import create_app
+imported = time.perf_counter()
+connections = []
+event.listen(Pool, "connect", lambda *args: connections.append(1))
+app = create_app("production")
+created = time.perf_counter()
+connections_before_request = len(connections)
+with app.app_context():
+    from app.models import db
+    db.create_all()
+client = app.test_client()
+before_request = time.perf_counter()
+status = client.get("/api/todos").status_code
+first_request = time.perf_counter() - before_request
+print(json.dumps({
+    "import": imported - start,
+    "create_app": created - imported,
+    "first_request": first_request,
+    "status": status,
+    "connections_before_request": connections_before_request,
+    "alembic_loaded": "alembic" in sys.modules,
+    "swagger_loaded": "flask_swagger_ui" in sys.modules,
+}))
+"""
+
+# งบเวลา (วินาที) เผื่อ CI เครื่องช้า; ปรับได้ผ่าน env
+IMPORT_BUDGET = float(os.getenv("STARTUP_IMPORT_BUDGET", "1.5"))
+CREATE_APP_BUDGET = float(os.getenv("STARTUP_CREATE_APP_BUDGET", "0.5"))
+FIRST_REQUEST_BUDGET = float(os.getenv("STARTUP_FIRST_REQUEST_BUDGET", "0.5"))
+
+
+@pytest.fixture(scope="module")
+def startup(tmp_path_factory):
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{tmp_path_factory.mktemp('startup') / 'startup.db'}",
+        "RATELIMIT_ENABLED": "false",
+        "PYTHONPATH": ROOT,
+    }
+    env.pop("AUTO_CREATE_TABLES", None)
+    env.pop("SWAGGER_ENABLED", None)
+    result = subprocess.run(
+        [sys.executable, "-c", STARTUP_SCRIPT], cwd=ROOT, env=env, capture_output=True, text=True, timeout=60
+    )
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+class TestProductionStartup:
+    """Startup benchmark: keep the production boot path cheap"""
+
+    def test_no_database_connection_before_first_request(self, startup):
+        # --preload: ไม่มี connection ที่ถูก fork ไปใช้ร่วมกันใน worker
+        assert startup["connections_before_request"] == 0
+
+    def test_migrations_and_docs_not_imported(self, startup):
+        assert startup["alembic_loaded"] is False
+        assert startup["swagger_loaded"] is False
+
+    def test_first_request_succeeds(self, startup):
+        assert startup["status"] == 200
+
+    # เวลาขึ้นกับเครื่อง: รันเฉพาะเมื่อสั่ง `pytest -m perf`
+    @pytest.mark.perf
+    def test_timings_within_budget(self, startup):
+        assert startup["import"] < IMPORT_BUDGET
+        assert startup["create_app"] < CREATE_APP_BUDGET
+        assert startup["first_request"] < FIRST_REQUEST_BUDGET
+
+
+class TestStartupConfig:
+    """Test startup flags per environment"""
+
+    def test_flags(self):
+        assert DevelopmentConfig.AUTO_CREATE_TABLES is True
+        assert DevelopmentConfig.SWAGGER_ENABLED is True
+        assert TestingConfig.AUTO_CREATE_TABLES is False
+        assert ProductionConfig.AUTO_CREATE_TABLES is False
+        assert ProductionConfig.SWAGGER_ENABLED is False
+
+    def test_docs_follow_swagger_flag(self, client, monkeypatch):
+        assert client.get("/docs/").status_code == 200
+        assert client.get("/").get_json()["endpoints"]["docs"] == "/docs"
+
+        monkeypatch.setattr(TestingConfig, "SWAGGER_ENABLED", False)
+        client = create_app("testing").test_client()
+        assert client.get("/docs/").status_code == 404
+        assert "docs" not in client.get("/").get_json()["endpoints"]
+
+    def test_db_command_is_lazy(self, app):
+        group = app.cli.commands["db"]
+        assert isinstance(group, LazyMigrateGroup)
+        result = app.test_cli_runner().invoke(args=["db", "--help"])
+        assert result.exit_code == 0
+        assert "upgrade" in result.output
+        assert "migrate" in app.extensions
@@ -0,0 +1,215 @@
+import os
+import time
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import Todo, TodoTombstone
+from app.pagination import decode_change_token, encode_change_token
+from app.stream import get_change_hub
+
+POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+ALICE = {"X-Owner-ID": "alice"}
+BOB = {"X-Owner-ID": "bob"}
+
+
+@pytest.fixture()
+def app(monkeypatch, tmp_path):
+    # ไฟล์ SQLite: thread ของ hub ได้ connection ของตัวเอง ไม่ใช้ร่วมกับ request
+    monkeypatch.setattr(TestingConfig, "SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path / 'stream.db'}")
+    monkeypatch.setattr(TestingConfig, "SSE_HEARTBEAT_SECONDS", 0.05, raising=False)
+    monkeypatch.setattr(TestingConfig, "SSE_QUEUE_SIZE", 5, raising=False)
+    app = create_app("testing")
+    with app.app_context():
+        db.create_all()
+        yield app
+        get_change_hub().close()
+        db.session.remove()
+        db.drop_all()
+
+
+def open_stream(client, headers=ALICE, **kwargs):
+    response = client.get("/api/todos/stream", headers=headers, buffered=False, **kwargs)
+    assert response.status_code == 200
+    chunks = iter(response.response)
+    assert next(chunks) == b"retry: 3000\n\n"
+    return response, chunks
+
+
+def read_events(chunks, count, timeout=2.0):
+    """Parse SSE events until ``count`` arrived (heartbeats skipped)"""
+    events = []
+    deadline = time.monotonic() + timeout
+    while len(events) < count:
+        assert time.monotonic() < deadline, f"only {events} arrived"
+        for block in next(chunks).decode().split("\n\n"):
+            fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+            if fields:
+                events.append(fields)
+    return events
+
+
+class TestTodoStream:
+    """Test GET /api/todos/stream"""
+
+    def test_live_events_for_own_todos_only(self, client):
+        response, chunks = open_stream(client)
+        assert response.mimetype == "text/event-stream"
+        assert response.headers["Cache-Control"] == "no-cache"
+        assert "Content-Encoding" not in response.headers
+
+        client.post("/api/todos", json={"title": "bob's"}, headers=BOB)
+        todo_id = client.post("/api/todos", json={"title": "alice's"}, headers=ALICE).get_json()["data"]["id"]
+        # อ่านทีละ event: change ของ todo เดียวกันที่ยังไม่ถูกส่งจะถูกรวมเหลือครั้งล่าสุด
+        events = read_events(chunks, 1)
+        client.patch(f"/api/todos/{todo_id}", json={"completed": True}, headers=ALICE)
+        events += read_events(chunks, 1)
+        client.delete(f"/api/todos/{todo_id}", headers=ALICE)
+        events += read_events(chunks, 1)
+        assert [e["event"] for e in events] == ["todo", "todo", "delete"]
+        assert '"title":"alice\'s"' in events[0]["data"].replace(" ", "")
+        assert '"completed":true' in events[1]["data"].replace(" ", "")
+        assert events[2]["data"].replace(" ", "") == f'{{"id":{todo_id}}}'
+        positions = [decode_change_token(e["id"])[0] for e in events]
+        assert positions == sorted(positions)
+        response.close()
+
+    def test_resume_from_last_event_id(self, client):
+        since = client.get("/api/todos/changes", headers=ALICE).get_json()["next_since"]
+        for title in ("missed 1", "missed 2"):
+            client.post("/api/todos", json={"title": title}, headers=ALICE)
+
+        response, chunks = open_stream(client, headers={**ALICE, "Last-Event-ID": since})
+        events = read_events(chunks, 2)
+        assert ["missed 1" in events[0]["data"], "missed 2" in events[1]["data"]] == [True, True]
+        response.close()
+
+        # id ของ event ใช้กับ /changes ได้เหมือน next_since
+        client.post("/api/todos", json={"title": "after"}, headers=ALICE)
+        changes = client.get(f"/api/todos/changes?since={events[-1]['id']}", headers=ALICE).get_json()
+        assert [t["title"] for t in changes["updated"]] == ["after"]
+
+    def test_heartbeat_and_unsubscribe(self, client, app):
+        response, chunks = open_stream(client)
+        assert next(chunks) == b": heartbeat\n\n"
+        assert get_change_hub().stats()["connections"] == 1
+        response.close()
+        assert get_change_hub().stats()["connections"] == 0
+
+    def test_invalid_and_expired_ids(self, client):
+        assert client.get("/api/todos/stream", headers={"Last-Event-ID": "nope"}).status_code == 400
+        old = encode_change_token((0, 1), datetime(2000, 1, 1))
+        assert client.get(f"/api/todos/stream?since={old}").status_code == 410
+
+    def test_connection_limit(self, client, app):
+        get_change_hub().max_connections = 1
+        response, _ = open_stream(client)
+        rejected = client.get("/api/todos/stream", headers=ALICE)
+        assert rejected.status_code == 503
+        assert rejected.headers["Retry-After"] == "3"
+        response.close()
+        assert client.get("/api/internal/stream").get_json()["rejected"] == 1
+
+    def test_slow_stream_is_closed(self, client):
+        response, chunks = open_stream(client)
+        client.post("/api/todos/batch", headers=ALICE, json={
+            "operations": [{"op": "create", "data": {"title": f"t{i}"}} for i in range(6)]
+        })
+        # เกิน SSE_QUEUE_SIZE: stream จบเอง ให้ client ต่อใหม่ด้วย Last-Event-ID
+        assert set(chunks) <= {b": heartbeat\n\n"}
+        response.close()
+
+    def test_commit_without_owner_reaches_every_stream(self, client, app):
+        client.post("/api/todos", json={"title": "x"}, headers=ALICE)
+        response, chunks = open_stream(client)
+        # commit นอก request (write-behind) ไม่รู้ owner จึงแจ้งทุก owner
+        with app.app_context():
+            db.session.execute(db.update(Todo.__table__).values(title="from a thread"))
+            db.session.commit()
+        events = read_events(chunks, 1)
+        assert events[0]["event"] == "todo" and "from a thread" in events[0]["data"]
+        response.close()
+
+
+@pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL not set")
+def test_notify_reaches_streams_on_postgres(monkeypatch):
+    monkeypatch.setattr(TestingConfig, "SQLALCHEMY_DATABASE_URI", POSTGRES_URL)
+    app = create_app("testing")
+    tables = [TodoTombstone.__table__, Todo.__table__]
+    with app.app_context():
+        db.metadata.drop_all(db.engine, tables=tables)
+        db.metadata.create_all(db.engine, tables=tables)
+        hub = get_change_hub()
+        assert hub.listen
+        try:
+            subscription = hub.subscribe("alice", (0, 0))
+            deadline = time.monotonic() + 5
+            while not hub.listening:
+                assert time.monotonic() < deadline
+                time.sleep(0.05)
+            # เขียนจาก connection อื่นที่ไม่ผ่าน app: มีแค่ NOTIFY ที่จะปลุก hub ได้
+            other = create_engine(POSTGRES_URL)
+            with other.begin() as connection:
+                connection.execute(text(
+                    "INSERT INTO todos (owner_id, title, completed, created_at, updated_at) "
+                    "VALUES ('alice', 'notified', false, now(), now()), ('bob', 'not mine', false, now(), now())"
+                ))
+            other.dispose()
+            chunk = ""
+            while "notified" not in chunk:
+                assert time.monotonic() < deadline
+                chunk += subscription.next_chunk(0.2)
+            assert "not mine" not in chunk
+            assert hub.notifications >= 1
+        finally:
+            hub.close()
+            db.session.remove()
+            db.metadata.drop_all(db.engine, tables=tables)
+
+
+@pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL not set")
+def test_held_back_changes_arrive_when_the_older_transaction_commits(monkeypatch):
+    monkeypatch.setattr(TestingConfig, "SQLALCHEMY_DATABASE_URI", POSTGRES_URL)
+    app = create_app("testing")
+    tables = [TodoTombstone.__table__, Todo.__table__]
+    insert = (
+        "INSERT INTO todos (owner_id, title, completed, created_at, updated_at) "
+        "VALUES (:owner, :title, false, now(), now())"
+    )
+    with app.app_context():
+        db.metadata.drop_all(db.engine, tables=tables)
+        db.metadata.create_all(db.engine, tables=tables)
+        hub = get_change_hub()
+        other = create_engine(POSTGRES_URL)
+        try:
+            subscription = hub.subscribe("bob", (0, 0))
+            deadline = time.monotonic() + 5
+            while not hub.listening:
+                assert time.monotonic() < deadline
+                time.sleep(0.05)
+            with other.connect() as first, other.connect() as second:
+                first.execute(text(insert), {"owner": "alice", "title": "older"})
+                second.execute(text(insert), {"owner": "bob", "title": "behind"})
+                second.commit()
+                # transaction ของ alice ยังค้าง: change ของ bob ยังส่งไม่ได้
+                chunk = ""
+                while time.monotonic() < deadline - 3:
+                    chunk += subscription.next_chunk(0.2)
+                assert "behind" not in chunk
+                assert hub.stats()["waiting"] == 1
+                # commit นี้ NOTIFY แค่ alice: bob มาถึงได้เพราะ hub อ่านซ้ำเอง
+                first.commit()
+            deadline = time.monotonic() + 5
+            while "behind" not in chunk:
+                assert time.monotonic() < deadline
+                chunk += subscription.next_chunk(0.2)
+            assert "older" not in chunk
+        finally:
+            other.dispose()
+            hub.close()
+            db.session.remove()
+            db.metadata.drop_all(db.engine, tables=tables)
@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import create_app
+from app.changes import compact_tombstones
+from app.config import TestingConfig
+from app.models import Todo, TodoTombstone, db
+
+ALICE = {"X-Owner-ID": "alice"}
+BOB = {"X-Owner-ID": "bob"}
+
+
+@pytest.fixture()
+def alice_todo(client):
+    return client.post("/api/todos", json={"title": "alice's"}, headers=ALICE).get_json()["data"]["id"]
+
+
+class TestOwnerIsolation:
+    """Test every /api/todos route only sees the requesting owner's todos"""
+
+    def test_list_and_get(self, client, alice_todo):
+        assert client.get("/api/todos", headers=ALICE).get_json()["count"] == 1
+        assert client.get("/api/todos", headers=BOB).get_json()["count"] == 0
+        assert client.get(f"/api/todos/{alice_todo}", headers=BOB).status_code == 404
+        assert client.get(f"/api/todos/{alice_todo}", headers=ALICE).status_code == 200
+
+    def test_cached_todo_is_not_served_to_other_owner(self, client, alice_todo):
+        client.get(f"/api/todos/{alice_todo}", headers=ALICE)
+        assert client.get(f"/api/todos/{alice_todo}", headers=BOB).status_code == 404
+        assert client.get(f"/api/todos/{alice_todo}", headers=ALICE).status_code == 200
+
+    def test_writes(self, client, alice_todo):
+        assert client.put(f"/api/todos/{alice_todo}", json={"title": "x"}, headers=BOB).status_code == 404
+        assert client.patch(f"/api/todos/{alice_todo}", json={"completed": True}, headers=BOB).status_code == 404
+        assert client.delete(f"/api/todos/{alice_todo}", headers=BOB).status_code == 404
+        response = client.post("/api/todos/batch", headers=BOB, json={"operations": [
+            {"op": "update", "id": alice_todo, "data": {"title": "x"}},
+            {"op": "create", "data": {"title": "bob's"}},
+        ]})
+        assert [r["status"] for r in response.get_json()["results"]] == [404, 201]
+        assert client.get(f"/api/todos/{alice_todo}", headers=ALICE).get_json()["data"]["title"] == "alice's"
+
+    def test_search_export_and_changes(self, client, alice_todo):
+        bob_todo = client.post("/api/todos", json={"title": "bob's"}, headers=BOB).get_json()["data"]["id"]
+        assert client.get("/api/todos?q=alice", headers=BOB).get_json()["count"] == 0
+        assert client.get("/api/todos?q=alice", headers=ALICE).get_json()["count"] == 1
+        assert client.get("/api/todos/export", headers=BOB).get_data(as_text=True).count("\n") == 1
+        assert [t["id"] for t in client.get("/api/todos/changes", headers=BOB).get_json()["updated"]] == [bob_todo]
+
+    def test_deletes_reach_only_the_owners_change_feed(self, client, alice_todo):
+        alice_since = client.get("/api/todos/changes", headers=ALICE).get_json()["next_since"]
+        bob_since = client.get("/api/todos/changes", headers=BOB).get_json()["next_since"]
+        client.delete(f"/api/todos/{alice_todo}", headers=ALICE)
+        assert client.get(f"/api/todos/changes?since={alice_since}", headers=ALICE).get_json()["deleted"] == [
+            alice_todo
+        ]
+        assert client.get(f"/api/todos/changes?since={bob_since}", headers=BOB).get_json()["deleted"] == []
+
+    def test_list_etag_is_per_owner(self, client):
+        assert client.get("/api/todos", headers=ALICE).headers["ETag"] != client.get(
+            "/api/todos", headers=BOB
+        ).headers["ETag"]
+
+    def test_missing_header_is_the_default_owner(self, client, alice_todo):
+        client.post("/api/todos", json={"title": "legacy"})
+        assert client.get("/api/todos").get_json()["data"][0]["title"] == "legacy"
+        assert client.get("/api/todos", headers={"X-Owner-ID": "default"}).get_json()["count"] == 1
+        assert Todo.query.filter_by(title="legacy").one().owner_id == "default"
+
+    def test_vary(self, client):
+        assert "X-Owner-ID" in client.get("/api/todos", headers=ALICE).headers["Vary"]
+
+
+class TestOwnerHeader:
+    """Test OWNER_HEADER validation and OWNER_REQUIRED"""
+
+    def test_invalid_owner(self, client):
+        response = client.get("/api/todos", headers={"X-Owner-ID": "a b"})
+        assert response.status_code == 400
+        assert response.get_json()["success"] is False
+
+    def test_required(self, monkeypatch):
+        monkeypatch.setattr(TestingConfig, "OWNER_REQUIRED", True, raising=False)
+        app = create_app("testing")
+        with app.app_context():
+            db.create_all()
+            client = app.test_client()
+            assert client.get("/api/todos").status_code == 401
+            assert client.get("/api/todos", headers=ALICE).status_code == 200
+            assert client.get("/api/health/live").status_code == 200
+            db.session.remove()
+            db.drop_all()
+
+
+class TestTombstoneCompaction:
+    """Test compaction keeps each owner's newest tombstone"""
+
+    def test_newest_per_owner_is_kept(self, client, app):
+        # สร้างครบก่อนค่อยลบ: SQLite นำ id ที่ถูกลบกลับมาใช้
+        owners = [ALICE, BOB, BOB]
+        ids = [client.post("/api/todos", json={"title": "t"}, headers=o).get_json()["data"]["id"] for o in owners]
+        for owner, todo_id in zip(owners, ids):
+            client.delete(f"/api/todos/{todo_id}", headers=owner)
+
+        # app context ใหม่ = ไม่มี owner เหมือนตอนรันจาก CLI
+        with app.app_context():
+            db.session.execute(db.update(TodoTombstone).values(deleted_at=datetime.utcnow() - timedelta(days=60)))
+            db.session.commit()
+            assert compact_tombstones(30) == 1
+            remaining = set(db.session.execute(db.select(TodoTombstone.id)).scalars())
+        assert remaining == {ids[0], ids[2]}
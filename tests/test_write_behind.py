@@ -0,0 +1,236 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy.exc import SQLAlchemyError
+
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import Todo
+from app.write_behind import WriteBehindBuffer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# worker ที่ตอบ 202 แล้วจบแบบปกติ (flush ตอน exit) หรือแบบ crash (os._exit)
+WORKER_SCRIPT = """
+import os, sys
+from app import create_app
+app = create_app("development")
+client = app.test_client()
+todo_id = client.post("/api/todos", json={"title": "t"}).get_json()["data"]["id"]
+assert client.patch(f"/api/todos/{todo_id}", json={"completed": True}).status_code == 202
+if sys.argv[1] == "crash":
+    os._exit(1)
+"""
+
+
+@pytest.fixture()
+def buffered(monkeypatch):
+    monkeypatch.setattr(TestingConfig, "WRITE_BEHIND_ENABLED", True, raising=False)
+    # flush เฉพาะตอนที่ test สั่ง
+    monkeypatch.setattr(TestingConfig, "WRITE_BEHIND_FLUSH_MS", 60000, raising=False)
+    app = create_app("testing")
+    with app.app_context():
+        db.create_all()
+        yield app, app.extensions["write_behind"]
+        app.extensions["write_behind"].close()
+        db.session.remove()
+        db.drop_all()
+
+
+def make_todos(client, count):
+    return [client.post("/api/todos", json={"title": f"todo {i}"}).get_json()["data"]["id"] for i in range(count)]
+
+
+def stored(todo_id):
+    db.session.expire_all()
+    return db.session.get(Todo, todo_id)
+
+
+class TestPatchEndpoint:
+    """Test PATCH /api/todos/<id> with and without the write-behind buffer"""
+
+    def test_patch_without_buffer_writes_immediately(self, client):
+        (todo_id,) = make_todos(client, 1)
+        response = client.patch(f"/api/todos/{todo_id}", json={"completed": True})
+        assert response.status_code == 200
+        assert response.get_json()["data"]["completed"] is True
+
+    @pytest.mark.parametrize("payload", [
+        None, {}, {"unknown": 1}, {"title": ""}, {"title": {"x": 1}}, {"title": "x" * 201},
+        {"description": 1}, {"completed": "yes"},
+    ])
+    def test_invalid_payload(self, client, payload):
+        (todo_id,) = make_todos(client, 1)
+        assert client.patch(f"/api/todos/{todo_id}", json=payload).status_code == 400
+
+    def test_patch_is_acknowledged_then_flushed(self, buffered):
+        app, buffer = buffered
+        client = app.test_client()
+        (todo_id,) = make_todos(client, 1)
+        response = client.patch(f"/api/todos/{todo_id}", json={"completed": True})
+        assert response.status_code == 202
+        assert response.get_json()["data"] == {"id": todo_id, "completed": True}
+        assert stored(todo_id).completed is False
+
+        assert buffer.flush() == 1
+        assert stored(todo_id).completed is True
+        # cache ของ GET ถูก invalidate หลัง flush
+        assert client.get(f"/api/todos/{todo_id}").get_json()["data"]["completed"] is True
+
+    def test_missing_todo(self, buffered):
+        app, buffer = buffered
+        assert app.test_client().patch("/api/todos/999", json={"completed": True}).status_code == 404
+        assert buffer.pending() == 0
+
+    def test_if_match_and_full_buffer_write_immediately(self, buffered):
+        app, buffer = buffered
+        client = app.test_client()
+        first, second = make_todos(client, 2)
+        etag = client.get(f"/api/todos/{first}").headers["ETag"]
+        response = client.patch(f"/api/todos/{first}", json={"completed": True}, headers={"If-Match": etag})
+        assert response.status_code == 200
+
+        buffer.max_pending = 0
+        assert client.patch(f"/api/todos/{second}", json={"completed": True}).status_code == 200
+        assert stored(second).completed is True
+        assert client.get("/api/internal/write-behind").get_json()["rejected"] == 1
+
+
+class TestWriteBehindBuffer:
+    """Test coalescing, ordering and durability of buffered updates"""
+
+    def test_updates_are_coalesced_last_write_wins(self, buffered):
+        app, buffer = buffered
+        client = app.test_client()
+        first, second = make_todos(client, 2)
+        for completed in (True, False, True):
+            client.patch(f"/api/todos/{first}", json={"completed": completed})
+        client.patch(f"/api/todos/{first}", json={"title": "renamed"})
+        client.patch(f"/api/todos/{second}", json={"completed": True})
+        client.patch(f"/api/todos/{second}", json={"completed": False})
+
+        assert buffer.stats()["coalesced"] == 4
+        assert buffer.flush() == 2
+        assert (stored(first).title, stored(first).completed) == ("renamed", True)
+        assert stored(second).completed is False
+        assert buffer.stats()["flushes"] == 1
+
+    def test_failed_flush_keeps_newer_updates(self, buffered):
+        app, buffer = buffered
+        (todo_id,) = make_todos(app.test_client(), 1)
+        buffer.submit(todo_id, {"title": "from failed flush", "completed": True})
+        with patch("app.write_behind.db.session.execute", side_effect=SQLAlchemyError("down")):
+            assert buffer.flush() == 0
+        buffer.submit(todo_id, {"completed": False})
+
+        assert buffer.pending() == 1
+        buffer.flush()
+        assert (stored(todo_id).title, stored(todo_id).completed) == ("from failed flush", False)
+        assert buffer.stats()["failures"] == 1
+
+    def test_rejected_update_does_not_block_others(self, buffered):
+        app, buffer = buffered
+        client = app.test_client()
+        bad, good = make_todos(client, 2)
+        # ผ่าน validation ของ PATCH ไม่ได้: ใส่ตรงเข้า buffer
+        buffer.submit(bad, {"title": {"x": 1}})
+        client.patch(f"/api/todos/{good}", json={"completed": True})
+
+        assert buffer.flush() == 1
+        assert stored(good).completed is True
+        assert buffer.pending() == 0
+        assert buffer.stats()["dropped"] == 1
+
+        buffer.submit(bad, {"title": {"x": 1}})
+        assert client.put(f"/api/todos/{bad}", json={"title": "fixed"}).status_code == 200
+        assert stored(bad).title == "fixed"
+        buffer.submit(bad, {"title": {"x": 1}})
+        assert client.delete(f"/api/todos/{bad}").status_code == 200
+        assert buffer.stats()["dropped"] == 3
+
+    def test_deleted_todo_is_skipped(self, buffered):
+        app, buffer = buffered
+        client = app.test_client()
+        (todo_id,) = make_todos(client, 1)
+        client.patch(f"/api/todos/{todo_id}", json={"completed": True})
+        client.delete(f"/api/todos/{todo_id}")
+        # DELETE เขียน PATCH ที่ค้างไปก่อนแล้ว
+        assert buffer.pending() == 0
+        assert buffer.flush() == 0
+        assert stored(todo_id) is None
+
+    def test_direct_write_is_not_overwritten_by_queued_patch(self, buffered):
+        app, buffer = buffered
+        client = app.test_client()
+        first, second, third = make_todos(client, 3)
+        assert client.patch(f"/api/todos/{first}", json={"completed": True}).status_code == 202
+        assert client.put(f"/api/todos/{first}", json={"completed": False}).status_code == 200
+
+        client.patch(f"/api/todos/{second}", json={"title": "queued", "completed": True})
+        etag = client.get(f"/api/todos/{second}").headers["ETag"]
+        response = client.patch(f"/api/todos/{second}", json={"completed": False}, headers={"If-Match": etag})
+        # PATCH ที่ค้างถูกเขียนก่อน: ETag เดิมไม่ตรงแล้ว
+        assert response.status_code == 412
+        etag = client.get(f"/api/todos/{second}").headers["ETag"]
+        response = client.patch(f"/api/todos/{second}", json={"completed": False}, headers={"If-Match": etag})
+        assert response.status_code == 200
+
+        client.patch(f"/api/todos/{third}", json={"completed": True})
+        batch = client.post("/api/todos/batch", json={"operations": [
+            {"op": "update", "id": third, "data": {"completed": False}},
+        ]})
+        assert batch.status_code == 200
+
+        assert buffer.pending() == 0
+        buffer.flush()
+        assert stored(first).completed is False
+        assert (stored(second).title, stored(second).completed) == ("queued", False)
+        assert stored(third).completed is False
+
+    def test_failed_settle_keeps_update_and_rejects_direct_write(self, buffered):
+        app, buffer = buffered
+        client = app.test_client()
+        (todo_id,) = make_todos(client, 1)
+        client.patch(f"/api/todos/{todo_id}", json={"completed": True})
+        with patch("app.write_behind.db.session.execute", side_effect=SQLAlchemyError("down")):
+            assert client.put(f"/api/todos/{todo_id}", json={"completed": False}).status_code == 500
+        assert buffer.pending() == 1
+        assert stored(todo_id).completed is False
+
+    def test_flush_on_size_threshold(self, app):
+        buffer = WriteBehindBuffer(app, flush_interval=60, flush_size=3)
+        todo_ids = make_todos(app.test_client(), 3)
+        for todo_id in todo_ids:
+            buffer.submit(todo_id, {"completed": True})
+        deadline = time.monotonic() + 5
+        while buffer.stats()["written"] < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert all(stored(todo_id).completed for todo_id in todo_ids)
+        buffer.close()
+        assert not buffer.submit(todo_ids[0], {"completed": False})
+
+    @pytest.mark.parametrize("exit_mode, persisted", [("graceful", 1), ("crash", 0)])
+    def test_shutdown_durability(self, tmp_path, exit_mode, persisted):
+        path = tmp_path / "todos.db"
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{path}",
+            "WRITE_BEHIND_ENABLED": "true",
+            "WRITE_BEHIND_FLUSH_MS": "60000",
+            "RATELIMIT_ENABLED": "false",
+            "CACHE_BACKEND": "none",
+            "PYTHONPATH": ROOT,
+        }
+        result = subprocess.run(
+            [sys.executable, "-c", WORKER_SCRIPT, exit_mode],
+            cwd=ROOT, env=env, capture_output=True, text=True, timeout=60,
+        )
+        assert result.returncode == (0 if exit_mode == "graceful" else 1), result.stderr
+        # graceful: atexit flush; crash: ที่ตอบ 202 ไปแล้วหาย
+        with sqlite3.connect(path) as conn:
+            assert conn.execute("SELECT completed FROM todos").fetchone() == (persisted,)
@@ -0,0 +1,47 @@
+"""Background job worker: ``python worker.py``
+
+Claims jobs queued through POST /api/jobs and runs them in a pool of
+JOBS_CONCURRENCY processes, so imports, exports and bulk updates never
+hold a gunicorn request thread. SIGTERM stops claiming and lets the
+running jobs finish; jobs of a killed worker are requeued when their
+lease (JOBS_LEASE_SECONDS) expires.
+"""
+import multiprocessing
+import signal
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from app import create_app
+from app.jobs import JobWorker, init_job_process
+
+
+def main():
+    app = create_app()
+    config = app.config
+    stop = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: stop.set())
+
+    # spawn: process ใหม่ไม่ได้รับ connection และ thread (logging ฯลฯ) ที่ fork มาจาก process นี้
+    executor = ProcessPoolExecutor(
+        max_workers=config["JOBS_CONCURRENCY"],
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_job_process,
+    )
+    worker = JobWorker(
+        app,
+        executor,
+        config["JOBS_CONCURRENCY"],
+        poll_interval=config["JOBS_POLL_INTERVAL"],
+        lease_seconds=config["JOBS_LEASE_SECONDS"],
+    )
+    app.logger.info(f"🚀 Job worker {worker.worker_id} started ({config['JOBS_CONCURRENCY']} processes)")
+    try:
+        worker.run_forever(stop)
+    finally:
+        executor.shutdown(wait=True)
+    app.logger.info("👋 Job worker stopped")
+
+
+if __name__ == '__main__':
+    main()